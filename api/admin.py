@@ -1,3 +1,14 @@
 from django.contrib import admin
 
+from .models import VideoImportJob
+
+
+class VideoImportJobAdmin(admin.ModelAdmin):
+    list_display = ["id", "kind", "status", "total", "processed", "failed", "created_at"]
+    list_filter = ["status", "kind"]
+    # The payload can hold a whole catalog.
+    exclude = ["payload"]
+
+
 # Register your models here.
+admin.site.register(VideoImportJob, VideoImportJobAdmin)
@@ -0,0 +1,207 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+from django.views.decorators.http import require_http_methods
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import remove_query_param
+from rest_framework.utils.urls import replace_query_param
+
+from users.models import UserSavedVideo
+from videos.models import Video
+from videos.search import search as search_videos
+
+from .filters import VIDEO_ORDERING_FIELDS
+from .filters import VideoFilter
+from .filters import VideoOrderingFilter
+from .pagination import COUNT_ESTIMATE
+from .pagination import COUNT_EXACT
+from .pagination import CustomLimitOffsetPagination
+from .pagination import estimate_count
+from .pagination import get_count_mode
+from .renderers import ORJSONRenderer
+from .serializers import VideoIdsSerializer
+from .serializers import VideoListSerializer
+from .serializers import requested_video_fields
+
+
+def json_response(data, status=200):
+    """
+    Render data like the DRF views do, with the ORJSONRenderer, so both return
+    the same bytes.
+    """
+    renderer = ORJSONRenderer()
+    return HttpResponse(renderer.render(data), content_type=renderer.media_type, status=status)
+
+
+def error_response(detail, status=400):
+    if isinstance(detail, str):
+        detail = {"error": detail}
+    return json_response(detail, status=status)
+
+
+def get_ordering(params):
+    """
+    Return the order_by terms for ?ordering=, mapped to the typed columns like
+    VideoOrderingFilter. Unknown fields are ignored.
+    """
+    terms = [term.strip() for term in params.get("ordering", "").split(",") if term.strip()]
+    ordering_filter = VideoOrderingFilter()
+    return [
+        ordering_filter.map_term(term)
+        for term in terms
+        if term.lstrip("-") in VIDEO_ORDERING_FIELDS
+    ]
+
+
+def video_queryset(request):
+    """
+    Return the filtered and ordered videos for the request, loading only the
+    requested fields, like VideoViewSet.get_queryset and filter_queryset.
+
+    Raises:
+        ValidationError: If the filter parameters are invalid.
+    """
+    ordering = get_ordering(request.GET)
+    columns = {term.lstrip("-") for term in ordering}
+    queryset = Video.objects.only(*requested_video_fields(request.GET), *columns)
+    filterset = VideoFilter(request.GET, queryset=queryset, request=request)
+    if not filterset.is_valid():
+        raise ValidationError(filterset.errors)
+    return filterset.qs.order_by(*ordering, "pk") if ordering else filterset.qs
+
+
+async def paginated_response(request, queryset):
+    """
+    Paginate the videos with ?limit= / ?offset= and ?count= like
+    CustomLimitOffsetPagination and serialize the page.
+
+    Returns:
+        HttpResponse: {"count", "next", "previous", "results"}.
+    """
+    params = request.GET
+    paginator = CustomLimitOffsetPagination()
+    try:
+        limit = min(max(int(params.get("limit", paginator.default_limit)), 1), paginator.max_limit)
+    except ValueError:
+        limit = paginator.default_limit
+    try:
+        offset = max(int(params.get("offset", 0)), 0)
+    except ValueError:
+        offset = 0
+    count_mode = get_count_mode(params, COUNT_EXACT)
+
+    if count_mode == COUNT_EXACT:
+        count = await queryset.acount()
+    elif count_mode == COUNT_ESTIMATE:
+        count = await sync_to_async(estimate_count)(queryset)
+    else:
+        count = None
+    rows = [video async for video in queryset[offset : offset + limit + 1]]
+    has_next = len(rows) > limit
+
+    url = request.build_absolute_uri()
+    next_link = previous_link = None
+    if has_next:
+        next_link = replace_query_param(url, "limit", limit)
+        next_link = replace_query_param(next_link, "offset", offset + limit)
+    if offset > 0:
+        previous_link = replace_query_param(url, "limit", limit)
+        if offset - limit <= 0:
+            previous_link = remove_query_param(previous_link, "offset")
+        else:
+            previous_link = replace_query_param(previous_link, "offset", offset - limit)
+
+    serializer = VideoListSerializer(rows[:limit], many=True, fields=requested_video_fields(params))
+    return json_response(
+        {"count": count, "next": next_link, "previous": previous_link, "results": serializer.data}
+    )
+
+
+@require_GET
+async def video_list(request):
+    """
+    List videos, the async counterpart of VideoViewSet.list.
+    Takes the same filters, ordering, ?fields= / ?omit= and limit/offset pagination.
+    """
+    try:
+        queryset = video_queryset(request)
+    except ValidationError as e:
+        return error_response(e.detail)
+    return await paginated_response(request, queryset)
+
+
+@require_GET
+async def video_search(request):
+    """
+    Search videos, the async counterpart of VideoViewSet.search.
+    """
+    text = request.GET.get("q", "").strip()
+    if not text:
+        return error_response("q is required")
+    try:
+        queryset = search_videos(video_queryset(request), text)
+    except ValidationError as e:
+        return error_response(e.detail)
+    return await paginated_response(request, queryset)
+
+
+@require_GET
+async def video_retrieve(request, identifier):
+    """
+    Retrieve a video by id or video_id, the async counterpart of VideoViewSet.retrieve.
+    See VideoQuerySet.identified_by for the identifier forms.
+    """
+    field_names = requested_video_fields(request.GET)
+    video = await Video.objects.only(*field_names).identified_by(identifier).afirst()
+    if video is None:
+        return error_response(
+            {"detail": f"No video found with id or video_id: {identifier}"}, status=404
+        )
+    return json_response(VideoListSerializer(video, fields=field_names).data)
+
+
+async def authenticate_token(request):
+    """
+    Return the active user of the request's "Authorization: Token <key>" header, or None.
+    """
+    keyword, _, key = request.headers.get("Authorization", "").partition(" ")
+    if keyword != "Token" or not key:
+        return None
+    token = await Token.objects.select_related("user").filter(key=key.strip()).afirst()
+    if token is None or not token.user.is_active:
+        return None
+    return token.user
+
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+async def saved_status(request):
+    """
+    Report which of the given videos the user has saved, the async counterpart
+    of UserSavedVideoViewSet.saved_status. Requires token authentication.
+    """
+    user = await authenticate_token(request)
+    if user is None:
+        return error_response(
+            {"detail": "Authentication credentials were not provided."}, status=401
+        )
+    if request.method == "GET":
+        raw = request.GET.get("video_ids", "")
+        data = {"video_ids": [video_id for video_id in raw.split(",") if video_id]}
+    else:
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return error_response("Invalid JSON")
+    serializer = VideoIdsSerializer(data=data)
+    if not serializer.is_valid():
+        return error_response(serializer.errors)
+    video_ids = serializer.validated_data["video_ids"]
+
+    saves = UserSavedVideo.objects.filter(user=user, video_id__in=video_ids)
+    saved = {video_id async for video_id in saves.values_list("video_id", flat=True)}
+    return json_response({"saved": {video_id: video_id in saved for video_id in video_ids}})
@@ -0,0 +1,396 @@
+import asyncio
+import statistics
+import time
+import tracemalloc
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.db import connections
+from django.db.models import Q
+from django.test import AsyncClient
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from users.models import UserSavedVideo
+from videos.models import Video
+from videos.related import build_related_videos
+from videos.search import search
+
+from .bulk import refresh_derived
+from .compression import brotli
+from .compression import compress
+from .compression import supported_encodings
+from .bulk import upsert_videos
+from .instrumentation import RequestMetrics
+from .instrumentation import watch_queries
+from .renderers import ORJSONRenderer
+from .serializers import VideoListSerializer
+
+# Benchmarks by name, see the benchmark management command.
+SCENARIOS = {}
+
+
+def scenario(name, sizes):
+    """
+    Register a benchmark function under a name.
+
+    The function takes a size and returns a dict of measurements, it is run
+    once per size against a throwaway database.
+
+    Args:
+        name: The name passed to the benchmark command.
+        sizes: The sizes run when the command is given none.
+    """
+
+    def register(function):
+        SCENARIOS[name] = (function, sizes)
+        return function
+
+    return register
+
+
+def measure(function, *args, **kwargs):
+    """
+    Call a function, counting its queries and timing it.
+
+    Returns:
+        tuple: (result, seconds, queries)
+    """
+    metrics = RequestMetrics()
+    with watch_queries(metrics):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        seconds = time.perf_counter() - start
+    return result, seconds, metrics.queries
+
+
+def median_ms(function, repeat=5):
+    """
+    Call a function repeat times and return its median duration in milliseconds.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return round(statistics.median(durations) * 1000, 1)
+
+
+def video_payload(number, **overrides):
+    """
+    Return a posted video like the nightly sync sends, with a bilingual
+    description and a few tags.
+    """
+    payload = {
+        "video_id": f"bench-{number}",
+        "title": f"שיעור {number} - Lesson {number}",
+        "topic": f"topic-{number % 10}",
+        "subtopic": f"subtopic-{number % 50}",
+        "description": f"תיאור השיעור מספר {number}. " * 5 + f"Description of lesson {number}. " * 5,
+        "tags": [f"tag-{number % 200}", f"tag-{number % 37}", "shiur"],
+        "duration": f"PT{number % 90}M{number % 60}S",
+        "publishedAt": f"2024-{number % 12 + 1:02d}-{number % 28 + 1:02d}T10:00:00Z",
+        "likes": number % 1000,
+        "views": number % 10000,
+    }
+    payload.update(overrides)
+    return payload
+
+
+def seed_videos(count, batch_size=5000, **overrides):
+    """
+    Replace the catalog with count videos, inserted in bulk with their derived data.
+    overrides are passed on to video_payload.
+    """
+    Video.objects.all().delete()
+    for start in range(0, count, batch_size):
+        videos = [
+            Video(**video_payload(number, **overrides))
+            for number in range(start, min(start + batch_size, count))
+        ]
+        for video in videos:
+            video.sync_typed_fields()
+        Video.objects.bulk_create(videos, batch_size=1000)
+        refresh_derived(video.video_id for video in videos)
+
+
+@scenario("upsert", sizes=[1000, 10000, 50000])
+def upsert(size):
+    """
+    Upsert a batch of which half updates existing videos and half creates new ones.
+    """
+    Video.objects.all().delete()
+    upsert_videos([video_payload(number) for number in range(0, size, 2)])
+    batch = [video_payload(number, views=number + 1) for number in range(size)]
+    (created, updated, errors), seconds, queries = measure(upsert_videos, batch)
+    return {
+        "created": len(created),
+        "updated": len(updated),
+        "errors": len(errors),
+        "queries": queries,
+        "seconds": round(seconds, 3),
+    }
+
+
+@scenario("list", sizes=[100000])
+def list_pages(size):
+    """
+    Time the first and a deep 50 video page of the video list for filter and
+    ordering combinations the indexes were built for, with the response cache
+    disabled.
+    """
+    if Video.objects.count() != size:
+        seed_videos(size)
+    client = Client()
+    queries = {
+        "newest": "ordering=-publishedAt",
+        "topic_newest": "topic=topic-1&ordering=-publishedAt",
+        "subtopic_newest": "topic=topic-1&subtopic=subtopic-11&ordering=-publishedAt",
+        "topic_views": "topic=topic-1&ordering=-views",
+        "topic_likes": "topic=topic-1&ordering=-likes",
+        "views_range": "views__gte=9000&ordering=-views",
+    }
+    row = {}
+    dummy = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+    with override_settings(CACHES=dummy):
+        for name, query in queries.items():
+            for page, offset in [("first", 0), ("deep", 5000)]:
+                url = f"/api/videos/?{query}&limit=50&offset={offset}&count=none"
+                row[f"{name}_{page}_ms"] = median_ms(lambda: client.get(url))
+    return row
+
+
+@scenario("search", sizes=[100000])
+def search_catalog(size):
+    """
+    Compare the first page of the search action with a naive icontains scan.
+    """
+    seed_videos(size)
+    texts = ["lesson 4242", "שיעור 777", "tag-7"]
+
+    def indexed():
+        for text in texts:
+            list(search(Video.objects.all(), text)[:50])
+
+    def naive():
+        for text in texts:
+            matches = (
+                Q(title__icontains=text) | Q(description__icontains=text) | Q(tags__icontains=text)
+            )
+            list(Video.objects.filter(matches).order_by("-pk")[:50])
+
+    return {"search_ms": median_ms(indexed), "icontains_ms": median_ms(naive)}
+
+
+def seed_saves(count, saves_per_user, videos):
+    """
+    Replace the users and their saves with count saves spread over
+    count / saves_per_user users, each saving a run of the first videos.
+
+    Returns:
+        list: The created users.
+    """
+    User = get_user_model()
+    UserSavedVideo.objects.all().delete()
+    User.objects.all().delete()
+    users = User.objects.bulk_create(
+        [User(username=f"user-{number}") for number in range(count // saves_per_user)],
+        batch_size=1000,
+    )
+    for start in range(0, len(users), 100):
+        UserSavedVideo.objects.bulk_create(
+            [
+                UserSavedVideo(user=user, video_id=f"bench-{(user.pk * 7 + number) % videos}")
+                for user in users[start : start + 100]
+                for number in range(saves_per_user)
+            ],
+            batch_size=5000,
+        )
+    return users
+
+
+@scenario("saves", sizes=[10000, 100000, 1000000])
+def saved_videos(size, saves_per_user=100, sample=20):
+    """
+    Time the saved videos listing and saved-status of sample users while the
+    table holds size saves spread over size / saves_per_user users.
+    """
+    seed_videos(1000)
+    users = seed_saves(size, saves_per_user, 1000)
+
+    client = APIClient()
+    step = max(len(users) // sample, 1)
+    list_url = "/api/user-saved-videos/?limit=50&expand=video"
+    video_ids = ",".join(f"bench-{number}" for number in range(50))
+    status_url = f"/api/user-saved-videos/saved-status/?video_ids={video_ids}"
+    list_ms, status_ms = [], []
+    for user in users[::step][:sample]:
+        client.force_authenticate(user)
+        list_ms.append(median_ms(lambda: client.get(list_url)))
+        status_ms.append(median_ms(lambda: client.get(status_url)))
+    return {
+        "users": len(users),
+        "list_ms": statistics.median(list_ms),
+        "list_max_ms": max(list_ms),
+        "saved_status_ms": statistics.median(status_ms),
+    }
+
+
+@scenario("related", sizes=[100000, 1000000])
+def related_videos(size, videos=100000, saves_per_user=50):
+    """
+    Build the related videos of a 100k videos catalog with size saves, tracing
+    the peak Python memory of the build.
+
+    The videos are untagged, so the build is the co-saves scoring and the
+    writes, the tag pairs being bounded per topic/subtopic group.
+    """
+    if Video.objects.count() != videos:
+        seed_videos(videos, tags=[])
+    seed_saves(size, saves_per_user, videos)
+
+    tracemalloc.start()
+    try:
+        stored, seconds, _ = measure(build_related_videos)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"rows": stored, "peak_mb": round(peak / 2**20, 1), "seconds": round(seconds, 1)}
+
+
+@scenario("async", sizes=[1, 10, 50])
+def async_views(size, requests=200):
+    """
+    Compare the throughput of the video list served by VideoViewSet and by its
+    async counterpart, the latter with size requests in flight.
+
+    Both run in this process through the test clients, one request at a time
+    for the DRF view like a sync worker, so this compares the views' own cost
+    and what concurrency buys an async worker in process, not a gunicorn or
+    uvicorn deployment. The response cache is disabled.
+    """
+    if Video.objects.count() != 1000:
+        seed_videos(1000)
+    urls = [f"videos/?limit=50&offset={number % 20 * 50}&count=none" for number in range(requests)]
+
+    client = Client()
+
+    def sync_requests():
+        for url in urls:
+            client.get(f"/api/{url}")
+
+    async_client = AsyncClient()
+
+    async def gather(batch):
+        await asyncio.gather(*(async_client.get(f"/api/async/{url}") for url in batch))
+
+    @async_to_sync
+    async def async_requests():
+        for start in range(0, requests, size):
+            await gather(urls[start : start + size])
+
+    dummy = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+    with override_settings(CACHES=dummy):
+        sync_ms = median_ms(sync_requests, repeat=3)
+        async_ms = median_ms(async_requests, repeat=3)
+    return {
+        "requests": requests,
+        "sync_per_second": round(requests / sync_ms * 1000),
+        "async_per_second": round(requests / async_ms * 1000),
+    }
+
+
+@scenario("connections", sizes=[100])
+def connection_setup(size):
+    """
+    Time size queries each on a new connection, like requests with
+    CONN_MAX_AGE=0, against size queries on one reused connection.
+
+    On the throwaway SQLite database connecting is nearly free, run it against
+    PostgreSQL (DATABASE_URL) for the cost of the TCP and authentication setup.
+    """
+
+    def select_one(connection):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+
+    def new_connections():
+        for _ in range(size):
+            connection = connections.create_connection(DEFAULT_DB_ALIAS)
+            try:
+                select_one(connection)
+            finally:
+                connection.close()
+
+    def reused_connection():
+        for _ in range(size):
+            select_one(connections[DEFAULT_DB_ALIAS])
+
+    return {
+        "vendor": connections[DEFAULT_DB_ALIAS].vendor,
+        "new_connections_ms": median_ms(new_connections),
+        "reused_connection_ms": median_ms(reused_connection),
+    }
+
+
+@scenario("render", sizes=[50, 100])
+def render_page(size, repeat=50):
+    """
+    Time rendering a serialized page of size videos with ORJSONRenderer
+    against DRF's JSONRenderer, which it replaces.
+    """
+    if Video.objects.count() < size:
+        seed_videos(size)
+    page = {
+        "count": size,
+        "next": None,
+        "previous": None,
+        "results": VideoListSerializer(Video.objects.order_by("pk")[:size], many=True).data,
+    }
+    orjson_bytes = ORJSONRenderer().render(page)
+    json_bytes = JSONRenderer().render(page)
+
+    def render_with(renderer):
+        for _ in range(repeat):
+            renderer.render(page)
+
+    return {
+        "bytes": len(json_bytes),
+        "same_bytes": orjson_bytes == json_bytes,
+        "orjson_ms": round(median_ms(lambda: render_with(ORJSONRenderer())) / repeat, 3),
+        "json_ms": round(median_ms(lambda: render_with(JSONRenderer())) / repeat, 3),
+    }
+
+
+@scenario("compression", sizes=[50, 100])
+def compression(size):
+    """
+    Compare the bytes and latency of a page of size videos sent as it is, with
+    gzip and with brotli, at BROTLI_QUALITY and at brotli's default of 11.
+
+    compress_ms only times compressing the rendered page, request_ms the whole
+    request with the response cache disabled.
+    """
+    if Video.objects.count() < size:
+        seed_videos(size)
+    url = f"/api/videos/?limit={size}"
+    client = Client()
+    dummy = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+    with override_settings(CACHES=dummy):
+        content = client.get(url, HTTP_ACCEPT_ENCODING="identity").content
+        row = {"identity_bytes": len(content)}
+        for encoding in supported_encodings():
+            row[f"{encoding}_bytes"] = len(compress(content, encoding))
+            row[f"{encoding}_compress_ms"] = median_ms(lambda: compress(content, encoding))
+        if brotli is not None:
+            row["br11_bytes"] = len(brotli.compress(content))
+            row["br11_compress_ms"] = median_ms(lambda: brotli.compress(content))
+        for encoding in ["identity", *supported_encodings()]:
+            row[f"{encoding}_request_ms"] = median_ms(
+                lambda: client.get(url, HTTP_ACCEPT_ENCODING=encoding)
+            )
+    return row
@@ -0,0 +1,333 @@
+import json
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError
+from django.db import connections
+from django.db import router
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import serializers
+
+from videos.batching import batches
+from videos.counters import COUNTER_FIELDS
+from videos.models import Video
+
+from .cache import VIDEO_CACHE_NAMESPACE
+from .cache import bump_generation
+from .models import VideoImportJob
+from .serializers import BulkVideoSerializer
+from .serializers import VideoSerializer
+
+WRITE_BATCH_SIZE = 1000
+INGEST_CHUNK_SIZE = 500
+# Only the first failing rows of a streamed upload are echoed back so the
+# response stays small however broken the upload is.
+MAX_REPORTED_ERRORS = 1000
+# A running job that made no progress for this long is assumed to belong to a
+# dead worker and is claimed again, resuming after its last finished chunk.
+STALE_JOB_SECONDS = 600
+
+
+def upsert_fields(exclude=()):
+    """
+    Return the Video fields overwritten when an upsert hits an existing row.
+
+    Args:
+        exclude: Further field names to leave as they are stored.
+
+    Returns:
+        list: Names of every concrete field except the primary key, video_id
+            and the excluded ones.
+    """
+    return [
+        field.name
+        for field in Video._meta.concrete_fields
+        if not field.primary_key and field.name != "video_id" and field.name not in exclude
+    ]
+
+
+def load_existing_videos(video_ids):
+    """
+    Load the videos matching the given video_ids.
+
+    Args:
+        video_ids: An iterable of video_id strings.
+
+    Returns:
+        dict: Video instances keyed by video_id.
+    """
+    existing = {}
+    for batch in batches(video_ids):
+        existing.update(Video.objects.in_bulk(batch, field_name="video_id"))
+    return existing
+
+
+def refresh_derived(video_ids):
+    """
+    Recompute the derived columns of the videos matching the given video_ids.
+
+    Args:
+        video_ids: An iterable of video_id strings that were just written.
+    """
+    for batch in batches(video_ids):
+        Video.objects.filter(video_id__in=batch).refresh_derived()
+
+
+def upsert_videos(videos):
+    """
+    Create or update a batch of videos keyed by video_id.
+
+    Existing rows are loaded up front, every item is validated without touching
+    the database, and the result is written with a single INSERT ... ON CONFLICT
+    per write batch inside one transaction. Items for existing videos are
+    validated as partial updates, so omitted fields keep their stored values.
+    Views and likes are only written when the payload sets them, so increments
+    flushed by videos.counters while the batch is processed are not overwritten
+    with the values loaded up front.
+
+    Args:
+        videos: A list of video dicts as posted by the client.
+
+    Returns:
+        tuple: (created_videos, updated_videos, errors) where the first two are
+            lists of serialized videos and errors is a list of
+            {"video": ..., "error": ...} dicts.
+    """
+    video_ids = {
+        video.get("video_id")
+        for video in videos
+        if isinstance(video, dict) and video.get("video_id")
+    }
+    existing = load_existing_videos(video_ids)
+
+    create_serializer = BulkVideoSerializer()
+    update_serializer = BulkVideoSerializer(partial=True)
+
+    pending = {}
+    # The counter fields each video's payload items set.
+    counters_set = defaultdict(set)
+    created_ids = []
+    updated_ids = []
+    errors = []
+    for video in videos:
+        if not isinstance(video, dict) or not video.get("video_id"):
+            errors.append({"video": video, "error": "video_id is required"})
+            continue
+
+        video_id = video["video_id"]
+        instance = pending.get(video_id) or existing.get(video_id)
+        validator = update_serializer if instance is not None else create_serializer
+        try:
+            validated_data = validator.run_validation(video)
+        except serializers.ValidationError as e:
+            errors.append({"video": video, "error": e.detail})
+            continue
+
+        if instance is None:
+            instance = Video(**validated_data)
+            created_ids.append(video_id)
+        else:
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            if video_id not in pending and video_id not in updated_ids:
+                updated_ids.append(video_id)
+        pending[video_id] = instance
+        counters_set[video_id].update(field for field in COUNTER_FIELDS if field in video)
+
+    if pending:
+        # Existing rows go through the same INSERT as new ones and are matched
+        # on video_id, so their primary keys are cleared and restored afterwards.
+        existing_pks = {video_id: existing[video_id].pk for video_id in updated_ids}
+        for instance in pending.values():
+            instance.pk = None
+            instance.sync_typed_fields()
+        # MySQL's ON DUPLICATE KEY UPDATE takes no conflict target, video_id
+        # being the only unique column besides the primary key it matches the same.
+        features = connections[router.db_for_write(Video)].features
+        unique_fields = ["video_id"] if features.supports_update_conflicts_with_target else None
+        # One statement per set of counter fields left alone, at most four.
+        by_kept_counters = defaultdict(list)
+        for video_id, instance in pending.items():
+            kept = frozenset(COUNTER_FIELDS) - counters_set[video_id]
+            by_kept_counters[kept].append(instance)
+        with transaction.atomic():
+            for kept, group in by_kept_counters.items():
+                Video.objects.bulk_create(
+                    group,
+                    batch_size=WRITE_BATCH_SIZE,
+                    update_conflicts=True,
+                    unique_fields=unique_fields,
+                    update_fields=upsert_fields(exclude=kept),
+                )
+            refresh_derived(pending)
+        for video_id, pk in existing_pks.items():
+            pending[video_id].pk = pk
+
+    created_videos = VideoSerializer([pending[i] for i in created_ids], many=True).data
+    updated_videos = VideoSerializer([pending[i] for i in updated_ids], many=True).data
+    return created_videos, updated_videos, errors
+
+
+def _create_chunk(chunk, serializer):
+    """
+    Validate and insert one chunk of a streamed upload.
+
+    Args:
+        chunk: A list of (line_number, video) tuples.
+        serializer: The BulkVideoSerializer used to validate each video.
+
+    Returns:
+        tuple: (created_count, errors) where errors is a list of
+            {"line": ..., "video": ..., "error": ...} dicts.
+    """
+    errors = []
+    video_ids = {
+        video.get("video_id") for _, video in chunk if isinstance(video, dict)
+    }
+    taken = set(load_existing_videos(video_id for video_id in video_ids if video_id))
+
+    rows = []
+    for line, video in chunk:
+        try:
+            validated_data = serializer.run_validation(video)
+        except serializers.ValidationError as e:
+            errors.append({"line": line, "video": video, "error": e.detail})
+            continue
+        if validated_data["video_id"] in taken:
+            errors.append(
+                {
+                    "line": line,
+                    "video": video,
+                    "error": {"video_id": ["video with this video id already exists."]},
+                }
+            )
+            continue
+        taken.add(validated_data["video_id"])
+        instance = Video(**validated_data)
+        instance.sync_typed_fields()
+        rows.append((line, video, instance))
+
+    if not rows:
+        return 0, errors
+    try:
+        with transaction.atomic():
+            Video.objects.bulk_create([instance for _, _, instance in rows])
+            refresh_derived(instance.video_id for _, _, instance in rows)
+    except IntegrityError as e:
+        # Another writer inserted one of these video_ids since the lookup above.
+        errors.extend(
+            {"line": line, "video": video, "error": str(e)} for line, video, _ in rows
+        )
+        return 0, errors
+    return len(rows), errors
+
+
+def ingest_video_lines(lines, chunk_size=INGEST_CHUNK_SIZE):
+    """
+    Create videos from an iterable of NDJSON lines.
+
+    Lines are consumed lazily and written in chunks of chunk_size, so memory use
+    depends on the chunk size rather than on the size of the upload. Blank lines
+    are skipped.
+
+    Args:
+        lines: An iterable of bytes or str, one JSON encoded video per line.
+        chunk_size: The number of videos validated and inserted at a time.
+
+    Returns:
+        dict: {"created": ..., "failed": ..., "errors": [...]} where errors holds
+            at most MAX_REPORTED_ERRORS failing rows with their line numbers.
+    """
+    serializer = BulkVideoSerializer()
+    summary = {"created": 0, "failed": 0, "errors": []}
+
+    def report(errors):
+        summary["failed"] += len(errors)
+        room = MAX_REPORTED_ERRORS - len(summary["errors"])
+        summary["errors"].extend(errors[:room])
+
+    chunk = []
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            chunk.append((line_number, json.loads(line)))
+        except ValueError as e:
+            report([{"line": line_number, "video": None, "error": f"Invalid JSON: {e}"}])
+            continue
+        if len(chunk) >= chunk_size:
+            created, errors = _create_chunk(chunk, serializer)
+            summary["created"] += created
+            report(errors)
+            chunk = []
+    if chunk:
+        created, errors = _create_chunk(chunk, serializer)
+        summary["created"] += created
+        report(errors)
+    return summary
+
+
+def claim_import_job(stale_after=STALE_JOB_SECONDS):
+    """
+    Claim the oldest pending import job, or a running one whose worker died.
+
+    The claim is a conditional UPDATE, so concurrent workers never claim the
+    same job without needing row locks.
+
+    Args:
+        stale_after: Seconds without progress after which a running job is reclaimed.
+
+    Returns:
+        VideoImportJob: The claimed job, or None if there is nothing to do.
+    """
+    now = timezone.now()
+    claimable = VideoImportJob.objects.filter(
+        Q(status=VideoImportJob.PENDING)
+        | Q(status=VideoImportJob.RUNNING, updated_at__lt=now - timedelta(seconds=stale_after))
+    )
+    for pk in claimable.order_by("id").values_list("pk", flat=True)[:10]:
+        if claimable.filter(pk=pk).update(
+            status=VideoImportJob.RUNNING, started_at=now, updated_at=now
+        ):
+            return VideoImportJob.objects.get(pk=pk)
+    return None
+
+
+def run_import_job(job, chunk_size=INGEST_CHUNK_SIZE):
+    """
+    Run an import job chunk by chunk, recording progress after every chunk.
+
+    Each chunk is written in its own transaction and invalidates the cached
+    video responses, so clients see the import land progressively. Errors of
+    create jobs carry the 1-based position of the video in the payload as "line".
+
+    Args:
+        job: The claimed VideoImportJob.
+        chunk_size: The number of videos written per transaction.
+    """
+    serializer = BulkVideoSerializer()
+    progress_fields = ["processed", "created", "updated", "failed", "errors", "updated_at"]
+    try:
+        while job.processed < job.total:
+            start = job.processed
+            chunk = job.payload[start : start + chunk_size]
+            if job.kind == VideoImportJob.UPSERT:
+                created_videos, updated_videos, errors = upsert_videos(chunk)
+                job.created += len(created_videos)
+                job.updated += len(updated_videos)
+            else:
+                created, errors = _create_chunk(list(enumerate(chunk, start=start + 1)), serializer)
+                job.created += created
+            job.failed += len(errors)
+            job.errors += errors[: MAX_REPORTED_ERRORS - len(job.errors)]
+            job.processed = start + len(chunk)
+            job.save(update_fields=progress_fields)
+            bump_generation(VIDEO_CACHE_NAMESPACE)
+        job.status = VideoImportJob.SUCCEEDED
+    except Exception as e:
+        job.status = VideoImportJob.FAILED
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "error", "finished_at", "updated_at"])
@@ -0,0 +1,280 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpResponse
+
+from .compression import choose_encoding
+from .compression import compress
+from .compression import encode_content
+from .compression import get_min_size
+from .compression import is_compressible
+from .conditional import compute_etag
+from .conditional import conditional_response
+
+HIT = "HIT"
+MISS = "MISS"
+# The response cache namespaces, see VideoViewSet and TopicTreeViewSet.
+VIDEO_CACHE_NAMESPACE = "videos"
+TOPIC_CACHE_NAMESPACE = "topics"
+# Response headers replayed on a cache hit.
+STORED_HEADERS = ("ETag", "Last-Modified")
+
+
+def get_cache():
+    """
+    Return the cache backend used for API responses.
+
+    The alias is read from settings.API_CACHE_ALIAS so the response cache can be
+    moved to its own backend (e.g. Redis) without touching the views.
+    """
+    return caches[getattr(settings, "API_CACHE_ALIAS", "default")]
+
+
+def is_process_local():
+    """
+    Return whether the response cache is the in-process locmem cache.
+
+    Its generations are then per process, so a write made by another process,
+    e.g. the run_import_jobs worker, does not invalidate this process' responses.
+    """
+    return isinstance(get_cache(), LocMemCache)
+
+
+def get_timeout():
+    return getattr(settings, "API_CACHE_TIMEOUT", 300)
+
+
+def _generation_key(namespace):
+    return f"{namespace}:generation"
+
+
+def get_generation(namespace):
+    """
+    Return the current generation of a namespace.
+
+    A missing counter is started from the current time in nanoseconds rather than
+    from 1, so an evicted counter never comes back at a value that old entries
+    were stored under.
+
+    Args:
+        namespace: The namespace, e.g. "videos".
+
+    Returns:
+        int: The generation to build cache keys with.
+    """
+    cache = get_cache()
+    key = _generation_key(namespace)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key, 0)
+    return generation
+
+
+def bump_generation(namespace):
+    """
+    Invalidate every cached response of a namespace.
+
+    Entries are not deleted, they are keyed by the generation and simply stop
+    being looked up once it moves on.
+
+    Args:
+        namespace: The namespace, e.g. "videos".
+    """
+    cache = get_cache()
+    try:
+        cache.incr(_generation_key(namespace))
+    except ValueError:
+        cache.add(_generation_key(namespace), time.time_ns(), None)
+
+
+def _count(namespace, outcome):
+    cache = get_cache()
+    key = f"{namespace}:stats:{outcome.lower()}"
+    if not cache.add(key, 1, None):
+        cache.incr(key)
+
+
+def get_cache_stats(namespace):
+    """
+    Return the hit and miss counters of a namespace.
+
+    Returns:
+        dict: {"hits": ..., "misses": ..., "generation": ...}
+    """
+    cache = get_cache()
+    return {
+        "hits": cache.get(f"{namespace}:stats:hit", 0),
+        "misses": cache.get(f"{namespace}:stats:miss", 0),
+        "generation": get_generation(namespace),
+    }
+
+
+class ResponseCacheMixin:
+    """
+    A viewset mixin caching the rendered responses of anonymous GET requests.
+
+    Entries are keyed by the namespace generation, the action, the negotiated
+    renderer and the normalized query string. Writes call bump_generation, so a
+    response is never served from cache after the data it was built from changed.
+    The key is computed before the queryset is evaluated, so a response built
+    while a write lands is stored under the old generation and never read.
+    Compressed bodies are stored next to the plain one, one per encoding, so a
+    hit is served without compressing it again.
+
+    Generations live in the cache backend, so the guarantee holds across
+    processes only with a shared backend such as Redis. With locmem each
+    process has its own generations and other workers keep serving their
+    entries for up to API_CACHE_TIMEOUT seconds after a write.
+    """
+
+    cache_namespace = None
+    # Other namespaces whose writes also invalidate this viewset's responses.
+    cache_depends_on = []
+    # Actions that write to the cached data. Their successful and partial (2xx)
+    # responses bump the namespace generation. Error responses do not: the
+    # request was refused, e.g. an anonymous write, or every item failed.
+    cache_invalidating_actions = []
+    # Whether generation ETags also change every API_CACHE_TIMEOUT seconds, for
+    # responses holding data written without a bump, like the buffered counters.
+    etag_expires = False
+
+    def is_cacheable(self, request):
+        return request.method in ("GET", "HEAD") and not request.user.is_authenticated
+
+    def get_response_cache_key(self, request):
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        raw = ":".join(
+            [
+                self.action,
+                request.accepted_renderer.format,
+                request.get_host(),
+                request.path,
+                query,
+            ]
+        )
+        digest = hashlib.md5(raw.encode()).hexdigest()
+        return f"{self.cache_namespace}:response:{self.get_generations()}:{digest}"
+
+    def get_generations(self):
+        """
+        Return the current generations of the namespace and the ones it depends on.
+
+        Returns:
+            str: The generations joined with dots.
+        """
+        return ".".join(
+            str(get_generation(namespace))
+            for namespace in [self.cache_namespace, *self.cache_depends_on]
+        )
+
+    def get_generation_etag(self, request):
+        """
+        Return an ETag that changes whenever the cached data is written, or None
+        when the cache is process-local.
+
+        The generations bumped by every write serve as a version of the whole
+        catalog, so a list's ETag costs no query however large the list. With
+        locmem a write made by another process does not move this process'
+        generations, and a client would be told its stale copy is current.
+        """
+        if is_process_local():
+            return None
+        if self.etag_expires:
+            return compute_etag(request, self.get_generations(), int(time.time() // get_timeout()))
+        return compute_etag(request, self.get_generations())
+
+    def get_cached_response(self, request):
+        """
+        Return the cached response for the request, or None on a miss.
+
+        On a miss the cache key is remembered so store_response can use it.
+        """
+        self._response_cache_key = None
+        if not self.is_cacheable(request):
+            return None
+        key = self.get_response_cache_key(request)
+        entry = get_cache().get(key)
+        if entry is None:
+            _count(self.cache_namespace, MISS)
+            self._response_cache_key = key
+            return None
+        _count(self.cache_namespace, HIT)
+        response = HttpResponse(entry["content"], content_type=entry["content_type"])
+        for header, value in entry["headers"].items():
+            response[header] = value
+        response["X-Cache"] = HIT
+        response = conditional_response(request, response)
+        if response.status_code == 200:
+            self.encode_cached_response(request, response, key, entry)
+        return response
+
+    def encode_cached_response(self, request, response, key, entry):
+        """
+        Compress a cached response for the request's Accept-Encoding.
+
+        The compressed body is taken from the entry, or compressed once and
+        added to it, so later hits with the same encoding reuse it.
+        """
+        encoding = self.get_response_encoding(request, response)
+        if encoding is None:
+            return
+        encoded = entry.setdefault("encoded", {})
+        if encoding not in encoded:
+            encoded[encoding] = compress(entry["content"], encoding)
+            get_cache().set(key, entry, get_timeout())
+        encode_content(response, encoded[encoding], encoding)
+
+    def get_response_encoding(self, request, response):
+        """
+        Return the encoding to compress the response with, or None to leave it
+        to CompressionMiddleware (which skips small and incompressible bodies).
+        """
+        if not is_compressible(response) or len(response.content) < get_min_size():
+            return None
+        return choose_encoding(request)
+
+    def store_response(self, response):
+        """
+        Store the response once it has been rendered.
+
+        Returns:
+            Response: The same response, for chaining.
+        """
+        key = getattr(self, "_response_cache_key", None)
+        if key is None or response.status_code != 200:
+            return response
+
+        request = self.request
+
+        def store(rendered):
+            entry = {
+                "content": rendered.content,
+                "content_type": rendered["Content-Type"],
+                "headers": {h: rendered[h] for h in STORED_HEADERS if rendered.has_header(h)},
+                "encoded": {},
+            }
+            encoding = self.get_response_encoding(request, rendered)
+            if encoding is not None:
+                entry["encoded"][encoding] = compress(rendered.content, encoding)
+                encode_content(rendered, entry["encoded"][encoding], encoding)
+            get_cache().set(key, entry, get_timeout())
+
+        response.add_post_render_callback(store)
+        response["X-Cache"] = MISS
+        return response
+
+    def invalidate_cached_responses(self):
+        """
+        Invalidate every cached response of this viewset's namespace.
+        """
+        bump_generation(self.cache_namespace)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self.action in self.cache_invalidating_actions and response.status_code < 400:
+            self.invalidate_cached_responses()
+        return super().finalize_response(request, response, *args, **kwargs)
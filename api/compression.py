@@ -0,0 +1,169 @@
+import re
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP = "gzip"
+BROTLI = "br"
+# Brotli's default quality of 11 is meant for static assets: on a 50 video
+# page it takes 85 ms against 0.5 ms at quality 5, for an 11% smaller body.
+# See the compression benchmark.
+BROTLI_QUALITY = 5
+# The API's JSON types. HTML pages are left out: the admin and browsable API
+# pages carry CSRF tokens next to reflected input, and compressing them would
+# expose the tokens to BREACH.
+COMPRESSIBLE_TYPES = re.compile(r"^(application/(json|x-ndjson)|[^;]*\+json)", re.IGNORECASE)
+ACCEPT_ENCODING_ITEM = re.compile(r"\s*([^\s;,]+)\s*(?:;\s*q=([0-9.]+))?")
+
+
+def get_min_size():
+    return getattr(settings, "API_COMPRESSION_MIN_SIZE", 1024)
+
+
+def supported_encodings():
+    """
+    Return the encodings the server can produce, most preferred first.
+    """
+    return [BROTLI, GZIP] if brotli is not None else [GZIP]
+
+
+def choose_encoding(request):
+    """
+    Pick the response encoding from the request's Accept-Encoding header.
+
+    Brotli is preferred over gzip when both are accepted with the same quality.
+    An encoding with q=0 is refused, "*" accepts any encoding.
+
+    Returns:
+        str: "br", "gzip" or None to send the response uncompressed.
+    """
+    header = request.META.get("HTTP_ACCEPT_ENCODING", "")
+    qualities = {}
+    for match in ACCEPT_ENCODING_ITEM.finditer(header):
+        try:
+            qualities[match[1].lower()] = float(match[2]) if match[2] else 1.0
+        except ValueError:
+            continue
+    best, best_quality = None, 0.0
+    for encoding in supported_encodings():
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def is_compressible(response):
+    """
+    Return whether a response may be compressed: a compressible content type
+    that is not already encoded.
+    """
+    return (
+        not response.has_header("Content-Encoding")
+        and bool(COMPRESSIBLE_TYPES.match(response.get("Content-Type", "")))
+    )
+
+
+def compress(content, encoding):
+    if encoding == BROTLI:
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    return compress_string(content)
+
+
+def _stream_compressor(encoding):
+    """
+    Return (process, flush, finish) callables of an incremental compressor.
+    """
+    if encoding == BROTLI:
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        return compressor.process, compressor.flush, compressor.finish
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+def compress_stream(sequence, encoding):
+    """
+    Compress an iterable of bytes item by item, flushing after each item so a
+    streamed response reaches the client as it is produced.
+    """
+    process, flush, finish = _stream_compressor(encoding)
+    for item in sequence:
+        yield process(item) + flush()
+    yield finish()
+
+
+async def acompress_stream(sequence, encoding):
+    """
+    The async iterable counterpart of compress_stream.
+    """
+    process, flush, finish = _stream_compressor(encoding)
+    async for item in sequence:
+        yield process(item) + flush()
+    yield finish()
+
+
+def set_encoding(response, encoding):
+    """
+    Set the headers of a response whose body is now encoded with the given encoding.
+
+    A strong ETag is weakened, as the encoded bytes differ from the ones it was
+    computed for, the same way Django's GZipMiddleware does.
+    """
+    etag = response.get("ETag")
+    if etag and etag.startswith('"'):
+        response.headers["ETag"] = "W/" + etag
+    response.headers["Content-Encoding"] = encoding
+    patch_vary_headers(response, ("Accept-Encoding",))
+
+
+def encode_content(response, content, encoding):
+    """
+    Replace a response's body with already encoded content and set its headers.
+    """
+    response.content = content
+    response.headers["Content-Length"] = str(len(content))
+    set_encoding(response, encoding)
+    return response
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress API responses with brotli (when installed) or gzip.
+
+    Only JSON responses are compressed, see COMPRESSIBLE_TYPES. The encoding
+    is negotiated from Accept-Encoding. Bodies smaller than
+    settings.API_COMPRESSION_MIN_SIZE bytes are sent as they are, streaming
+    responses are compressed chunk by chunk without being buffered. Responses
+    that already carry a Content-Encoding, such as cached responses stored
+    compressed by ResponseCacheMixin, are left alone. Runs in sync and async
+    middleware chains, like Django's GZipMiddleware.
+    """
+
+    def process_response(self, request, response):
+        if not is_compressible(response):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = choose_encoding(request)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            wrap = acompress_stream if response.is_async else compress_stream
+            response.streaming_content = wrap(response.streaming_content, encoding)
+            del response.headers["Content-Length"]
+            set_encoding(response, encoding)
+            return response
+
+        if len(response.content) < get_min_size():
+            return response
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+        return encode_content(response, compressed, encoding)
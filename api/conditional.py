@@ -0,0 +1,89 @@
+import hashlib
+from calendar import timegm
+from urllib.parse import urlencode
+
+from django.utils.cache import get_conditional_response
+from django.utils.cache import quote_etag
+from django.utils.http import http_date
+from django.utils.http import parse_http_date_safe
+
+
+def compute_etag(request, *parts):
+    """
+    Build a strong ETag from the request and the given validator parts.
+
+    The path, normalized query string and negotiated renderer are part of the tag
+    so different filter sets and formats never share one.
+
+    Args:
+        request: The request being answered.
+        *parts: Values that change whenever the response body would change.
+
+    Returns:
+        str: The quoted ETag.
+    """
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    renderer = getattr(request, "accepted_renderer", None)
+    raw = ":".join(
+        [request.path, query, getattr(renderer, "format", "")] + [str(part) for part in parts]
+    )
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def object_validators(request, instance, field="updated_at"):
+    """
+    Compute the ETag and Last-Modified of a single instance.
+
+    Returns:
+        tuple: (etag, last_modified)
+    """
+    last_modified = getattr(instance, field)
+    return compute_etag(request, instance.pk, last_modified), last_modified
+
+
+def not_modified(request, etag, last_modified):
+    """
+    Return a 304 response if the request's conditional headers match.
+
+    Args:
+        request: The request being answered.
+        etag: The current ETag.
+        last_modified: The current last-modified datetime, or None.
+
+    Returns:
+        HttpResponseNotModified: When the client's copy is current, otherwise None.
+    """
+    timestamp = timegm(last_modified.utctimetuple()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def conditional_response(request, response):
+    """
+    Turn a complete response into a 304 if it matches the request's validators.
+
+    Used for responses replayed from the cache, which carry their ETag and
+    Last-Modified headers.
+
+    Returns:
+        HttpResponse: The response itself or a 304 response.
+    """
+    last_modified = parse_http_date_safe(response.get("Last-Modified", ""))
+    return get_conditional_response(
+        request, etag=response.get("ETag"), last_modified=last_modified, response=response
+    )
+
+
+def set_validators(response, etag, last_modified):
+    """
+    Set the ETag and Last-Modified headers on a response.
+
+    Returns:
+        HttpResponse: The same response, for chaining.
+    """
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(timegm(last_modified.utctimetuple()))
+    return response
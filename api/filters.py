@@ -0,0 +1,90 @@
+from django.db.models import Q
+from django_filters import rest_framework as filters
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+
+from videos.models import Video
+from videos.tags import tagged_video_ids
+
+# The fields videos can be ordered by with ?ordering=.
+VIDEO_ORDERING_FIELDS = ["likes", "views", "publishedAt"]
+
+
+class VideoFilter(filters.FilterSet):
+    """
+    A filter set for the Video model.
+
+    Date and duration ranges run against the typed published_at and
+    duration_seconds columns. Durations are given in seconds. tags takes a comma
+    separated list and matches any of them, tags__all requires all of them.
+    topic_id and subtopic_id match the ids of the topic tree through subtopic_ref.
+    ids takes up to MAX_IDS comma separated video_ids, or ids prefixed with "id:".
+    """
+
+    MAX_IDS = 100
+
+    ids = filters.CharFilter(method="filter_ids")
+    published_after = filters.DateTimeFilter(field_name="published_at", lookup_expr="gte")
+    published_before = filters.DateTimeFilter(field_name="published_at", lookup_expr="lte")
+    min_duration = filters.NumberFilter(field_name="duration_seconds", lookup_expr="gte")
+    max_duration = filters.NumberFilter(field_name="duration_seconds", lookup_expr="lte")
+    topic_id = filters.NumberFilter(field_name="subtopic_ref__topic_id")
+    subtopic_id = filters.NumberFilter(field_name="subtopic_ref_id")
+    tags = filters.CharFilter(method="filter_tags")
+    tags__all = filters.CharFilter(method="filter_tags")
+
+    class Meta:
+        """
+        Meta options for the VideoFilter class.
+        """
+        model = Video
+        fields = {
+            "topic": ["exact"],
+            "video_id": ["exact"],
+            "subtopic": ["exact"],
+            "likes": ["exact", "gte", "lte", "range"],
+            "views": ["exact", "gte", "lte", "range"],
+        }
+
+    @staticmethod
+    def split_ids(value):
+        """
+        Return the distinct identifiers of an ?ids= value, in order.
+        """
+        return list(dict.fromkeys(i.strip() for i in value.split(",") if i.strip()))
+
+    def filter_ids(self, queryset, name, value):
+        identifiers = self.split_ids(value)
+        if len(identifiers) > self.MAX_IDS:
+            raise ValidationError({"ids": [f"At most {self.MAX_IDS} ids can be requested at once."]})
+        pks = [i[3:] for i in identifiers if i.startswith("id:") and i[3:].isdigit()]
+        video_ids = [i.removeprefix("video:") for i in identifiers if not i.startswith("id:")]
+        return queryset.filter(Q(pk__in=pks) | Q(video_id__in=video_ids))
+
+    def filter_tags(self, queryset, name, value):
+        names = {tag.strip() for tag in value.split(",") if tag.strip()}
+        if not names:
+            return queryset
+        return queryset.filter(pk__in=tagged_video_ids(names, match_all=name == "tags__all"))
+
+
+class VideoOrderingFilter(OrderingFilter):
+    """
+    An OrderingFilter that sorts the string fields by their typed columns.
+
+    Clients keep ordering by publishedAt, which is mapped to published_at so dates
+    are compared as dates rather than strings.
+    """
+
+    field_map = {"publishedAt": "published_at"}
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        return [self.map_term(term) for term in ordering]
+
+    def map_term(self, term):
+        prefix = "-" if term.startswith("-") else ""
+        name = term.lstrip("-")
+        return prefix + self.field_map.get(name, name)
@@ -0,0 +1,241 @@
+import json
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction
+from asgiref.sync import markcoroutinefunction
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger("api.performance")
+
+
+def get_sample_rate():
+    return getattr(settings, "API_INSTRUMENTATION_SAMPLE_RATE", 0.0)
+
+
+def get_duplicate_threshold():
+    return getattr(settings, "API_INSTRUMENTATION_DUPLICATE_THRESHOLD", 3)
+
+
+def get_metrics(request):
+    """
+    Return the metrics recorded for a request, or None if it is not sampled.
+    Works with both Django and DRF requests.
+    """
+    return getattr(request, "performance_metrics", None)
+
+
+def watch_queries(metrics):
+    """
+    Record every query of the current thread's connections in metrics.
+
+    Returns:
+        ExitStack: Close it to stop recording.
+    """
+    stack = ExitStack()
+    for alias in connections:
+        stack.enter_context(connections[alias].execute_wrapper(metrics))
+    return stack
+
+
+class RequestMetrics:
+    """
+    The performance measurements of one sampled request.
+
+    Attributes:
+        queries (int): The number of executed SQL queries.
+        db_time (float): The seconds spent executing them.
+        statements (Counter): How often each SQL statement, without its
+            parameters, was executed.
+        timings (dict): Seconds spent per phase, e.g. "serialize" and "render".
+            Database time spent during a phase is not counted in it.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+        self.timings = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        """
+        Record a query, installed with connection.execute_wrapper.
+        """
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.statements[sql] += 1
+
+    @contextmanager
+    def timer(self, phase):
+        """
+        Add the time spent in the block, less its database time, to a phase.
+        """
+        start, db_time = time.perf_counter(), self.db_time
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start - (self.db_time - db_time)
+            self.timings[phase] = self.timings.get(phase, 0.0) + elapsed
+
+    def time_serializer(self, serializer):
+        """
+        Time the serializer's output under the "serialize" phase.
+        """
+        to_representation = serializer.to_representation
+
+        def timed(instance):
+            with self.timer("serialize"):
+                return to_representation(instance)
+
+        serializer.to_representation = timed
+
+    def duplicate_queries(self):
+        """
+        Return the statements executed at least API_INSTRUMENTATION_DUPLICATE_THRESHOLD
+        times, the signature of an N+1 query, most repeated first.
+
+        Returns:
+            list: [{"sql": ..., "count": ...}]
+        """
+        threshold = get_duplicate_threshold()
+        return [
+            {"sql": sql, "count": count}
+            for sql, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+    def server_timing(self, total, duplicates):
+        """
+        Return the Server-Timing header value, durations in milliseconds.
+        """
+        entries = [f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"']
+        entries.extend(
+            f"{phase};dur={duration * 1000:.1f}" for phase, duration in self.timings.items()
+        )
+        if duplicates:
+            entries.append(f'dup;desc="{len(duplicates)} repeated queries"')
+        entries.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(entries)
+
+
+class InstrumentationMiddleware:
+    """
+    Measure a sample of the requests and report them.
+
+    A fraction settings.API_INSTRUMENTATION_SAMPLE_RATE of the requests is
+    sampled. For those every database query is counted and timed, and the
+    InstrumentedViewMixin views add their serialize and render time. The
+    results are sent in a Server-Timing header and logged as one JSON line to
+    the "api.performance" logger, at warning level when queries were repeated.
+    Unsampled requests only cost a random number.
+
+    Runs in sync and async middleware chains. Database connections belong to a
+    thread, and an async request runs its queries in the thread its sync code
+    is sent to, so the query wrappers are installed there.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= get_sample_rate():
+            return self.get_response(request)
+
+        metrics = request.performance_metrics = RequestMetrics()
+        with watch_queries(metrics):
+            response = self.get_response(request)
+        return self.report(request, response, metrics)
+
+    async def __acall__(self, request):
+        if random.random() >= get_sample_rate():
+            return await self.get_response(request)
+
+        metrics = request.performance_metrics = RequestMetrics()
+        watching = await sync_to_async(watch_queries)(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(watching.close)()
+        return self.report(request, response, metrics)
+
+    def report(self, request, response, metrics):
+        total = time.perf_counter() - metrics.started
+
+        duplicates = metrics.duplicate_queries()
+        response["Server-Timing"] = metrics.server_timing(total, duplicates)
+        self.log(request, response, metrics, total, duplicates)
+        return response
+
+    def log(self, request, response, metrics, total, duplicates):
+        match = request.resolver_match
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "duration_ms": round(total * 1000, 1),
+            "db_queries": metrics.queries,
+            "db_ms": round(metrics.db_time * 1000, 1),
+            **{
+                f"{phase}_ms": round(duration * 1000, 1)
+                for phase, duration in metrics.timings.items()
+            },
+            # Streamed bodies are not buffered to be measured.
+            "response_bytes": None if response.streaming else len(response.content),
+            "duplicate_queries": duplicates,
+        }
+        level = logging.WARNING if duplicates else logging.INFO
+        logger.log(level, json.dumps(record))
+
+
+class InstrumentedViewMixin:
+    """
+    A viewset mixin adding serialize and render time to sampled requests'
+    metrics, see InstrumentationMiddleware.
+
+    Serializers are timed when built with get_serializer, views building them
+    otherwise pass them through time_serializer. The response is rendered in
+    finalize_response to time it, instead of by Django right after the view
+    returns.
+    """
+
+    def time_serializer(self, serializer):
+        """
+        Time the serializer's output if the request is sampled.
+
+        Returns:
+            Serializer: The same serializer, for chaining.
+        """
+        metrics = get_metrics(self.request)
+        if metrics is not None:
+            metrics.time_serializer(serializer)
+        return serializer
+
+    def get_serializer(self, *args, **kwargs):
+        return self.time_serializer(super().get_serializer(*args, **kwargs))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        metrics = get_metrics(request)
+        if metrics is not None and not getattr(response, "is_rendered", True):
+            with metrics.timer("render"):
+                response.render()
+        return response
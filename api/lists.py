@@ -0,0 +1,121 @@
+from django.db import transaction
+from django.db.models import Max
+from rest_framework import serializers
+
+from users.models import ListVideo
+from users.models import UserVideoList
+
+POSITION_GAP = ListVideo.POSITION_GAP
+WRITE_BATCH_SIZE = 500
+
+
+def _lock_list(video_list):
+    """
+    Lock the list row so concurrent edits of one list are applied one at a time.
+    Must be called inside a transaction.
+    """
+    UserVideoList.objects.select_for_update().filter(pk=video_list.pk).exists()
+
+
+def append_videos(video_list, video_ids):
+    """
+    Append videos to the end of a list, skipping the ones already in it.
+
+    Args:
+        video_list: The UserVideoList to append to.
+        video_ids: The video_ids to append, in order.
+
+    Returns:
+        tuple: (added, already_listed) lists of video_ids.
+    """
+    with transaction.atomic():
+        _lock_list(video_list)
+        entries = video_list.entries.all()
+        already_listed = set(
+            entries.filter(video_id__in=video_ids).values_list("video_id", flat=True)
+        )
+        last = entries.aggregate(last=Max("position"))["last"] or 0
+        added = [video_id for video_id in video_ids if video_id not in already_listed]
+        ListVideo.objects.bulk_create(
+            [
+                ListVideo(list_id=video_list, video_id=video_id, position=last + POSITION_GAP * i)
+                for i, video_id in enumerate(added, start=1)
+            ],
+            batch_size=WRITE_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+    return added, [video_id for video_id in video_ids if video_id in already_listed]
+
+
+def remove_videos(video_list, video_ids):
+    """
+    Remove videos from a list with a single DELETE.
+
+    Returns:
+        int: The number of removed entries.
+    """
+    deleted, _ = video_list.entries.filter(video_id__in=video_ids).delete()
+    return deleted
+
+
+def move_videos(video_list, video_ids, after=None):
+    """
+    Move a block of videos to directly after another video of the list.
+
+    The block takes evenly spaced positions in the gap between its new
+    neighbours, so only the moved rows are written. When the gap is too small
+    the whole list is renumbered POSITION_GAP apart, which opens the gaps again.
+
+    Args:
+        video_list: The UserVideoList to reorder.
+        video_ids: The video_ids to move, in their new order.
+        after: The video_id to move them after, or None to move them to the top.
+
+    Returns:
+        int: The number of rows written.
+
+    Raises:
+        ValidationError: If a video_id or the anchor is not in the list.
+    """
+    with transaction.atomic():
+        _lock_list(video_list)
+        # Not video_list.entries: the related manager sets list_id on every
+        # row it loads, which would load the deferred column one row at a time.
+        entries = list(
+            ListVideo.objects.filter(list_id=video_list)
+            .only("id", "video_id", "position")
+            .order_by("position", "id")
+        )
+        by_video_id = {entry.video_id: entry for entry in entries}
+
+        missing = [video_id for video_id in video_ids if video_id not in by_video_id]
+        if missing:
+            raise serializers.ValidationError({"video_ids": [f"Not in the list: {', '.join(missing)}"]})
+        moved_ids = set(video_ids)
+        if after is not None and (after not in by_video_id or after in moved_ids):
+            raise serializers.ValidationError({"after": ["Must be a video in the list that is not moved."]})
+
+        moved = [by_video_id[video_id] for video_id in video_ids]
+        rest = [entry for entry in entries if entry.video_id not in moved_ids]
+        index = 0 if after is None else rest.index(by_video_id[after]) + 1
+
+        lower = rest[index - 1].position if index > 0 else 0
+        if index < len(rest):
+            upper = rest[index].position
+        else:
+            upper = lower + POSITION_GAP * (len(moved) + 1)
+        step = (upper - lower) // (len(moved) + 1)
+
+        if step > 0:
+            changed = moved
+            for i, entry in enumerate(moved, start=1):
+                entry.position = lower + step * i
+        else:
+            changed = []
+            for i, entry in enumerate(rest[:index] + moved + rest[index:], start=1):
+                if entry.position != i * POSITION_GAP:
+                    entry.position = i * POSITION_GAP
+                    changed.append(entry)
+
+        ListVideo.objects.bulk_update(changed, ["position"], batch_size=WRITE_BATCH_SIZE)
+    return len(changed)
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from api.benchmarks import SCENARIOS
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a benchmark against a throwaway test database and print its measurements. "
+        "The configured database is never written to."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("scenario", choices=sorted(SCENARIOS), help="The benchmark to run.")
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            help="The sizes to run the benchmark at, defaults to the sizes it was written for.",
+        )
+
+    def handle(self, *args, **options):
+        function, sizes = SCENARIOS[options["scenario"]]
+        sizes = options["sizes"] or sizes
+        if any(size < 1 for size in sizes):
+            raise CommandError("Sizes must be positive.")
+
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # Sampled requests would add their instrumentation to the timings.
+            with override_settings(API_INSTRUMENTATION_SAMPLE_RATE=0):
+                for size in sizes:
+                    self.stdout.write(self.format_row({"size": size, **function(size)}))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def format_row(self, row):
+        return "  ".join(f"{key}={value}" for key, value in row.items())
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import close_old_connections
+
+from api.bulk import claim_import_job
+from api.bulk import run_import_job
+from api.cache import is_process_local
+
+
+class Command(BaseCommand):
+    help = "Run queued bulk video import jobs, polling the database for new ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once no job is left instead of polling for new ones.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between polls when the queue is empty.",
+        )
+
+    def handle(self, *args, **options):
+        if is_process_local():
+            raise CommandError(
+                "The cache is in-process, the web processes would keep serving the videos "
+                "cached before an import. Set REDIS_URL to share it."
+            )
+        while True:
+            # Drop connections that timed out or broke while idle, like a request would.
+            close_old_connections()
+            job = claim_import_job()
+            if job is None:
+                if options["once"]:
+                    return
+                time.sleep(options["sleep"])
+                continue
+            self.stdout.write(f"Running import job {job.pk} ({job.total} videos).")
+            run_import_job(job)
+            self.stdout.write(
+                f"Import job {job.pk} {job.status}: {job.created} created, "
+                f"{job.updated} updated, {job.failed} failed."
+            )
@@ -1,3 +1,71 @@
+from django.conf import settings
 from django.db import models
 
+
 # Create your models here.
+class VideoImportJob(models.Model):
+    """
+    A model representing a bulk video import queued for the background worker.
+
+    Jobs are created by the bulk endpoints when called with ?async=1 and
+    consumed by the run_import_jobs management command, see api.bulk.run_import_job.
+
+    Attributes:
+        kind (str): "create" to create the videos, "upsert" to update or create them.
+        status (str): pending, running, succeeded or failed.
+        payload (list): The posted videos.
+        total (int): The number of videos in the payload.
+        processed (int): The number of videos handled so far, the worker resumes from here.
+        created (int): The number of created videos.
+        updated (int): The number of updated videos.
+        failed (int): The number of failing videos.
+        errors (list): The first failing videos with their index and error.
+        error (str): Why the job as a whole failed, if it did.
+        created_by (User): The admin who queued the job.
+        created_at (datetime): When the job was queued.
+        started_at (datetime): When a worker claimed the job.
+        finished_at (datetime): When the job finished.
+        updated_at (datetime): When the job last made progress.
+    """
+
+    CREATE = "create"
+    UPSERT = "upsert"
+    KIND_CHOICES = [(CREATE, "Create"), (UPSERT, "Update or create")]
+
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    payload = models.JSONField(default=list)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    updated = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Serves the worker's "oldest claimable job" lookup.
+        indexes = [
+            models.Index(fields=["status", "id"], name="importjob_status_id_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} job {self.pk} ({self.status})"
@@ -0,0 +1,233 @@
+import base64
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param
+from rest_framework.utils.urls import replace_query_param
+
+COUNT_EXACT = "exact"
+COUNT_ESTIMATE = "estimate"
+COUNT_NONE = "none"
+COUNT_MODES = (COUNT_EXACT, COUNT_ESTIMATE, COUNT_NONE)
+# How long an estimated count is reused before the COUNT(*) runs again.
+COUNT_ESTIMATE_TIMEOUT = 300
+
+
+def get_count_mode(params, default):
+    """
+    Read the requested count mode from the ?count= query parameter.
+
+    Args:
+        params: The query parameters, request.query_params or a Django request's GET.
+        default: The mode used when the parameter is missing or unknown.
+
+    Returns:
+        str: One of COUNT_EXACT, COUNT_ESTIMATE or COUNT_NONE.
+    """
+    mode = params.get("count", default)
+    return mode if mode in COUNT_MODES else default
+
+
+def estimate_count(queryset):
+    """
+    Return a cached row count for the queryset.
+
+    The count is cached per SQL statement, so every page of the same filter set
+    shares one COUNT(*) for COUNT_ESTIMATE_TIMEOUT seconds.
+
+    Args:
+        queryset: The filtered queryset being paginated.
+
+    Returns:
+        int: The number of rows, possibly up to COUNT_ESTIMATE_TIMEOUT seconds old.
+    """
+    sql = str(queryset.order_by().query)
+    key = "count-estimate:" + hashlib.md5(sql.encode()).hexdigest()
+    return cache.get_or_set(key, queryset.count, COUNT_ESTIMATE_TIMEOUT)
+
+
+class CustomLimitOffsetPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination with an optional ?count=estimate|none.
+
+    count=exact (the default) keeps the COUNT(*) per page, count=estimate reuses a
+    cached count and count=none skips it, fetching one extra row to know whether
+    there is a next page.
+    """
+
+    default_limit = 50
+    max_limit = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_mode = get_count_mode(request.query_params, COUNT_EXACT)
+        if self.count_mode == COUNT_EXACT:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = self.get_offset(request)
+        self.count = estimate_count(queryset) if self.count_mode == COUNT_ESTIMATE else None
+        rows = list(queryset[self.offset : self.offset + self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        return rows[: self.limit]
+
+    def get_next_link(self):
+        if self.count_mode == COUNT_EXACT:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination for infinite scroll.
+
+    Pages are ordered by a single ordering field with the primary key as a
+    tiebreaker, and the cursor holds the ordering value and primary key of the
+    last row sent. Each page is a WHERE on those values instead of an OFFSET,
+    so deep pages cost the same as the first one. No count is returned unless
+    ?count=exact or ?count=estimate is passed. Only forward links are produced.
+
+    Enabled per request with ?pagination=cursor or by passing a cursor.
+    """
+
+    page_size = 50
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    page_size_query_param = "limit"
+    mode_query_param = "pagination"
+    mode = "cursor"
+    default_ordering = "-id"
+
+    @classmethod
+    def is_requested(cls, request):
+        """
+        Return whether the request asked for cursor pagination.
+        """
+        params = request.query_params
+        return params.get(cls.mode_query_param) == cls.mode or cls.cursor_query_param in params
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Return the ordering term used for the keyset, e.g. "-views".
+
+        The term comes from the view's OrderingFilter so the allowed fields stay in
+        one place. Only the first term is used, the primary key breaks ties.
+        """
+        for backend in getattr(view, "filter_backends", []):
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                if ordering:
+                    return ordering[0]
+        return self.default_ordering
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            return cursor["v"], int(cursor["id"])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound("Invalid cursor")
+
+    def encode_cursor(self, value, pk):
+        data = json.dumps({"v": value, "id": pk}, cls=DjangoJSONEncoder)
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.count_mode = get_count_mode(request.query_params, COUNT_NONE)
+
+        term = self.get_ordering(request, queryset, view)
+        descending = term.startswith("-")
+        name = term.lstrip("-")
+        field = queryset.model._meta.get_field(name)
+        self.field_name = "pk" if field.primary_key else field.attname
+        nullable = field.null and not field.primary_key
+
+        if self.count_mode == COUNT_EXACT:
+            self.count = queryset.count()
+        elif self.count_mode == COUNT_ESTIMATE:
+            self.count = estimate_count(queryset)
+        else:
+            self.count = None
+
+        # Nulls sort as the largest values, which is how PostgreSQL btree indexes
+        # store them, so descending pages start with them and ascending end with them.
+        if descending:
+            order = F(self.field_name).desc(nulls_first=True if nullable else None)
+            queryset = queryset.order_by(order, "-pk")
+        else:
+            order = F(self.field_name).asc(nulls_last=True if nullable else None)
+            queryset = queryset.order_by(order, "pk")
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            queryset = queryset.filter(self.after_cursor(cursor, descending, nullable))
+
+        rows = list(queryset[: self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+        return self.page
+
+    def after_cursor(self, cursor, descending, nullable):
+        """
+        Build the WHERE clause selecting rows that sort after the cursor.
+        """
+        value, pk = cursor
+        past = "lt" if descending else "gt"
+        if self.field_name == "pk":
+            return Q(**{f"pk__{past}": pk})
+        if value is None:
+            # Within the nulls only the primary key orders rows. Descending pages
+            # move on to the non-null values once the nulls are exhausted.
+            after = Q(**{f"{self.field_name}__isnull": True, f"pk__{past}": pk})
+            if descending:
+                after |= Q(**{f"{self.field_name}__isnull": False})
+            return after
+        after = Q(**{f"{self.field_name}__{past}": value}) | Q(
+            **{self.field_name: value, f"pk__{past}": pk}
+        )
+        if nullable and not descending:
+            after |= Q(**{f"{self.field_name}__isnull": True})
+        return after
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        last = self.page[-1]
+        value = last.pk if self.field_name == "pk" else getattr(last, self.field_name)
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.mode_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(value, last.pk)
+        )
+
+    def get_paginated_response(self, data):
+        response = {"next": self.get_next_link(), "results": data}
+        if self.count is not None:
+            response = {"count": self.count, **response}
+        return Response(response)
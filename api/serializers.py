@@ -1,10 +1,15 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from users.models import ListVideo
 from users.models import UserSavedVideo
 from users.models import UserVideoList
 from videos.models import Video
 
+from .models import VideoImportJob
+
 User = get_user_model()
+# video_id references in requests are validated against the Video column.
+VIDEO_ID_MAX_LENGTH = Video._meta.get_field("video_id").max_length
 
 class VideoSerializer(serializers.ModelSerializer):
     """
@@ -21,6 +26,96 @@ class VideoSerializer(serializers.ModelSerializer):
         model = Video
         fields = ["id", "video_id", "title", "topic", "subtopic", "description", "tags", "duration", "publishedAt", "likes", "views"]
 
+
+def requested_video_fields(params):
+    """
+    Return the video fields requested with ?fields= and ?omit= (comma separated).
+
+    Unknown names are ignored and the response falls back to every field.
+
+    Args:
+        params: The request's query parameters.
+
+    Returns:
+        list: VideoSerializer field names in their declared order.
+    """
+    field_names = list(VideoSerializer.Meta.fields)
+    if fields := params.get("fields"):
+        requested = {name.strip() for name in fields.split(",")}
+        field_names = [name for name in field_names if name in requested]
+    if omit := params.get("omit"):
+        omitted = {name.strip() for name in omit.split(",")}
+        field_names = [name for name in field_names if name not in omitted]
+    return field_names or list(VideoSerializer.Meta.fields)
+
+
+class VideoListSerializer(serializers.BaseSerializer):
+    """
+    A read-only serializer for video responses.
+
+    Copies the requested attributes straight off each instance instead of going
+    through a ModelSerializer field per column, which is where most of the time
+    goes on large list pages. The output matches VideoSerializer for the same fields.
+
+    Args:
+        fields: The field names to emit, defaults to every VideoSerializer field.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        self.field_names = fields or VideoSerializer.Meta.fields
+        super().__init__(*args, **kwargs)
+
+    def to_representation(self, instance):
+        return {name: getattr(instance, name) for name in self.field_names}
+
+
+class BulkVideoSerializer(VideoSerializer):
+    """
+    A VideoSerializer used by the bulk write paths.
+
+    The unique validator on video_id is dropped because it runs one query per
+    item; the bulk paths resolve existing video_ids for the whole batch instead.
+    """
+
+    class Meta(VideoSerializer.Meta):
+        """
+        Meta options for the BulkVideoSerializer class.
+        """
+        extra_kwargs = {"video_id": {"validators": []}}
+
+
+class VideoImportJobSerializer(serializers.ModelSerializer):
+    """
+    A serializer reporting the progress of a VideoImportJob, without its payload.
+
+    Returns:
+        dict: Serialized data for the VideoImportJob model fields.
+    """
+
+    class Meta:
+        """
+        Meta options for the VideoImportJobSerializer class.
+        """
+
+        model = VideoImportJob
+        fields = [
+            "id",
+            "kind",
+            "status",
+            "total",
+            "processed",
+            "created",
+            "updated",
+            "failed",
+            "errors",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
+
+
 class UserSavedVideoSerializer(serializers.ModelSerializer):
     """
     A serializer for the UserSavedVideo model.
@@ -29,6 +124,8 @@ class UserSavedVideoSerializer(serializers.ModelSerializer):
         dict: Serialized data for the UserSavedVideo model fields.
     """
 
+    video_id = serializers.CharField(max_length=VIDEO_ID_MAX_LENGTH)
+
     class Meta:
         """
         Meta options for the UserSavedVideoSerializer class.
@@ -39,15 +136,90 @@ class UserSavedVideoSerializer(serializers.ModelSerializer):
 
         model = UserSavedVideo
         fields = ["id", "user", "video_id"]
+        # Uniqueness of (user, video) is left to the database constraint.
+        validators = []
 
-    
-    
+
+class UserSavedVideoExpandedSerializer(UserSavedVideoSerializer):
+    """
+    A UserSavedVideoSerializer that also embeds the saved video.
+
+    The video is read from the select_related join, so a page costs one query.
+    It is null when the saved video_id no longer exists.
+
+    Returns:
+        dict: Serialized data for the UserSavedVideo model fields and the video.
+    """
+
+    video = VideoListSerializer(read_only=True)
+
+    class Meta(UserSavedVideoSerializer.Meta):
+        """
+        Meta options for the UserSavedVideoExpandedSerializer class.
+        """
+
+        fields = ["id", "user", "video_id", "video"]
+
+class VideoIdsSerializer(serializers.Serializer):
+    """
+    A serializer for the batch save endpoints, a list of up to MAX_BATCH_VIDEO_IDS video_ids.
+
+    Returns:
+        dict: {"video_ids": [...]} with duplicates removed, in request order.
+    """
+
+    MAX_BATCH_VIDEO_IDS = 500
+
+    video_ids = serializers.ListField(
+        child=serializers.CharField(max_length=VIDEO_ID_MAX_LENGTH),
+        allow_empty=False,
+        max_length=MAX_BATCH_VIDEO_IDS,
+    )
+
+    def validate_video_ids(self, value):
+        return list(dict.fromkeys(value))
+
+
+class VideoMoveSerializer(VideoIdsSerializer):
+    """
+    A serializer for reordering a list, the video_ids to move and the video to move them after.
+
+    Returns:
+        dict: {"video_ids": [...], "after": video_id or None for the top of the list}.
+    """
+
+    after = serializers.CharField(max_length=VIDEO_ID_MAX_LENGTH, allow_null=True, default=None)
+
+
+class ListVideoSerializer(serializers.ModelSerializer):
+    """
+    A serializer for the ListVideo model, embedding the listed video.
+
+    The video is read from the select_related join. It is null when the listed
+    video_id no longer exists.
+
+    Returns:
+        dict: Serialized data for the ListVideo model fields and the video.
+    """
+
+    video_id = serializers.CharField(read_only=True)
+    video = VideoListSerializer(read_only=True)
+
+    class Meta:
+        """
+        Meta options for the ListVideoSerializer class.
+        """
+
+        model = ListVideo
+        fields = ["video_id", "position", "video"]
 
 
 class UserVideoListSerializer(serializers.ModelSerializer):
     """
     A serializer for the UserVideoList model.
 
+    The user is read-only and set from the request by the view.
+
     Returns:
         dict: Serialized data for the UserVideoList model fields.
     """
@@ -70,43 +242,24 @@ class UserVideoListSerializer(serializers.ModelSerializer):
             "thumbnail",
             "created_at",
         ]
+        read_only_fields = ["user"]
+        # Uniqueness of (user, list_id) is left to the database constraint.
+        validators = []
 
-    def to_representation(self, instance):
+
+class UserVideoListDetailSerializer(UserVideoListSerializer):
+    """
+    A UserVideoListSerializer that also embeds the list's videos in list order.
+
+    Returns:
+        dict: Serialized data for the UserVideoList model fields and its videos.
+    """
+
+    videos = ListVideoSerializer(source="entries", many=True, read_only=True)
+
+    class Meta(UserVideoListSerializer.Meta):
         """
-            Customize the representation of the UserVideoList model.
-            Args:
-                instance: The instance of the UserVideoList model to be serialized.
-                Returns:
-                    dict: Serialized data for the UserVideoList model fields.
-        """
-        data = super().to_representation(instance)
-        data["list_id"] = instance.list_id
-        data["title"] = instance.title
-        data["description"] = instance.description
-        data["thumbnail"] = instance.thumbnail
-        data["created_at"] = instance.created_at
-        return data
-    
-    def create(self, validated_data):
-        """
-            Create a new UserVideoList instance.
-            Args:
-                validated_data: The validated data to create the UserVideoList instance with.
-                Returns:
-                    UserVideoList: The created UserVideoList instance.
-        """
-        user = self.context["request"].user
-        list_id = validated_data.pop("list_id")
-        title = validated_data.pop("title")
-        description = validated_data.pop("description")
-        thumbnail = validated_data.pop("thumbnail")
-        user_video_list, created = UserVideoList.objects.get_or_create(
-            user=user,
-            list_id=list_id,
-            title=title,
-            description=description,
-            thumbnail=thumbnail,
-        )
-        if not created:
-            raise serializers.ValidationError("Video list already exists.")
-        return user_video_list
\ No newline at end of file
+        Meta options for the UserVideoListDetailSerializer class.
+        """
+
+        fields = UserVideoListSerializer.Meta.fields + ["videos"]
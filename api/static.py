@@ -0,0 +1,40 @@
+from asgiref.sync import iscoroutinefunction
+from asgiref.sync import markcoroutinefunction
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise's static file serving, usable in async middleware chains.
+
+    WhiteNoiseMiddleware is sync-only, which makes Django run every request
+    under ASGI, async views included, through a thread. This subclass passes
+    the other requests to the rest of the chain in its own mode and only
+    serves the static files itself. Looking a file up is a dict access, or a
+    stat call with WHITENOISE_AUTOREFRESH in development, and the file is
+    streamed by Django.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        static_file = self.find_static_file(request)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+    def find_static_file(self, request):
+        if self.autorefresh:
+            return self.find_file(request.path_info)
+        return self.files.get(request.path_info)
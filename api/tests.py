@@ -1,3 +1,1207 @@
-from django.test import TestCase
+import datetime
+import gzip
+import json
+import os
+import re
+import tempfile
+import time
+import uuid
+from decimal import Decimal
+from io import BytesIO
+from io import StringIO
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import F
+from django.http import HttpResponse
+from django.test import AsyncClient
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework.test import APITestCase
+from rest_framework.test import APITransactionTestCase
+
+from topics.models import Subtopic
+from topics.models import Topic
+from users.models import ListVideo
+from users.models import UserSavedVideo
+from users.models import UserVideoList
+from users.models import VideoLike
+from videos.counters import counters
+from videos.models import TrendingVideo
+from videos.models import Video
+from videos.trending import TRENDING_LIMIT
+from videos.trending import compute_trending
+
+from .benchmarks import video_payload
+from .bulk import MAX_REPORTED_ERRORS
+from .bulk import ingest_video_lines
+from .bulk import upsert_videos
+from .cache import get_cache
+from .cache import get_generation
+from .compression import CompressionMiddleware
+from .compression import brotli
+from .lists import POSITION_GAP
+from .instrumentation import InstrumentationMiddleware
+from .models import VideoImportJob
+from .renderers import ORJSONParser
+from .renderers import ORJSONRenderer
+from .serializers import VideoListSerializer
+from .serializers import VideoSerializer
+from .static import StaticFilesMiddleware
+
+
+class UpsertVideosTests(APITestCase):
+    """
+    Tests of the set-based bulk upsert behind update-and-create-bulk.
+    """
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "pw")
+        self.client.force_authenticate(self.admin)
+        upsert_videos([video_payload(0), video_payload(1)])
+
+    def test_reports_created_updated_and_failing_videos(self):
+        response = self.client.post(
+            "/api/videos/update-and-create-bulk/",
+            {
+                "videos": [
+                    video_payload(1, title="Renamed"),
+                    video_payload(2),
+                    {"title": "No video_id"},
+                    video_payload(3, likes="many"),
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual([v["video_id"] for v in response.data["created_videos"]], ["bench-2"])
+        self.assertEqual([v["video_id"] for v in response.data["updated_videos"]], ["bench-1"])
+        self.assertEqual(response.data["updated_videos"][0]["title"], "Renamed")
+        errors = response.data["errors"]
+        self.assertEqual(errors[0]["error"], "video_id is required")
+        self.assertIn("likes", errors[1]["error"])
+        self.assertEqual(Video.objects.get(video_id="bench-1").title, "Renamed")
+        self.assertFalse(Video.objects.filter(video_id="bench-3").exists())
+
+    def test_partial_update_keeps_omitted_fields(self):
+        upsert_videos([{"video_id": "bench-0", "views": 5}])
+
+        video = Video.objects.get(video_id="bench-0")
+        self.assertEqual(video.views, 5)
+        self.assertEqual(video.title, video_payload(0)["title"])
+
+    def test_repeated_video_id_is_reported_once(self):
+        created, updated, errors = upsert_videos(
+            [video_payload(5, views=1), video_payload(5, views=2)]
+        )
+
+        self.assertEqual([v["views"] for v in created], [2])
+        self.assertEqual((updated, errors), ([], []))
+        self.assertEqual(Video.objects.get(video_id="bench-5").views, 2)
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        # Both batches fit in one INSERT, larger ones take one per write batch.
+        def count_queries(numbers):
+            with CaptureQueriesContext(connection) as queries:
+                upsert_videos([video_payload(number) for number in numbers])
+            return len(queries)
+
+        self.assertEqual(count_queries(range(10, 20)), count_queries(range(100, 160)))
+
+    def test_counter_increments_during_the_upsert_are_kept(self):
+        def flush_before_insert(execute, sql, params, many, context):
+            # A counter flush landing after the videos were loaded.
+            if sql.startswith("INSERT") and not flushed:
+                flushed.append(sql)
+                Video.objects.filter(video_id__in=["bench-0", "bench-1"]).update(
+                    views=F("views") + 5, likes=F("likes") + 5
+                )
+            return execute(sql, params, many, context)
+
+        flushed = []
+        before = {video.video_id: video for video in Video.objects.all()}
+        payload = video_payload(0, title="Renamed")
+        del payload["views"], payload["likes"]
+        with connection.execute_wrapper(flush_before_insert):
+            upsert_videos([payload, {"video_id": "bench-1", "views": 100}])
+
+        renamed = Video.objects.get(video_id="bench-0")
+        self.assertEqual(renamed.title, "Renamed")
+        self.assertEqual(renamed.views, before["bench-0"].views + 5)
+        self.assertEqual(renamed.likes, before["bench-0"].likes + 5)
+        # A payload that sets a counter overwrites it, the other one is kept.
+        counted = Video.objects.get(video_id="bench-1")
+        self.assertEqual((counted.views, counted.likes), (100, before["bench-1"].likes + 5))
+
+
+def ndjson(*videos):
+    return [video if isinstance(video, str) else json.dumps(video) for video in videos]
+
+
+class NDJSONIngestTests(APITestCase):
+    """
+    Tests of streamed NDJSON video creation, see api.bulk.ingest_video_lines.
+    """
+
+    def test_chunks_are_all_written(self):
+        summary = ingest_video_lines(ndjson(*[video_payload(number) for number in range(5)]), chunk_size=2)
+
+        self.assertEqual(summary, {"created": 5, "failed": 0, "errors": []})
+        self.assertEqual(Video.objects.count(), 5)
+
+    def test_failing_lines_are_reported_with_their_number(self):
+        lines = ndjson(
+            video_payload(0),
+            "{not json",
+            "",
+            video_payload(1, likes="many"),
+            {"title": "No video_id"},
+            video_payload(2),
+        )
+        summary = ingest_video_lines(lines, chunk_size=2)
+
+        self.assertEqual((summary["created"], summary["failed"]), (2, 3))
+        self.assertEqual([error["line"] for error in summary["errors"]], [2, 4, 5])
+        self.assertTrue(summary["errors"][0]["error"].startswith("Invalid JSON"))
+        self.assertIn("likes", summary["errors"][1]["error"])
+        self.assertIn("video_id", summary["errors"][2]["error"])
+
+    def test_duplicate_video_ids_within_and_across_chunks(self):
+        lines = ndjson(
+            video_payload(0),
+            video_payload(0, title="Same chunk"),
+            video_payload(1),
+            video_payload(0, title="Next chunk"),
+        )
+        summary = ingest_video_lines(lines, chunk_size=2)
+
+        self.assertEqual((summary["created"], summary["failed"]), (2, 2))
+        self.assertEqual([error["line"] for error in summary["errors"]], [2, 4])
+        self.assertEqual(Video.objects.get(video_id="bench-0").title, video_payload(0)["title"])
+
+    def test_reported_errors_are_capped(self):
+        summary = ingest_video_lines(["{"] * (MAX_REPORTED_ERRORS + 5))
+
+        self.assertEqual(summary["failed"], MAX_REPORTED_ERRORS + 5)
+        self.assertEqual(len(summary["errors"]), MAX_REPORTED_ERRORS)
+
+    def test_response_status(self):
+        admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "pw")
+        self.client.force_authenticate(admin)
+
+        def post(*videos):
+            body = "\n".join(ndjson(*videos)).encode()
+            return self.client.post("/api/videos/", body, content_type="application/x-ndjson")
+
+        self.assertEqual(post(video_payload(0), video_payload(1)).status_code, 201)
+        self.assertEqual(post(video_payload(2), "{").status_code, 206)
+        response = post(video_payload(2), "{")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((response.json()["created"], response.json()["failed"]), (0, 2))
+
+
+class CursorPaginationTests(APITestCase):
+    """
+    Tests of ?pagination=cursor on the video list, walking every page.
+    """
+
+    def setUp(self):
+        # Ties on views and likes, and videos without a publish date.
+        upsert_videos(
+            [
+                video_payload(
+                    number,
+                    views=number % 3,
+                    likes=number % 2,
+                    publishedAt="" if number % 4 == 0 else video_payload(number)["publishedAt"],
+                )
+                for number in range(11)
+            ]
+        )
+
+    def walk(self, url):
+        pks = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            pks.extend(video["id"] for video in response.data["results"])
+            url = response.data["next"]
+        return pks
+
+    def test_pages_follow_the_ordering_without_gaps_or_repeats(self):
+        videos = list(Video.objects.all())
+        columns = {"publishedAt": "published_at", "": "id"}
+        for ordering in ["views", "-views", "likes", "-likes", "publishedAt", "-publishedAt", ""]:
+            name = ordering.lstrip("-")
+            field = columns.get(name, name)
+            # Without an ordering pages run newest first.
+            descending = ordering.startswith("-") or not ordering
+            # Nulls sort as the largest values, ties are broken by the primary key.
+            expected = sorted(
+                videos,
+                key=lambda video: (getattr(video, field) is None, getattr(video, field) or 0, video.pk),
+                reverse=descending,
+            )
+            with self.subTest(ordering=ordering):
+                pks = self.walk(f"/api/videos/?pagination=cursor&limit=2&ordering={ordering}")
+                self.assertEqual(pks, [video.pk for video in expected])
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get("/api/videos/?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, 404)
+
+
+class ResponseCacheInvalidationTests(APITestCase):
+    """
+    Tests that cached anonymous responses are never served after a write.
+    """
+
+    def setUp(self):
+        get_cache().clear()
+        upsert_videos([video_payload(0), video_payload(1)])
+        admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "pw")
+        self.admin_client = APIClient()
+        self.admin_client.force_authenticate(admin)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assert_fresh_after(self, write, url, check):
+        self.get(url)
+        self.assertEqual(self.get(url)["X-Cache"], "HIT")
+
+        response = write()
+        if hasattr(response, "status_code"):
+            self.assertLess(response.status_code, 300, response.content)
+
+        response = self.get(url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        check(response.json())
+
+    def titles(self, data):
+        return sorted(video["title"] for video in data["results"])
+
+    def titles_of(self, *numbers):
+        return sorted(video_payload(number)["title"] for number in numbers)
+
+    def test_create(self):
+        self.assert_fresh_after(
+            lambda: self.admin_client.post(
+                "/api/videos/", {"videos": [video_payload(2)]}, format="json"
+            ),
+            "/api/videos/",
+            lambda data: self.assertEqual(data["count"], 3),
+        )
+
+    def test_update(self):
+        self.assert_fresh_after(
+            lambda: self.admin_client.put(
+                "/api/videos/bench-0/", video_payload(0, title="Updated"), format="json"
+            ),
+            "/api/videos/bench-0/",
+            lambda data: self.assertEqual(data["title"], "Updated"),
+        )
+
+    def test_partial_update(self):
+        self.assert_fresh_after(
+            lambda: self.admin_client.patch(
+                "/api/videos/bench-0/", {"title": "Patched"}, format="json"
+            ),
+            "/api/videos/",
+            lambda data: self.assertIn("Patched", self.titles(data)),
+        )
+
+    def test_destroy(self):
+        self.assert_fresh_after(
+            lambda: self.admin_client.delete("/api/videos/bench-0/"),
+            "/api/videos/",
+            lambda data: self.assertEqual(data["count"], 1),
+        )
+
+    def test_update_and_create_bulk(self):
+        self.assert_fresh_after(
+            lambda: self.admin_client.post(
+                "/api/videos/update-and-create-bulk/",
+                {"videos": [video_payload(1, title="Bulk"), video_payload(2)]},
+                format="json",
+            ),
+            "/api/videos/?ordering=-views",
+            lambda data: self.assertEqual(self.titles(data), ["Bulk", *self.titles_of(0, 2)]),
+        )
+
+    def test_delete_all(self):
+        self.assert_fresh_after(
+            lambda: self.admin_client.delete("/api/videos/delete-all/"),
+            "/api/videos/",
+            lambda data: self.assertEqual(data["count"], 0),
+        )
+
+    def test_failed_write_does_not_break_the_cache(self):
+        self.get("/api/videos/")
+        response = self.admin_client.patch("/api/videos/missing/", {"title": "x"}, format="json")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.get("/api/videos/").json()["count"], 2)
+
+    def test_rejected_writes_keep_the_generation(self):
+        generation = get_generation("videos")
+        for method, url in [
+            ("post", "/api/videos/"),
+            ("put", "/api/videos/bench-0/"),
+            ("delete", "/api/videos/bench-0/"),
+            ("post", "/api/videos/update-and-create-bulk/"),
+            ("delete", "/api/videos/delete-all/"),
+        ]:
+            with self.subTest(method=method, url=url):
+                response = getattr(self.client, method)(url, {"videos": []}, format="json")
+                self.assertIn(response.status_code, (401, 403))
+        response = self.admin_client.post("/api/videos/", {"videos": [{"title": "x"}]}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+        self.assertEqual(get_generation("videos"), generation)
+        self.assertEqual(self.get("/api/videos/")["X-Cache"], "MISS")
+        self.assertEqual(self.get("/api/videos/")["X-Cache"], "HIT")
+
+    def test_topic_tree_follows_video_writes(self):
+        self.assert_fresh_after(
+            lambda: self.admin_client.post(
+                "/api/videos/", {"videos": [video_payload(10)]}, format="json"
+            ),
+            "/api/topics/",
+            lambda data: self.assertEqual(self.topic_counts(data)["topic-0"], 2),
+        )
+
+    def test_writes_outside_the_api(self):
+        # Admin edits, management commands and shells write through the ORM.
+        self.assert_fresh_after(
+            lambda: Video.objects.create(video_id="shell", title="Shell"),
+            "/api/videos/",
+            lambda data: self.assertEqual(data["count"], 3),
+        )
+        self.assert_fresh_after(
+            lambda: Video.objects.filter(video_id="shell").update(title="Renamed"),
+            "/api/videos/",
+            lambda data: self.assertIn("Renamed", self.titles(data)),
+        )
+        self.assert_fresh_after(
+            lambda: Video.objects.get(video_id="shell").delete(),
+            "/api/videos/",
+            lambda data: self.assertEqual(data["count"], 2),
+        )
+
+    def test_topic_tree_follows_topic_writes(self):
+        # Topics are written in the admin, through the model signals.
+        self.assert_fresh_after(
+            lambda: Topic.objects.create(name="topic-0", description="First"),
+            "/api/topics/",
+            lambda data: self.assertEqual(data[0]["description"], "First"),
+        )
+
+    def test_video_lists_follow_topic_writes(self):
+        topic = Topic.objects.create(name="topic-0")
+        self.assert_fresh_after(
+            lambda: Subtopic.objects.create(topic=topic, name="subtopic-0"),
+            f"/api/videos/?topic_id={topic.pk}",
+            lambda data: self.assertEqual([video["video_id"] for video in data["results"]], ["bench-0"]),
+        )
+        generation = get_generation("videos")
+        topic.delete()
+        self.assertNotEqual(get_generation("videos"), generation)
+
+    def topic_counts(self, data):
+        return {topic["name"]: topic["video_count"] for topic in data}
+
+
+class ConditionalListTests(APITestCase):
+    """
+    Tests of the video list's ETag, which must cost no query over the list.
+    """
+
+    def setUp(self):
+        # Generation ETags are only sent with a cache shared between processes.
+        location = self.enterContext(tempfile.TemporaryDirectory())
+        backend = "django.core.cache.backends.filebased.FileBasedCache"
+        self.enterContext(override_settings(CACHES={"default": {"BACKEND": backend, "LOCATION": location}}))
+        get_cache().clear()
+        upsert_videos([video_payload(number) for number in range(3)])
+        # Authenticated requests skip the response cache.
+        user = get_user_model().objects.create_user("reader", "reader@example.com", "pw")
+        self.client.force_authenticate(user)
+
+    def test_pages_run_no_count_unless_asked_for(self):
+        for url in [
+            "/api/videos/?pagination=cursor&limit=2",
+            "/api/videos/?count=none&limit=2",
+            "/api/videos/?count=estimate&limit=2&offset=2",
+        ]:
+            self.client.get(url)  # Fills the estimated count.
+            with self.subTest(url=url), CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            statements = [query["sql"] for query in queries if "videos_video" in query["sql"]]
+            self.assertEqual(len(statements), 1, statements)
+            self.assertNotIn("COUNT(", statements[0])
+
+        response = self.client.get("/api/videos/?pagination=cursor&count=exact")
+        self.assertEqual(response.data["count"], 3)
+
+    def test_not_modified_until_a_write(self):
+        etag = self.client.get("/api/videos/")["ETag"]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/videos/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([query for query in queries if "videos_video" in query["sql"]])
+
+        other = self.client.get("/api/videos/?topic=topic-1")["ETag"]
+        self.assertNotEqual(other, etag)
+
+    @override_settings(API_CACHE_TIMEOUT=1)
+    def test_flushed_counts_show_once_the_etag_expires(self):
+        # Wait for a fresh period so the two requests below share one.
+        time.sleep(1 - time.time() % 1)
+        etag = self.client.get("/api/videos/")["ETag"]
+        generation = get_generation("videos")
+
+        self.client.post("/api/videos/bench-0/view/")
+        counters.flush()
+        self.assertEqual(get_generation("videos"), generation)
+        self.assertEqual(self.client.get("/api/videos/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        time.sleep(1 - time.time() % 1)
+        response = self.client.get("/api/videos/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        views = {video["video_id"]: video["views"] for video in response.json()["results"]}
+        self.assertEqual(views["bench-0"], 1)
+
+    def test_writes_outside_the_api_change_the_etag(self):
+        video = Video.objects.get(video_id="bench-0")
+        for write in [
+            lambda: Video.objects.create(video_id="created"),
+            lambda: video.save(update_fields=["title"]),
+            lambda: Video.objects.filter(pk=video.pk).update(title="Updated"),
+            lambda: Video.objects.bulk_update([video], ["title"]),
+            lambda: Video.objects.get(video_id="created").delete(),
+            lambda: Video.objects.filter(video_id="bench-2").delete(),
+        ]:
+            etag = self.client.get("/api/videos/")["ETag"]
+            write()
+            response = self.client.get("/api/videos/", HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+
+    def test_no_etag_with_the_in_process_cache(self):
+        with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}):
+            response = self.client.get("/api/videos/")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header("ETag"))
+
+
+class SearchTests(APITestCase):
+    """
+    Tests of the search action on the portable (non PostgreSQL) backend.
+    """
+
+    def setUp(self):
+        get_cache().clear()
+        upsert_videos(
+            [
+                video_payload(1, title="Daf Yomi Berachot", description="Intro", tags=["gemara"]),
+                video_payload(2, title="Parasha", description="Daf yomi review", tags=[]),
+                video_payload(3, title="Halacha", description="Shabbat", tags=["daf"]),
+            ]
+        )
+
+    def search(self, text):
+        response = self.client.get("/api/videos/search/", {"q": text})
+        self.assertEqual(response.status_code, 200)
+        return [video["video_id"] for video in response.json()["results"]]
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.search("daf yomi"), ["bench-1", "bench-2"])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.search("yomi shabbat"), [])
+
+    def test_tags_and_updates_are_searchable(self):
+        self.assertEqual(self.search("gemara"), ["bench-1"])
+        upsert_videos([{"video_id": "bench-3", "tags": ["gemara"]}])
+        get_cache().clear()
+        self.assertEqual(self.search("gemara"), ["bench-3", "bench-1"])
+
+    def test_query_is_required(self):
+        response = self.client.get("/api/videos/search/")
+        self.assertEqual(response.status_code, 400)
+
+
+class TagEndpointTests(APITestCase):
+    """
+    Tests of the tag frequency endpoint and the tags filters.
+    """
+
+    def setUp(self):
+        get_cache().clear()
+        upsert_videos(
+            [
+                video_payload(1, tags=["gemara", "daf"]),
+                video_payload(2, tags=["gemara"]),
+                video_payload(3, tags=["halacha", "daf", "gemara"]),
+            ]
+        )
+
+    def test_frequencies_most_used_first(self):
+        response = self.client.get("/api/videos/tags/")
+        self.assertEqual(
+            response.json(),
+            [
+                {"name": "gemara", "video_count": 3},
+                {"name": "daf", "video_count": 2},
+                {"name": "halacha", "video_count": 1},
+            ],
+        )
+        self.assertEqual(len(self.client.get("/api/videos/tags/?limit=1").json()), 1)
+        self.assertEqual(self.client.get("/api/videos/tags/?limit=-1").json(), [])
+
+    def test_tags_filters(self):
+        def video_ids(query):
+            response = self.client.get(f"/api/videos/?{query}&ordering=views")
+            return [video["video_id"] for video in response.json()["results"]]
+
+        self.assertEqual(video_ids("tags=halacha,daf"), ["bench-1", "bench-3"])
+        self.assertEqual(video_ids("tags__all=gemara,daf"), ["bench-1", "bench-3"])
+        self.assertEqual(video_ids("tags__all=gemara,halacha"), ["bench-3"])
+
+
+class TrendingEndpointTests(APITestCase):
+    """
+    Tests of the trending action, served from the precomputed rankings.
+    """
+
+    def setUp(self):
+        get_cache().clear()
+        upsert_videos([video_payload(number) for number in range(60)])
+        compute_trending()
+
+    def trending(self, query=""):
+        response = self.client.get(f"/api/videos/trending/{query}")
+        self.assertEqual(response.status_code, 200)
+        return [video["video_id"] for video in response.json()["results"]]
+
+    def test_rankings(self):
+        overall = self.trending()
+        self.assertEqual(len(overall), TRENDING_LIMIT)
+        self.assertEqual(self.trending("?limit=3"), overall[:3])
+        self.assertEqual(self.trending("?topic=topic-1"), [f"bench-{n}" for n in (51, 41, 31, 21, 11, 1)])
+        self.assertEqual(self.trending("?topic=topic-1&subtopic=subtopic-1"), ["bench-51", "bench-1"])
+        self.assertEqual(self.trending("?topic=missing"), [])
+
+    def test_limit_is_clamped(self):
+        self.assertEqual(len(self.trending("?limit=1000")), TRENDING_LIMIT)
+        self.assertEqual(self.trending("?limit=-1"), [])
+        self.assertEqual(self.client.get("/api/videos/trending/?limit=ten").status_code, 400)
+
+    def test_recompute_invalidates_cached_rankings(self):
+        self.trending()
+        self.assertEqual(self.client.get("/api/videos/trending/")["X-Cache"], "HIT")
+        TrendingVideo.objects.all().delete()
+        self.assertEqual(self.client.get("/api/videos/trending/")["X-Cache"], "HIT")
+
+        compute_trending(limit=1)
+
+        self.assertEqual(len(self.trending()), 1)
+
+
+class SavedVideoTests(APITestCase):
+    """
+    Tests that saved videos are scoped to the requesting user.
+    """
+
+    def setUp(self):
+        upsert_videos([video_payload(number) for number in range(3)])
+        users = get_user_model().objects
+        self.user = users.create_user("reader", "reader@example.com", "pw")
+        self.other = users.create_user("other", "other@example.com", "pw")
+        self.others_save = UserSavedVideo.objects.create(user=self.other, video_id="bench-0")
+        self.client.force_authenticate(self.user)
+
+    def test_list_only_holds_the_users_saves(self):
+        self.client.post("/api/user-saved-videos/", {"video_id": "bench-1"}, format="json")
+
+        response = self.client.get("/api/user-saved-videos/")
+        self.assertEqual([save["video_id"] for save in response.json()], ["bench-1"])
+        response = self.client.get("/api/user-saved-videos/?expand=video&limit=10")
+        self.assertEqual(response.json()["results"][0]["video"]["video_id"], "bench-1")
+
+    def test_other_users_saves_cannot_be_read_or_deleted(self):
+        url = f"/api/user-saved-videos/{self.others_save.pk}/"
+        self.assertGreaterEqual(self.client.get(url).status_code, 400)
+        self.assertGreaterEqual(self.client.delete(url).status_code, 400)
+        self.assertTrue(UserSavedVideo.objects.filter(pk=self.others_save.pk).exists())
+
+    def test_saving_twice_is_rejected_by_the_constraint(self):
+        first = self.client.post("/api/user-saved-videos/", {"video_id": "bench-0"}, format="json")
+        second = self.client.post("/api/user-saved-videos/", {"video_id": "bench-0"}, format="json")
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 400)
+        self.assertEqual(second.json(), {"error": "Video already saved"})
+        self.assertEqual(UserSavedVideo.objects.filter(video_id="bench-0").count(), 2)
+
+    def test_long_video_ids(self):
+        # Video.video_id allows 255 characters, the endpoints must accept them.
+        video_id = "v" * 200
+        upsert_videos([video_payload(3, video_id=video_id)])
+
+        response = self.client.post("/api/user-saved-videos/", {"video_id": video_id}, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        response = self.client.post("/api/user-saved-videos/bulk-unsave/", {"video_ids": [video_id]}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        response = self.client.post("/api/user-saved-videos/bulk-save/", {"video_ids": [video_id]}, format="json")
+        self.assertEqual(response.json()["created"], [video_id])
+        too_long = {"video_ids": ["v" * 256]}
+        self.assertEqual(self.client.post("/api/user-saved-videos/bulk-save/", too_long, format="json").status_code, 400)
+
+    def test_list_queries_do_not_grow_with_the_saves(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get("/api/user-saved-videos/?expand=video")
+            return len(queries)
+
+        UserSavedVideo.objects.create(user=self.user, video_id="bench-1")
+        baseline = count_queries()
+        UserSavedVideo.objects.create(user=self.user, video_id="bench-2")
+        self.assertEqual(count_queries(), baseline)
+
+    def test_batch_endpoints(self):
+        response = self.client.post(
+            "/api/user-saved-videos/bulk-save/",
+            {"video_ids": ["bench-1", "bench-2", "bench-1"]},
+            format="json",
+        )
+        self.assertEqual(response.json(), {"created": ["bench-1", "bench-2"], "already_saved": []})
+
+        response = self.client.get("/api/user-saved-videos/saved-status/?video_ids=bench-0,bench-1")
+        self.assertEqual(response.json(), {"saved": {"bench-0": False, "bench-1": True}})
+
+        response = self.client.post(
+            "/api/user-saved-videos/bulk-unsave/", {"video_ids": ["bench-0", "bench-1"]}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            set(UserSavedVideo.objects.values_list("user__username", "video_id")),
+            {("reader", "bench-2"), ("other", "bench-0")},
+        )
+
+
+class VideoLikeTests(APITestCase):
+    """
+    Tests that a user likes a video at most once.
+    """
+
+    def setUp(self):
+        upsert_videos([video_payload(1)])
+        counters.flush()
+        self.url = "/api/videos/bench-1/like/"
+        self.user = get_user_model().objects.create_user("reader", "reader@example.com", "pw")
+        self.client.force_authenticate(self.user)
+
+    def likes(self):
+        counters.flush()
+        return Video.objects.get(video_id="bench-1").likes
+
+    def test_liking_twice_counts_once(self):
+        likes = self.likes()
+        self.assertEqual(self.client.post(self.url).status_code, 201)
+        self.assertEqual(self.client.post(self.url).status_code, 200)
+
+        self.assertEqual(self.likes(), likes + 1)
+        self.assertEqual(VideoLike.objects.filter(user=self.user).count(), 1)
+
+    def test_unlike_decrements_once(self):
+        likes = self.likes()
+        self.client.post(self.url)
+        self.assertEqual(self.client.delete(self.url).status_code, 204)
+        self.assertEqual(self.client.delete(self.url).status_code, 204)
+
+        self.assertEqual(self.likes(), likes)
+        self.assertFalse(VideoLike.objects.exists())
+
+    def test_each_user_counts(self):
+        likes = self.likes()
+        self.client.post(self.url)
+        self.client.force_authenticate(get_user_model().objects.create_user("other"))
+        pk = Video.objects.get(video_id="bench-1").pk
+        self.client.post(f"/api/videos/id:{pk}/like/")
+
+        self.assertEqual(self.likes(), likes + 2)
+
+    def test_anonymous_and_unknown_videos(self):
+        self.assertEqual(self.client.post("/api/videos/missing/like/").status_code, 404)
+        self.client.force_authenticate(None)
+        self.assertIn(self.client.post(self.url).status_code, (401, 403))
+        self.assertFalse(VideoLike.objects.exists())
+
+
+class VideoListEditTests(APITestCase):
+    """
+    Tests appending, removing and reordering the videos of a user's list.
+    """
+
+    def setUp(self):
+        upsert_videos([video_payload(number) for number in range(20)])
+        self.user = get_user_model().objects.create_user("reader", "reader@example.com", "pw")
+        self.video_list = UserVideoList.objects.create(user=self.user, list_id="l", title="L")
+        self.url = f"/api/user-video-lists/{self.video_list.pk}/"
+        self.client.force_authenticate(self.user)
+
+    def post(self, action, data):
+        return self.client.post(f"{self.url}{action}/", data, format="json")
+
+    def append(self, count):
+        video_ids = [f"bench-{number}" for number in range(count)]
+        self.post("videos", {"video_ids": video_ids})
+
+    def order(self):
+        entries = ListVideo.objects.filter(list_id=self.video_list).order_by("position", "id")
+        return [int(video_id.split("-")[1]) for video_id in entries.values_list("video_id", flat=True)]
+
+    def positions(self):
+        entries = ListVideo.objects.filter(list_id=self.video_list).order_by("position", "id")
+        return list(entries.values_list("position", flat=True))
+
+    def test_append_skips_listed_videos(self):
+        self.post("videos", {"video_ids": ["bench-0", "bench-1"]})
+        response = self.post("videos", {"video_ids": ["bench-1", "bench-2"]})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {"added": ["bench-2"], "already_listed": ["bench-1"]})
+        self.assertEqual(self.order(), [0, 1, 2])
+        self.assertEqual(self.positions(), [POSITION_GAP, 2 * POSITION_GAP, 3 * POSITION_GAP])
+
+    def test_remove(self):
+        self.append(3)
+        response = self.post("remove-videos", {"video_ids": ["bench-1", "bench-7"]})
+
+        self.assertEqual(response.json(), {"deleted": 1})
+        self.assertEqual(self.order(), [0, 2])
+
+    def test_reorder_writes_only_the_moved_rows(self):
+        self.append(5)
+        response = self.post("reorder", {"video_ids": ["bench-4", "bench-3"], "after": "bench-0"})
+        self.assertEqual(response.json(), {"updated": 2})
+        self.assertEqual(self.order(), [0, 4, 3, 1, 2])
+
+        response = self.post("reorder", {"video_ids": ["bench-2"]})
+        self.assertEqual(response.json(), {"updated": 1})
+        self.assertEqual(self.order(), [2, 0, 4, 3, 1])
+
+    def test_long_video_ids(self):
+        video_id = "v" * 200
+        upsert_videos([video_payload(100, video_id=video_id)])
+        self.append(2)
+
+        self.assertEqual(self.post("videos", {"video_ids": [video_id]}).status_code, 201)
+        response = self.post("reorder", {"video_ids": ["bench-0"], "after": video_id})
+        self.assertEqual(response.json(), {"updated": 1})
+
+    def test_reorder_renumbers_the_list_when_a_gap_is_used_up(self):
+        self.append(3)
+        # Moving a video in after the first halves the gap there each time,
+        # until no position is left and the list is renumbered.
+        for moves in range(1, 20):
+            moved = 1 + moves % 2
+            response = self.post("reorder", {"video_ids": [f"bench-{moved}"], "after": "bench-0"})
+            if response.json()["updated"] > 1:
+                break
+        self.assertGreater(response.json()["updated"], 1)
+        self.assertEqual(self.order(), [0, moved, 3 - moved])
+        self.assertEqual(self.positions(), [POSITION_GAP, 2 * POSITION_GAP, 3 * POSITION_GAP])
+
+    def test_reorder_rejects_videos_outside_the_list(self):
+        self.append(3)
+        response = self.post("reorder", {"video_ids": ["bench-9"]})
+        self.assertEqual(response.status_code, 400)
+        response = self.post("reorder", {"video_ids": ["bench-1"], "after": "bench-1"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.order(), [0, 1, 2])
+
+    def test_reorder_queries_do_not_grow_with_the_list(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self.post("reorder", {"video_ids": ["bench-1"]})
+            return len(queries)
+
+        self.append(3)
+        baseline = count_queries()
+        ListVideo.objects.filter(list_id=self.video_list).delete()
+        self.append(20)
+        self.assertEqual(count_queries(), baseline)
+
+
+class VideoIdsFilterTests(APITestCase):
+    """
+    Tests that ?ids= returns every requested video in one page.
+    """
+
+    def setUp(self):
+        get_cache().clear()
+        upsert_videos([video_payload(number) for number in range(120)])
+
+    def test_every_requested_video_is_on_the_page(self):
+        video_ids = [f"bench-{number}" for number in range(70)]
+        for pagination in ["", "&pagination=cursor"]:
+            with self.subTest(pagination=pagination):
+                response = self.client.get(f"/api/videos/?ids={','.join(video_ids)}{pagination}")
+                body = response.json()
+                self.assertEqual({video["video_id"] for video in body["results"]}, set(video_ids))
+                self.assertIsNone(body["next"])
+
+    def test_ids_by_primary_key_and_explicit_limit(self):
+        pk = Video.objects.get(video_id="bench-5").pk
+        response = self.client.get(f"/api/videos/?ids=id:{pk},bench-6,bench-7&limit=2")
+        self.assertEqual(len(response.json()["results"]), 2)
+        self.assertIsNotNone(response.json()["next"])
+
+    def test_too_many_ids(self):
+        ids = ",".join(f"bench-{number}" for number in range(101))
+        self.assertEqual(self.client.get(f"/api/videos/?ids={ids}").status_code, 400)
+
+
+class TypedFilterTests(APITestCase):
+    """
+    Tests of the date and duration filters on the typed columns.
+    """
+
+    def setUp(self):
+        get_cache().clear()
+        upsert_videos(
+            [
+                video_payload(0, publishedAt="2024-01-10T10:00:00Z", duration="PT5M"),
+                video_payload(1, publishedAt="2024-03-10T10:00:00+02:00", duration="PT15M"),
+                video_payload(2, publishedAt="2024-05-10T10:00:00Z", duration="PT1H"),
+                video_payload(3, publishedAt="", duration=""),
+            ]
+        )
+
+    def video_ids(self, query):
+        response = self.client.get(f"/api/videos/?{query}")
+        self.assertEqual(response.status_code, 200)
+        return {video["video_id"] for video in response.json()["results"]}
+
+    def test_date_and_duration_filters(self):
+        for query, expected in [
+            ("published_after=2024-03-10T08:00:00Z", {"bench-1", "bench-2"}),
+            ("published_after=2024-03-10T08:00:01Z", {"bench-2"}),
+            ("published_before=2024-03-10T08:00:00Z", {"bench-0", "bench-1"}),
+            ("published_after=2024-02-01T00:00:00Z&published_before=2024-04-01T00:00:00Z", {"bench-1"}),
+            ("min_duration=900", {"bench-1", "bench-2"}),
+            ("max_duration=900", {"bench-0", "bench-1"}),
+            ("min_duration=600&max_duration=1200", {"bench-1"}),
+        ]:
+            with self.subTest(query=query):
+                self.assertEqual(self.video_ids(query), expected)
+
+    def test_invalid_filter_values(self):
+        for query in ["published_after=invalid", "min_duration=ten"]:
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f"/api/videos/?{query}").status_code, 400)
+
+
+class FieldSelectionTests(APITestCase):
+    """
+    Tests of ?fields= and ?omit=, which narrow both the output and the SELECT.
+    """
+
+    def setUp(self):
+        get_cache().clear()
+        upsert_videos([video_payload(number) for number in range(3)])
+
+    def keys(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return list((data["results"][0] if "results" in data else data).keys())
+
+    def test_output_keys(self):
+        every_field = list(VideoSerializer.Meta.fields)
+        for url, expected in [
+            ("/api/videos/?fields=title,video_id", ["video_id", "title"]),
+            ("/api/videos/?fields= title , views", ["title", "views"]),
+            ("/api/videos/?omit=description,tags", [f for f in every_field if f not in ("description", "tags")]),
+            ("/api/videos/?fields=title,views&omit=views", ["title"]),
+            ("/api/videos/bench-1/?fields=likes", ["likes"]),
+            ("/api/videos/search/?q=lesson&omit=description", [f for f in every_field if f != "description"]),
+        ]:
+            with self.subTest(url=url):
+                self.assertEqual(self.keys(url), expected)
+
+    def test_unknown_fields_are_ignored(self):
+        every_field = list(VideoSerializer.Meta.fields)
+        for url, expected in [
+            ("/api/videos/?fields=title,search_document", ["title"]),
+            ("/api/videos/?fields=unknown", every_field),
+            ("/api/videos/?omit=unknown", every_field),
+            # Omitting every requested field falls back to all of them.
+            ("/api/videos/?fields=title&omit=title", every_field),
+        ]:
+            with self.subTest(url=url):
+                self.assertEqual(self.keys(url), expected)
+
+    def test_same_output_as_the_model_serializer(self):
+        video = Video.objects.get(video_id="bench-1")
+        self.assertEqual(VideoListSerializer(video).data, VideoSerializer(video).data)
+        self.assertEqual(
+            self.client.get("/api/videos/bench-1/").json(), json.loads(json.dumps(VideoSerializer(video).data))
+        )
+
+    def selected_columns(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        statement = next(query["sql"] for query in queries if 'FROM "videos_video"' in query["sql"])
+        return set(re.findall(r'"videos_video"\."(\w+)"', statement.split(" FROM ")[0]))
+
+    def test_only_the_requested_columns_are_selected(self):
+        for url, expected in [
+            ("/api/videos/?fields=video_id,title&count=none", {"id", "video_id", "title"}),
+            ("/api/videos/?fields=title&ordering=-views&count=none", {"id", "title", "views"}),
+            ("/api/videos/bench-1/?fields=title", {"id", "title", "updated_at"}),
+        ]:
+            with self.subTest(url=url):
+                self.assertEqual(self.selected_columns(url), expected)
+
+    def test_search_document_is_never_loaded(self):
+        self.assertNotIn("search_document", self.selected_columns("/api/videos/?count=none"))
+
+
+class ImportJobTests(APITransactionTestCase):
+    """
+    Tests that queued imports are refused unless the worker shares the cache
+    holding the response generations.
+    """
+
+    def setUp(self):
+        admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "pw")
+        self.admin_client = APIClient()
+        self.admin_client.force_authenticate(admin)
+        self.url = "/api/videos/update-and-create-bulk/?async=1"
+
+    def test_refused_with_the_in_process_cache(self):
+        response = self.admin_client.post(self.url, {"videos": [video_payload(0)]}, format="json")
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(VideoImportJob.objects.exists())
+        with self.assertRaises(CommandError):
+            call_command("run_import_jobs", "--once")
+
+    def test_worker_invalidates_the_shared_cache(self):
+        with tempfile.TemporaryDirectory() as location:
+            backend = "django.core.cache.backends.filebased.FileBasedCache"
+            shared = {"default": {"BACKEND": backend, "LOCATION": location}}
+            with override_settings(CACHES=shared):
+                self.assertEqual(self.client.get("/api/videos/").json()["count"], 0)
+                self.assertEqual(self.client.get("/api/videos/")["X-Cache"], "HIT")
+
+                response = self.admin_client.post(self.url, {"videos": [video_payload(0)]}, format="json")
+                self.assertEqual(response.status_code, 202)
+                call_command("run_import_jobs", "--once", stdout=StringIO())
+
+                self.assertEqual(VideoImportJob.objects.get().status, VideoImportJob.SUCCEEDED)
+                self.assertEqual(self.client.get("/api/videos/").json()["count"], 1)
+
+
+class AsyncViewTests(APITestCase):
+    """
+    Tests that the async endpoints answer with the same bytes as the DRF views.
+    """
+
+    def setUp(self):
+        get_cache().clear()
+        upsert_videos([video_payload(number) for number in range(8)])
+
+    def test_same_json_as_the_drf_views(self):
+        pk = Video.objects.get(video_id="bench-3").pk
+        for path in [
+            "videos/?limit=3&offset=3",
+            "videos/?count=unknown&limit=2",
+            "videos/?fields=video_id,title&ordering=-views",
+            "videos/search/?q=lesson",
+            "videos/bench-1/",
+            f"videos/id:{pk}/",
+            "videos/missing/",
+            "videos/?published_after=invalid",
+        ]:
+            with self.subTest(path=path):
+                expected = self.client.get(f"/api/{path}")
+                response = self.client.get(f"/api/async/{path}")
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response["Content-Type"], expected["Content-Type"])
+                self.assertEqual(response.content.replace(b"/api/async/", b"/api/"), expected.content)
+
+    def test_non_ascii_is_not_escaped(self):
+        response = self.client.get("/api/async/videos/bench-1/")
+        self.assertIn(video_payload(1)["title"].encode(), response.content)
+
+
+class ORJSONRendererTests(APITestCase):
+    """
+    Tests that the orjson renderer and parser match DRF's JSON ones.
+    """
+
+    def test_same_bytes_as_the_json_renderer(self):
+        data = {
+            "title": "שיעור \u2028 line\u2029",
+            "published_at": datetime.datetime(2024, 5, 1, 10, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+            "day": datetime.date(2024, 5, 1),
+            "duration": datetime.timedelta(minutes=5),
+            "price": Decimal("1.50"),
+            "id": uuid.UUID(int=1),
+            "tags": ["a", "ב"],
+            "nested": [{"n": 1, "none": None, "flag": True}],
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_api_pages_match(self):
+        get_cache().clear()
+        upsert_videos([video_payload(number) for number in range(3)])
+        response = self.client.get("/api/videos/")
+        self.assertEqual(response.content, JSONRenderer().render(response.json()))
+
+    def test_parser(self):
+        body = '{"title": "שיעור", "tags": [1, 2.5]}'.encode()
+        self.assertEqual(ORJSONParser().parse(BytesIO(body)), {"title": "שיעור", "tags": [1, 2.5]})
+
+
+class CompressionTests(APITestCase):
+    """
+    Tests that JSON responses are compressed in sync and async chains, and
+    that HTML pages are not.
+    """
+
+    def setUp(self):
+        get_cache().clear()
+        upsert_videos([video_payload(number) for number in range(20)])
+
+    def test_json_is_compressed(self):
+        plain = self.client.get("/api/videos/", HTTP_ACCEPT_ENCODING="identity")
+        self.assertFalse(plain.has_header("Content-Encoding"))
+
+        response = self.client.get("/api/videos/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        if brotli is not None:
+            response = self.client.get("/api/videos/", HTTP_ACCEPT_ENCODING="gzip, br")
+            self.assertEqual(response["Content-Encoding"], "br")
+            self.assertEqual(brotli.decompress(response.content), plain.content)
+
+    def test_html_is_not_compressed(self):
+        response = self.client.get("/admin/login/", HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_async_chain(self):
+        response = async_to_sync(AsyncClient().get)("/api/async/videos/", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+        async def get_response(request):
+            return HttpResponse(b"[" + b"1," * 1000 + b"1]", content_type="application/json")
+
+        middleware = CompressionMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")
+        response = async_to_sync(middleware)(request)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+
+class InstrumentationMiddlewareTests(APITestCase):
+    """
+    Tests of the sampled request measurements.
+    """
+
+    def setUp(self):
+        get_cache().clear()
+        upsert_videos([video_payload(number) for number in range(3)])
+
+    def test_unsampled_requests_are_not_measured(self):
+        with override_settings(API_INSTRUMENTATION_SAMPLE_RATE=0), self.assertNoLogs("api.performance"):
+            response = self.client.get("/api/videos/")
+        self.assertFalse(response.has_header("Server-Timing"))
+
+    @override_settings(API_INSTRUMENTATION_SAMPLE_RATE=1)
+    def test_sampled_requests_are_logged_as_json(self):
+        with self.assertLogs("api.performance", level="INFO") as logs:
+            response = self.client.get("/api/videos/?limit=2")
+
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(logs.records[0].levelname, "INFO")
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["view"], "api:videos-list")
+        self.assertEqual(record["status"], 200)
+        self.assertEqual(record["db_queries"], 2)
+        self.assertEqual(record["response_bytes"], len(response.content))
+        self.assertIn("serialize_ms", record)
+        self.assertIn("render_ms", record)
+        self.assertEqual(record["duplicate_queries"], [])
+        self.assertIn('desc="2 queries"', response["Server-Timing"])
+
+    @override_settings(API_INSTRUMENTATION_SAMPLE_RATE=1, API_INSTRUMENTATION_DUPLICATE_THRESHOLD=1)
+    def test_repeated_queries_are_logged_as_warnings(self):
+        with self.assertLogs("api.performance") as logs:
+            response = self.client.get("/api/videos/")
+
+        self.assertEqual(logs.records[0].levelname, "WARNING")
+        self.assertTrue(json.loads(logs.records[0].getMessage())["duplicate_queries"])
+        self.assertIn("dup;", response["Server-Timing"])
+
+
+@override_settings(API_INSTRUMENTATION_SAMPLE_RATE=1)
+class AsyncMiddlewareTests(APITestCase):
+    """
+    Tests that the middleware chain runs async under ASGI and that sampled
+    async requests still have their queries measured.
+    """
+
+    def setUp(self):
+        get_cache().clear()
+        upsert_videos([video_payload(number) for number in range(3)])
+
+    def test_asgi_chain_is_not_adapted_to_sync(self):
+        with self.assertNoLogs("django.request", level="DEBUG"):
+            ASGIHandler()
+
+    def test_queries_are_measured(self):
+        with self.assertLogs("api.performance") as logs:
+            responses = {
+                "sync": self.client.get("/api/videos/"),
+                "async": async_to_sync(AsyncClient().get)("/api/async/videos/"),
+            }
+        self.assertEqual(len(logs.records), 2)
+        for name, response in responses.items():
+            with self.subTest(view=name):
+                self.assertIn('desc="2 queries"', response["Server-Timing"])
+
+    def test_middlewares_are_async_with_an_async_chain(self):
+        async def get_response(request):
+            return HttpResponse(b"view")
+
+        with tempfile.TemporaryDirectory() as root:
+            with open(os.path.join(root, "app.css"), "w") as file:
+                file.write("body {}")
+            static = StaticFilesMiddleware(get_response)
+            static.add_files(root, prefix="static/")
+            self.assertTrue(iscoroutinefunction(static))
+            self.assertTrue(iscoroutinefunction(InstrumentationMiddleware(get_response)))
+
+            factory = RequestFactory()
+            response = async_to_sync(static)(factory.get("/static/app.css"))
+            self.assertEqual(b"".join(response.streaming_content), b"body {}")
+            response.close()
+            self.assertEqual(async_to_sync(static)(factory.get("/api/")).content, b"view")
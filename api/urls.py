@@ -3,16 +3,34 @@ from django.urls import include
 
 from rest_framework.routers import DefaultRouter
 
+from . import async_views
+from .views import TopicTreeViewSet
 from .views import UserSavedVideoViewSet
+from .views import UserVideoListViewSet
 from .views import VideoViewSet
 
 
 app_name = "api"
 
 router = DefaultRouter()
+router.register(r"topics", TopicTreeViewSet, basename="topics")
 router.register(r"user-saved-videos", UserSavedVideoViewSet, basename="user-saved-videos")
+router.register(r"user-video-lists", UserVideoListViewSet, basename="user-video-lists")
 router.register(r"videos", VideoViewSet, basename="videos")
 
+# Async counterparts of the catalog read endpoints, served natively under ASGI.
+async_urlpatterns = [
+    path("videos/", async_views.video_list, name="async-videos-list"),
+    path("videos/search/", async_views.video_search, name="async-videos-search"),
+    path("videos/<str:identifier>/", async_views.video_retrieve, name="async-videos-detail"),
+    path(
+        "user-saved-videos/saved-status/",
+        async_views.saved_status,
+        name="async-user-saved-videos-saved-status",
+    ),
+]
+
 urlpatterns = [
+    path("async/", include(async_urlpatterns)),
     path("", include(router.urls)),
 ]
@@ -1,34 +1,92 @@
+from collections import defaultdict
+
 from django.contrib.auth import authenticate
+from django.db import IntegrityError
+from django.db import transaction
+from django.db.models import Count
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
+from rest_framework.viewsets import GenericViewSet
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.authentication import TokenAuthentication
-from rest_framework.pagination import LimitOffsetPagination
-from rest_framework.filters import OrderingFilter
 from rest_framework.decorators import action
+from rest_framework.reverse import reverse
+from rest_framework.exceptions import APIException
 from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import ValidationError
 from django_filters.rest_framework import DjangoFilterBackend
 
-
-class CustomLimitOffsetPagination(LimitOffsetPagination):
-    default_limit = 50
-    max_limit = 100
-
-
+from topics.models import Topic
+from users.models import ListVideo
+from users.models import VideoLike
+from videos.counters import counters
+from videos.models import RelatedVideo
+from videos.models import Tag
+from videos.models import TrendingVideo
+from videos.models import Video
+from videos.related import RELATED_LIMIT
+from videos.search import search as search_videos
+from videos.trending import TRENDING_LIMIT
+
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+
+from .bulk import ingest_video_lines
+from .bulk import upsert_videos
+from .cache import TOPIC_CACHE_NAMESPACE
+from .cache import VIDEO_CACHE_NAMESPACE
+from .cache import ResponseCacheMixin
+from .cache import get_cache_stats
+from .cache import is_process_local
+from .lists import append_videos
+from .models import VideoImportJob
+from .lists import move_videos
+from .lists import remove_videos
+from .conditional import not_modified
+from .conditional import object_validators
+from .conditional import set_validators
+from .filters import VIDEO_ORDERING_FIELDS
+from .filters import VideoFilter
+from .filters import VideoOrderingFilter
+from .instrumentation import InstrumentedViewMixin
+from .pagination import CustomLimitOffsetPagination
+from .pagination import KeysetPagination
+from .serializers import UserSavedVideoExpandedSerializer
+from .serializers import UserVideoListDetailSerializer
+from .serializers import UserVideoListSerializer
+from .serializers import VideoMoveSerializer
 from .serializers import UserSavedVideoSerializer
+from .serializers import VideoIdsSerializer
+from .serializers import VideoImportJobSerializer
+from .serializers import VideoListSerializer
 from .serializers import VideoSerializer
+from .serializers import requested_video_fields
 
 
-class VideoViewSet(ModelViewSet):
+class VideoViewSet(InstrumentedViewMixin, ResponseCacheMixin, ModelViewSet):
     """
     A viewset for the Video model.
+    Anonymous list and retrieve responses are cached, see api.cache.ResponseCacheMixin.
     """
 
     serializer_class = VideoSerializer
-    queryset = VideoSerializer.Meta.model.objects.all()
+    queryset = VideoSerializer.Meta.model.objects.defer("search_document")
     permission_classes = [IsAdminUser | AllowAny]
+    cache_namespace = VIDEO_CACHE_NAMESPACE
+    # Flushed view and like counts do not bump the generation, see CounterBuffer.
+    etag_expires = True
+    cache_invalidating_actions = [
+        "create",
+        "update",
+        "partial_update",
+        "destroy",
+        "update_and_create_bulk",
+        "delete_all",
+    ]
 
     def get_permissions(self):
         if self.action in [
@@ -38,24 +96,77 @@ class VideoViewSet(ModelViewSet):
             "destroy",
             "update_and_create_bulk",
             "delete_all",
+            "cache_stats",
+            "import_jobs",
+            "import_job",
         ]:
             return [IsAdminUser()]
+        if self.action == "like":
+            return [IsAuthenticated()]
         return [AllowAny()]
 
-    filter_backends = [DjangoFilterBackend, OrderingFilter]
-    filterset_fields = {
-        "topic": ["exact"],
-        "video_id": ["exact"],
-        "subtopic": ["exact"],
-        "likes": ["exact", "gte", "lte", "range"],
-        "views": ["exact", "gte", "lte", "range"],
-    }
-    ordering_fields = ["likes", "views", "publishedAt"]
+    filter_backends = [DjangoFilterBackend, VideoOrderingFilter]
+    filterset_class = VideoFilter
+    ordering_fields = VIDEO_ORDERING_FIELDS
+    # Actions answered with VideoListSerializer and narrowed by ?fields= / ?omit=
+    read_actions = ["list", "retrieve", "search", "trending", "related"]
+
+    def get_field_names(self):
+        """
+        Return the fields requested with ?fields= and ?omit= (comma separated).
+        Unknown names are ignored and the response falls back to every field.
+        """
+        return requested_video_fields(self.request.query_params)
+
+    def get_queryset(self):
+        """
+        Only load the requested fields, plus the ordering field used by keyset
+        pagination, for the read actions.
+        """
+        queryset = super().get_queryset()
+        if self.action not in self.read_actions:
+            return queryset
+        ordering = VideoOrderingFilter().get_ordering(self.request, queryset, self) or []
+        columns = {term.lstrip("-") for term in ordering}
+        if self.action == "retrieve":
+            # Read by object_validators for the ETag and Last-Modified.
+            columns.add("updated_at")
+        return queryset.only(*self.get_field_names(), *columns)
+
+    def get_serializer(self, *args, **kwargs):
+        """
+        Use VideoListSerializer to emit existing videos in the read actions.
+        """
+        if self.action in self.read_actions and (args or "instance" in kwargs):
+            kwargs.setdefault("fields", self.get_field_names())
+            kwargs.setdefault("context", self.get_serializer_context())
+            return self.time_serializer(VideoListSerializer(*args, **kwargs))
+        return super().get_serializer(*args, **kwargs)
+
+    def get_object(self):
+        """
+        Return the video named by the URL identifier with exactly one query.
+        "id:<pk>" and "video:<video_id>" are explicit, an unprefixed identifier
+        is looked up as a video_id and, when numeric, as an id, preferring the
+        video_id match. See VideoQuerySet.identified_by.
+        """
+        identifier = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        queryset = self.filter_queryset(self.get_queryset())
+        obj = queryset.identified_by(identifier).first()
+        if obj is None:
+            raise NotFound(f"No video found with id or video_id: {identifier}")
+        self.check_object_permissions(self.request, obj)
+        return obj
 
     def create(self, request, *args, **kwargs):
         """
         create one or more video instances.
+        Bodies sent as application/x-ndjson are streamed, see create_from_ndjson.
         """
+        if request.content_type.startswith(NDJSON_CONTENT_TYPE):
+            return self.create_from_ndjson(request)
+        if self.wants_async(request):
+            return self.queue_import(request, VideoImportJob.CREATE)
         try:
             videos = request.data.get("videos")
             created_videos = []
@@ -83,45 +194,86 @@ class VideoViewSet(ModelViewSet):
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    def create_from_ndjson(self, request):
+        """
+        Create videos from a newline delimited JSON body, one video per line.
+        The body is read line by line and inserted in chunks, and the response only
+        holds counts and the failing rows, so memory stays flat for large uploads.
+        """
+        try:
+            lines = request.stream if request.stream is not None else []
+            summary = ingest_video_lines(lines)
+            if summary["created"] and summary["failed"]:
+                return Response(summary, status=status.HTTP_206_PARTIAL_CONTENT)
+            elif summary["created"]:
+                return Response(summary, status=status.HTTP_201_CREATED)
+            else:
+                return Response(summary, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    def wants_async(self, request):
+        return request.query_params.get("async") in ("1", "true")
+
+    def queue_import(self, request, kind):
+        """
+        Queue the posted videos as an import job for the run_import_jobs worker.
+        The worker invalidates the cached responses through the cache, so jobs
+        are refused while the cache is the in-process one, see is_process_local.
+        Returns:
+            Response: 202 Accepted with the job, poll import-jobs/{id}/ for progress.
+        """
+        if is_process_local():
+            return Response(
+                {"error": "Asynchronous imports need a shared cache, set REDIS_URL."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        videos = request.data.get("videos") if hasattr(request.data, "get") else None
+        if not isinstance(videos, list):
+            return Response(
+                {"error": "videos must be a list"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        job = VideoImportJob.objects.create(
+            kind=kind, payload=videos, total=len(videos), created_by=request.user
+        )
+        location = reverse("api:videos-import-job", kwargs={"job_id": job.pk}, request=request)
+        return Response(
+            VideoImportJobSerializer(job).data,
+            status=status.HTTP_202_ACCEPTED,
+            headers={"Location": location},
+        )
+
+    @action(detail=False, methods=["get"], url_path="import-jobs")
+    def import_jobs(self, request):
+        """
+        List the latest import jobs, newest first.
+        Requires admin user.
+        """
+        jobs = VideoImportJob.objects.defer("payload").order_by("-id")[:50]
+        return Response(VideoImportJobSerializer(jobs, many=True).data)
+
+    @action(detail=False, methods=["get"], url_path=r"import-jobs/(?P<job_id>[0-9]+)")
+    def import_job(self, request, job_id=None):
+        """
+        Report the progress and per-item errors of an import job.
+        Requires admin user.
+        """
+        job = get_object_or_404(VideoImportJob.objects.defer("payload"), pk=job_id)
+        return Response(VideoImportJobSerializer(job).data)
+
     @action(detail=False, methods=["post"], url_path="update-and-create-bulk")
     def update_and_create_bulk(self, request, *args, **kwargs):
         """
         Update or create multiple videos in bulk.
-        Iterate over the videos list and if video_id matches an existing video, update the video
-        If video_id does not match an existing video, create a new video.
+        Videos whose video_id matches an existing video are updated, the rest are created.
+        The whole batch is written in one transaction, see api.bulk.upsert_videos.
+        With ?async=1 the batch is queued instead, see queue_import.
         """
+        if self.wants_async(request):
+            return self.queue_import(request, VideoImportJob.UPSERT)
         try:
             videos = request.data.get("videos")
-            created_videos = []
-            updated_videos = []
-            errors = []
-            for video in videos:
-                if video_id := video.get("video_id"):
-                    try:
-                        existing_video = self.queryset.get(video_id=video_id)
-                        serializer = self.get_serializer(
-                            existing_video, data=video, partial=True
-                        )
-                        if serializer.is_valid():
-                            self.perform_update(serializer)
-                            updated_videos.append(serializer.data)
-                        elif (
-                            "Video matching query does not exist." in serializer.errors
-                        ):
-                            serializer = self.get_serializer(data=video)
-                            if serializer.is_valid():
-                                self.perform_create(serializer)
-                                created_videos.append(serializer.data)
-                            else:
-                                errors.append(
-                                    {"video": video, "error": serializer.errors}
-                                )
-                        else:
-                            errors.append({"video": video, "error": serializer.errors})
-                    except Exception as e:
-                        errors.append({"video": video, "error": str(e)})
-                else:
-                    errors.append({"video": video, "error": "video_id is required"})
+            created_videos, updated_videos, errors = upsert_videos(videos)
 
             if errors and created_videos and updated_videos:
                 return Response(
@@ -163,84 +315,103 @@ class VideoViewSet(ModelViewSet):
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    def get_paginator(self):
+        """
+        Return the paginator for this request.
+        Keyset pagination is used when the client asks for it with ?pagination=cursor
+        or sends a cursor, otherwise limit/offset pagination.
+        With ?ids= the default page holds every requested video.
+        """
+        if KeysetPagination.is_requested(self.request):
+            paginator = KeysetPagination()
+            paginator.page_size = self.get_ids_page_size(paginator.page_size)
+        else:
+            paginator = CustomLimitOffsetPagination()
+            paginator.default_limit = self.get_ids_page_size(paginator.default_limit)
+        return paginator
+
+    def get_ids_page_size(self, default):
+        # MAX_IDS is within the paginators' maximum page size.
+        if ids := VideoFilter.split_ids(self.request.query_params.get("ids", "")):
+            return min(len(ids), VideoFilter.MAX_IDS)
+        return default
+
     def list(self, request, *args, **kwargs):
         """
         List all videos.
+        Answers 304 Not Modified without querying when the client's ETag still
+        matches, the ETag changes with every write to the videos. No ETag is sent
+        while the cache is the in-process one, see get_generation_etag.
         """
+        if (cached := self.get_cached_response(request)) is not None:
+            return cached
         try:
-            paginator = CustomLimitOffsetPagination()
+            paginator = self.get_paginator()
             queryset = self.filter_queryset(self.get_queryset())
-            page = paginator.paginate_queryset(queryset, request)
+            etag = self.get_generation_etag(request)
+            if etag is not None and (response := not_modified(request, etag, None)) is not None:
+                return response
+            page = paginator.paginate_queryset(queryset, request, view=self)
             if page is not None:
                 serializer = self.get_serializer(page, many=True)
-                return paginator.get_paginated_response(serializer.data)
-            serializer = self.get_serializer(queryset, many=True)
-            return Response(serializer.data)
+                response = paginator.get_paginated_response(serializer.data)
+            else:
+                serializer = self.get_serializer(queryset, many=True)
+                response = Response(serializer.data)
+            if etag is not None:
+                set_validators(response, etag, None)
+            return self.store_response(response)
+        except APIException:
+            raise
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     def retrieve(self, request, *args, **kwargs):
         """
-        Retrieve a single video by id or video_id.
+        Retrieve a single video by id or video_id, see get_object.
         """
-        queryset = self.filter_queryset(self.get_queryset())
-
-        # Try to get the object by video_id first
-        video_id = self.kwargs.get("pk")
-        try:
-            obj = queryset.get(video_id=video_id)
-        except queryset.model.DoesNotExist:
-            # If video_id lookup fails, try with pk (id)
-            try:
-                obj = queryset.get(pk=video_id)
-            except queryset.model.DoesNotExist as e:
-                raise NotFound(f"No video found with id or video_id: {video_id}") from e
-
+        if (cached := self.get_cached_response(request)) is not None:
+            return cached
+        obj = self.get_object()
+        etag, last_modified = object_validators(request, obj)
+        if (response := not_modified(request, etag, last_modified)) is not None:
+            return response
         serializer = self.get_serializer(obj)
-        return Response(serializer.data)
+        response = set_validators(Response(serializer.data), etag, last_modified)
+        return self.store_response(response)
 
     def update(self, request, *args, **kwargs):
         """
-        Update a video by id or video_id.
+        Update a video by id or video_id, see get_object.
         Requires admin user.
         """
         try:
             partial = kwargs.pop("partial", False)
-            # Try to get the object by id first
-            try:
-                instance = self.get_object()
-            except Exception:
-                # If not found, try to get the object by video_id
-                video_id = request.data.get("video_id") or kwargs.get("pk")
-                instance = self.queryset.get(video_id=video_id)
-
+            instance = self.get_object()
             serializer = self.get_serializer(
                 instance, data=request.data, partial=partial
             )
             serializer.is_valid(raise_exception=True)
             self.perform_update(serializer)
             return Response(serializer.data)
+        except NotFound as e:
+            return Response({"error": str(e.detail)}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     def destroy(self, request, *args, **kwargs):
         """
-        Delete a video by id or video_id.
+        Delete a video by id or video_id, see get_object.
+        A ?video_id= query parameter names the video instead.
         """
         try:
             if video_id := request.query_params.get("video_id"):
-                instance = self.queryset.filter(
-                    video_id=video_id, user=request.user
-                ).first()
-            else:
-                instance = self.get_object()
-            if not instance:
-                return Response(
-                    {"error": "Video not found"}, status=status.HTTP_404_NOT_FOUND
-                )
-
+                self.kwargs["pk"] = f"video:{video_id}"
+            instance = self.get_object()
             self.perform_destroy(instance)
             return Response(status=status.HTTP_204_NO_CONTENT)
+        except NotFound as e:
+            return Response({"error": str(e.detail)}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -255,9 +426,163 @@ class VideoViewSet(ModelViewSet):
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(methods=["get"], detail=False, url_path="search")
+    def search(self, request):
+        """
+        Search videos by title, description and tags, most relevant first.
+        Takes the search text in ?q= and accepts the list filters and pagination.
+        """
+        if (cached := self.get_cached_response(request)) is not None:
+            return cached
+        text = request.query_params.get("q", "").strip()
+        if not text:
+            return Response(
+                {"error": "q is required"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            queryset = self.filter_queryset(self.get_queryset())
+            queryset = search_videos(queryset, text)
+            paginator = CustomLimitOffsetPagination()
+            page = paginator.paginate_queryset(queryset, request, view=self)
+            serializer = self.get_serializer(page, many=True)
+            return self.store_response(paginator.get_paginated_response(serializer.data))
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(methods=["get"], detail=False, url_path="tags")
+    def tag_frequencies(self, request):
+        """
+        List tags with the number of videos carrying them, most used first.
+        Served from the precomputed Tag.video_count, takes an optional ?limit=.
+        """
+        if (cached := self.get_cached_response(request)) is not None:
+            return cached
+        try:
+            limit = max(min(int(request.query_params.get("limit", 100)), 1000), 0)
+        except ValueError:
+            return Response(
+                {"error": "limit must be a number"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        tags = (
+            Tag.objects.filter(video_count__gt=0)
+            .order_by("-video_count", "name")
+            .values("name", "video_count")[:limit]
+        )
+        return self.store_response(Response(list(tags)))
+
+    @action(methods=["get"], detail=False, url_path="trending")
+    def trending(self, request):
+        """
+        List the trending videos of all videos, a ?topic= or a ?topic= and ?subtopic=.
+        Served from the rankings precomputed by the compute_trending command with
+        one indexed read, takes an optional ?limit= and ?fields= / ?omit=.
+        """
+        if (cached := self.get_cached_response(request)) is not None:
+            return cached
+        try:
+            limit = max(min(int(request.query_params.get("limit", TRENDING_LIMIT)), TRENDING_LIMIT), 0)
+        except ValueError:
+            return Response(
+                {"error": "limit must be a number"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        entries = list(
+            TrendingVideo.objects.filter(
+                topic=request.query_params.get("topic", ""),
+                subtopic=request.query_params.get("subtopic", ""),
+            )
+            .select_related("video")
+            .defer("video__search_document")
+            .order_by("rank")[:limit]
+        )
+        serializer = self.get_serializer([entry.video for entry in entries], many=True)
+        return self.store_response(
+            Response(
+                {
+                    "computed_at": entries[0].computed_at if entries else None,
+                    "results": serializer.data,
+                }
+            )
+        )
+
+    @action(methods=["get"], detail=False, url_path="cache-stats")
+    def cache_stats(self, request):
+        """
+        Return the hit and miss counters of the video response cache.
+        """
+        return Response(get_cache_stats(self.cache_namespace))
+
+    def get_video_keys(self, identifier):
+        """
+        Resolve a video id or video_id to the video's (pk, video_id) with one indexed read.
+
+        Raises:
+            NotFound: If no video matches.
+        """
+        keys = Video.objects.identified_by(identifier).values_list("pk", "video_id").first()
+        if keys is None:
+            raise NotFound(f"No video found with id or video_id: {identifier}")
+        return keys
+
+    @action(methods=["get"], detail=True, url_path="related")
+    def related(self, request, *args, **kwargs):
+        """
+        List the videos related to a video, most similar first.
+        Served from the neighbours precomputed by the build_related_videos command
+        with one indexed read, takes an optional ?limit= and ?fields= / ?omit=.
+        """
+        if (cached := self.get_cached_response(request)) is not None:
+            return cached
+        try:
+            limit = max(min(int(request.query_params.get("limit", RELATED_LIMIT)), RELATED_LIMIT), 0)
+        except ValueError:
+            return Response(
+                {"error": "limit must be a number"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        pk, _ = self.get_video_keys(kwargs["pk"])
+        entries = (
+            RelatedVideo.objects.filter(video_id=pk)
+            .select_related("related")
+            .defer("related__search_document")
+            .order_by("rank")[:limit]
+        )
+        serializer = self.get_serializer([entry.related for entry in entries], many=True)
+        return self.store_response(Response(serializer.data))
+
+    @action(methods=["post"], detail=True, url_path="view")
+    def record_view(self, request, *args, **kwargs):
+        """
+        Count a view of a video.
+        The increment is buffered and written in batches, see videos.counters.
+        """
+        pk, _ = self.get_video_keys(kwargs["pk"])
+        counters.add(pk, "views")
+        return Response(status=status.HTTP_202_ACCEPTED)
+
+    @action(methods=["post", "delete"], detail=True, url_path="like")
+    def like(self, request, *args, **kwargs):
+        """
+        Like a video with POST or remove the like with DELETE.
+        A user likes a video at most once, Video.likes is adjusted through the
+        buffered counters when the like actually changes.
+        """
+        pk, video_id = self.get_video_keys(kwargs["pk"])
+        likes = VideoLike.objects.filter(user=request.user, video_id=video_id)
+        if request.method == "DELETE":
+            deleted, _ = likes.delete()
+            if deleted:
+                counters.add(pk, "likes", -1)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        try:
+            with transaction.atomic():
+                VideoLike.objects.create(user=request.user, video_id=video_id)
+        except IntegrityError:
+            return Response({"liked": True}, status=status.HTTP_200_OK)
+        counters.add(pk, "likes")
+        return Response({"liked": True}, status=status.HTTP_201_CREATED)
+
 
 # Create your views here.
-class UserSavedVideoViewSet(ModelViewSet):
+class UserSavedVideoViewSet(InstrumentedViewMixin, ModelViewSet):
     """
     A viewset for the UserSavedVideo model.
     """
@@ -267,6 +592,20 @@ class UserSavedVideoViewSet(ModelViewSet):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
 
+    def get_queryset(self):
+        """
+        Restrict every action to the requesting user's saves.
+        """
+        return super().get_queryset().filter(user=self.request.user)
+
+    def get_serializer_class(self):
+        """
+        Embed the saved videos when listing with ?expand=video.
+        """
+        if self.action == "list" and self.request.query_params.get("expand") == "video":
+            return UserSavedVideoExpandedSerializer
+        return super().get_serializer_class()
+
     def create(self, request, *args, **kwargs):
         """
         Create a new UserSavedVideo instance.
@@ -276,21 +615,15 @@ class UserSavedVideoViewSet(ModelViewSet):
             data["user"] = request.user.id
             serializer = self.get_serializer(data=data)
             serializer.is_valid(raise_exception=True)
-            self.perform_create(serializer)
-            headers = self.get_success_headers(serializer.data)
-
-            if serializer.data.get("user") != request.user.id:
-                return Response(
-                    {"error": "User does not match"}, status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # Check if video_id + user.id match is already in the UserSavedVideo table
-            if self.queryset.filter(
-                video_id=serializer.data.get("video_id"), user=request.user
-            ).exists():
+            # Duplicates are rejected by the (user, video) unique constraint.
+            try:
+                with transaction.atomic():
+                    self.perform_create(serializer)
+            except IntegrityError:
                 return Response(
                     {"error": "Video already saved"}, status=status.HTTP_400_BAD_REQUEST
                 )
+            headers = self.get_success_headers(serializer.data)
 
             return Response(
                 serializer.data, status=status.HTTP_201_CREATED, headers=headers
@@ -305,11 +638,21 @@ class UserSavedVideoViewSet(ModelViewSet):
             request (Request): The request object.
             *args: Variable length argument list.
             **kwargs: Arbitrary keyword arguments.
+        Query params:
+            expand: "video" embeds each saved video, joined in the same query.
+            limit / offset: paginate the listing, it is unpaginated without them.
         Returns:
             Response: A response object with the serialized data.
         """
         try:
-            queryset = self.filter_queryset(self.get_queryset())
+            queryset = self.filter_queryset(self.get_queryset()).order_by("id")
+            if request.query_params.get("expand") == "video":
+                queryset = queryset.select_related("video").defer("video__search_document")
+            if "limit" in request.query_params:
+                paginator = CustomLimitOffsetPagination()
+                page = paginator.paginate_queryset(queryset, request, view=self)
+                serializer = self.get_serializer(page, many=True)
+                return paginator.get_paginated_response(serializer.data)
             serializer = self.get_serializer(queryset, many=True)
             return Response(serializer.data)
         except Exception as e:
@@ -348,3 +691,226 @@ class UserSavedVideoViewSet(ModelViewSet):
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    def get_video_ids(self, request):
+        """
+        Validate the video_ids of a batch request.
+
+        They are read from the JSON body, or from a comma separated ?video_ids= on GET.
+
+        Returns:
+            list: The distinct video_ids in request order.
+        """
+        if request.method == "GET":
+            raw = request.query_params.get("video_ids", "")
+            data = {"video_ids": [video_id for video_id in raw.split(",") if video_id]}
+        else:
+            data = request.data
+        serializer = VideoIdsSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data["video_ids"]
+
+    @action(methods=["get", "post"], detail=False, url_path="saved-status")
+    def saved_status(self, request):
+        """
+        Report which of the given videos the user has saved, with one indexed query.
+        Args:
+            request (Request): The request object with up to 500 video_ids.
+        Returns:
+            Response: {"saved": {video_id: bool}} in request order.
+        """
+        video_ids = self.get_video_ids(request)
+        saved = set(
+            self.get_queryset()
+            .filter(video_id__in=video_ids)
+            .values_list("video_id", flat=True)
+        )
+        return Response({"saved": {video_id: video_id in saved for video_id in video_ids}})
+
+    @action(methods=["post"], detail=False, url_path="bulk-save")
+    def bulk_save(self, request):
+        """
+        Save many videos in one transaction, already saved ones are skipped.
+        Args:
+            request (Request): The request object with up to 500 video_ids.
+        Returns:
+            Response: {"created": [...], "already_saved": [...]}
+        """
+        video_ids = self.get_video_ids(request)
+        model = self.get_serializer_class().Meta.model
+        with transaction.atomic():
+            existing = set(
+                self.get_queryset()
+                .filter(video_id__in=video_ids)
+                .values_list("video_id", flat=True)
+            )
+            created = [video_id for video_id in video_ids if video_id not in existing]
+            # ignore_conflicts covers saves made by a concurrent request.
+            model.objects.bulk_create(
+                [model(user=request.user, video_id=video_id) for video_id in created],
+                ignore_conflicts=True,
+            )
+        return Response(
+            {"created": created, "already_saved": [v for v in video_ids if v in existing]},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+    @action(methods=["post"], detail=False, url_path="bulk-unsave")
+    def bulk_unsave(self, request):
+        """
+        Unsave many videos with a single DELETE.
+        Args:
+            request (Request): The request object with up to 500 video_ids.
+        Returns:
+            Response: {"deleted": <number of removed saves>}
+        """
+        video_ids = self.get_video_ids(request)
+        deleted, _ = self.get_queryset().filter(video_id__in=video_ids).delete()
+        return Response({"deleted": deleted})
+
+
+class UserVideoListViewSet(ModelViewSet):
+    """
+    A viewset for the UserVideoList model and the videos in each list.
+    """
+
+    serializer_class = UserVideoListSerializer
+    queryset = UserVideoListSerializer.Meta.model.objects.all()
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+
+    def get_queryset(self):
+        """
+        Restrict every action to the requesting user's lists.
+
+        A retrieved list prefetches its entries in list order, joined with their
+        videos, so the whole list costs two queries.
+        """
+        queryset = super().get_queryset().filter(user=self.request.user)
+        if self.action == "retrieve":
+            entries = (
+                ListVideo.objects.select_related("video")
+                .defer("video__search_document")
+                .order_by("position", "id")
+            )
+            queryset = queryset.prefetch_related(Prefetch("entries", queryset=entries))
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == "retrieve":
+            return UserVideoListDetailSerializer
+        return super().get_serializer_class()
+
+    def save_list(self, serializer, **kwargs):
+        # Duplicate list_ids are rejected by the (user, list_id) unique constraint.
+        try:
+            with transaction.atomic():
+                serializer.save(**kwargs)
+        except IntegrityError:
+            raise ValidationError({"list_id": ["Video list already exists."]})
+
+    def perform_create(self, serializer):
+        self.save_list(serializer, user=self.request.user)
+
+    def perform_update(self, serializer):
+        self.save_list(serializer)
+
+    def get_video_ids(self, request, serializer_class=VideoIdsSerializer):
+        serializer = serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    @action(methods=["post"], detail=True, url_path="videos")
+    def append(self, request, *args, **kwargs):
+        """
+        Append up to 500 videos to the end of the list.
+        Args:
+            request (Request): The request object with {"video_ids": [...]}.
+        Returns:
+            Response: {"added": [...], "already_listed": [...]}
+        """
+        video_list = self.get_object()
+        added, already_listed = append_videos(video_list, self.get_video_ids(request)["video_ids"])
+        return Response(
+            {"added": added, "already_listed": already_listed},
+            status=status.HTTP_201_CREATED if added else status.HTTP_200_OK,
+        )
+
+    @action(methods=["post"], detail=True, url_path="remove-videos")
+    def remove(self, request, *args, **kwargs):
+        """
+        Remove up to 500 videos from the list with a single DELETE.
+        Args:
+            request (Request): The request object with {"video_ids": [...]}.
+        Returns:
+            Response: {"deleted": <number of removed videos>}
+        """
+        video_list = self.get_object()
+        deleted = remove_videos(video_list, self.get_video_ids(request)["video_ids"])
+        return Response({"deleted": deleted})
+
+    @action(methods=["post"], detail=True, url_path="reorder")
+    def reorder(self, request, *args, **kwargs):
+        """
+        Move a block of videos to directly after another video of the list.
+        Args:
+            request (Request): The request object with {"video_ids": [...], "after": video_id},
+                "after" null or missing moves the block to the top.
+        Returns:
+            Response: {"updated": <number of rewritten positions>}
+        """
+        video_list = self.get_object()
+        data = self.get_video_ids(request, VideoMoveSerializer)
+        updated = move_videos(video_list, data["video_ids"], data["after"])
+        return Response({"updated": updated})
+
+
+class TopicTreeViewSet(ResponseCacheMixin, GenericViewSet):
+    """
+    A read-only viewset serving the topic taxonomy as a tree with video counts.
+    Anonymous responses are cached until videos or topics change.
+    """
+
+    queryset = Topic.objects.all()
+    permission_classes = [AllowAny]
+    cache_namespace = TOPIC_CACHE_NAMESPACE
+    cache_depends_on = [VIDEO_CACHE_NAMESPACE]
+
+    def list(self, request, *args, **kwargs):
+        """
+        List every topic with its subtopics and the number of videos in each.
+        The counts come from one aggregate query over the videos' topic and
+        subtopic. Topics and subtopics that only appear on videos are included
+        with a null id, videos without a subtopic only count towards their topic.
+        """
+        if (cached := self.get_cached_response(request)) is not None:
+            return cached
+        counts = defaultdict(dict)
+        rows = Video.objects.values("topic", "subtopic").annotate(count=Count("pk")).order_by()
+        for row in rows:
+            counts[row["topic"]][row["subtopic"]] = row["count"]
+
+        def node(id, name, description, video_count, **extra):
+            return {"id": id, "name": name, "description": description, "video_count": video_count, **extra}
+
+        tree = []
+        topics = self.get_queryset().prefetch_related("subtopic_set").order_by("name")
+        for topic in topics:
+            topic_counts = counts.pop(topic.name, {})
+            total = sum(topic_counts.values())
+            subtopics = [
+                node(sub.id, sub.name, sub.description, topic_counts.pop(sub.name, 0))
+                for sub in sorted(topic.subtopic_set.all(), key=lambda sub: sub.name)
+            ]
+            subtopics += [
+                node(None, name, None, count)
+                for name, count in sorted(topic_counts.items())
+                if name
+            ]
+            tree.append(node(topic.id, topic.name, topic.description, total, subtopics=subtopics))
+        for name, topic_counts in sorted(counts.items()):
+            subtopics = [
+                node(None, sub, None, count) for sub, count in sorted(topic_counts.items()) if sub
+            ]
+            tree.append(node(None, name, None, sum(topic_counts.values()), subtopics=subtopics))
+        return self.store_response(Response(tree))
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 import dj_database_url
 
@@ -66,7 +67,9 @@ CORS_ALLOW_ORIGINS = [
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "api.static.StaticFilesMiddleware",
+    "api.instrumentation.InstrumentationMiddleware",
+    "api.compression.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -99,10 +102,24 @@ WSGI_APPLICATION = "mttBackend.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Seconds a connection is kept open between requests, 0 closes it after each
+# request. The app is served under ASGI, where every request runs its sync code
+# in a fresh thread and persistent connections pile up, so keep it at 0 there
+# and put an external pooler such as PgBouncer in front of the database. Under
+# WSGI a value like 60 saves the connection setup on every request, see the
+# connections benchmark.
+DATABASE_CONN_MAX_AGE = int(os.getenv("DATABASE_CONN_MAX_AGE", "0"))
+# Check a persistent connection is still usable before reusing it
+DATABASE_CONN_HEALTH_CHECKS = os.getenv("DATABASE_CONN_HEALTH_CHECKS", "true").lower() in ("1", "true", "yes")
+
 # Default to PostgreSQL
 database_config = {}
 if os.getenv("DATABASE_URL"):
-    database_config = dj_database_url.config(default=os.getenv("DATABASE_URL"))
+    database_config = dj_database_url.config(
+        default=os.getenv("DATABASE_URL"),
+        conn_max_age=DATABASE_CONN_MAX_AGE,
+        conn_health_checks=DATABASE_CONN_HEALTH_CHECKS,
+    )
 elif os.getenv("MYSQLDATABASE"):
     database_config = {
         "ENGINE": "django.db.backends.mysql",
@@ -115,6 +132,8 @@ elif os.getenv("MYSQLDATABASE"):
             "charset": "utf8mb4",
             "init_command": "SET sql_mode='STRICT_TRANS_TABLES'; SET collation_connection='utf8mb4_unicode_ci';",
         },
+        "CONN_MAX_AGE": DATABASE_CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": DATABASE_CONN_HEALTH_CHECKS,
     }
 else:
     database_config = {
@@ -125,6 +144,61 @@ else:
 DATABASES = {"default": database_config}
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+# Default to the in-process cache, set REDIS_URL to share it between workers.
+# The API response cache is invalidated by counters kept in this cache, so
+# with the in-process cache a write only invalidates the responses cached by
+# the process that handled it: run a single process, or set REDIS_URL.
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Cache alias and timeout (seconds) used for cached API responses
+API_CACHE_ALIAS = os.getenv("API_CACHE_ALIAS", "default")
+API_CACHE_TIMEOUT = int(os.getenv("API_CACHE_TIMEOUT", "300"))
+# Responses smaller than this many bytes are not compressed.
+API_COMPRESSION_MIN_SIZE = int(os.getenv("API_COMPRESSION_MIN_SIZE", "1024"))
+
+# Fraction of requests measured by api.instrumentation.InstrumentationMiddleware,
+# and how many times a statement must run in one request to be flagged as an N+1.
+# Test runs sample nothing, the instrumentation tests enable it themselves.
+if sys.argv[1:2] == ["test"]:
+    API_INSTRUMENTATION_SAMPLE_RATE = 0.0
+else:
+    API_INSTRUMENTATION_SAMPLE_RATE = float(os.getenv("API_INSTRUMENTATION_SAMPLE_RATE", "0.01"))
+API_INSTRUMENTATION_DUPLICATE_THRESHOLD = int(
+    os.getenv("API_INSTRUMENTATION_DUPLICATE_THRESHOLD", "3")
+)
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "api.performance": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
+}
+
+# Video views and likes increments are buffered per process and written at most
+# this many seconds later, or once this many videos have pending increments
+VIDEO_COUNTER_FLUSH_INTERVAL = int(os.getenv("VIDEO_COUNTER_FLUSH_INTERVAL", "10"))
+VIDEO_COUNTER_MAX_PENDING = int(os.getenv("VIDEO_COUNTER_MAX_PENDING", "1000"))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -173,6 +247,16 @@ REST_FRAMEWORK = {
         "rest_framework.authentication.TokenAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ),
+    # orjson based, with the stdlib json module as a fallback
+    "DEFAULT_RENDERER_CLASSES": (
+        "api.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "api.renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 50,
 }
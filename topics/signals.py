@@ -0,0 +1,29 @@
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from api.cache import TOPIC_CACHE_NAMESPACE
+from api.cache import VIDEO_CACHE_NAMESPACE
+from api.cache import bump_generation
+from videos.models import Video
+
+from .models import Subtopic
+from .models import Topic
+
+
+@receiver(post_save, sender=Topic)
+@receiver(post_save, sender=Subtopic)
+@receiver(post_delete, sender=Topic)
+@receiver(post_delete, sender=Subtopic)
+def taxonomy_changed(sender, **kwargs):
+    """
+    Relink every video to its subtopic and invalidate the cached topic tree and
+    video responses.
+
+    Topics change rarely and a rename can move videos between subtopics, so the
+    whole catalog is relinked with the single UPDATE of link_subtopics. Cached
+    video lists filtered by ?topic_id= / ?subtopic_id= read those links.
+    """
+    Video.objects.link_subtopics()
+    bump_generation(TOPIC_CACHE_NAMESPACE)
+    bump_generation(VIDEO_CACHE_NAMESPACE)
@@ -1,6 +1,22 @@
 from django.contrib import admin
-from .models import UserSavedVideo, UserVideoList, ListVideo
+from .models import UserSavedVideo, UserVideoList, ListVideo, VideoLike
+
+
+class UserSavedVideoAdmin(admin.ModelAdmin):
+    # A select box would load the whole video catalog.
+    raw_id_fields = ["video"]
+
+
+class VideoLikeAdmin(admin.ModelAdmin):
+    raw_id_fields = ["video"]
+
+
+class ListVideoAdmin(admin.ModelAdmin):
+    raw_id_fields = ["list_id", "video"]
+
+
 # Register your models here.
-admin.site.register(UserSavedVideo)
+admin.site.register(UserSavedVideo, UserSavedVideoAdmin)
 admin.site.register(UserVideoList)
-admin.site.register(ListVideo)
+admin.site.register(ListVideo, ListVideoAdmin)
+admin.site.register(VideoLike, VideoLikeAdmin)
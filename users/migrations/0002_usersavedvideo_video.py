@@ -0,0 +1,40 @@
+# Generated by Django 5.0.7 on 2026-10-18 06:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('videos', '0008_tag_videotag'),
+    ]
+
+    # The existing video_id column becomes the foreign key column in place, so
+    # saved rows are kept. The database only widens the column to match
+    # Video.video_id, makes it nullable and indexes it; no constraint is added
+    # because saves may point at videos that were deleted.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.AlterField(
+                    model_name='usersavedvideo',
+                    name='video_id',
+                    field=models.CharField(db_index=True, max_length=255, null=True),
+                ),
+            ],
+            state_operations=[
+                migrations.RenameField(
+                    model_name='usersavedvideo',
+                    old_name='video_id',
+                    new_name='video',
+                ),
+                migrations.AlterField(
+                    model_name='usersavedvideo',
+                    name='video',
+                    field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='saves', to='videos.video', to_field='video_id'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.7 on 2026-10-18 06:53
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_saves(apps, schema_editor):
+    """
+    Keep the oldest save of every (user, video) pair so the constraint can be added.
+    The old create view saved before checking, so duplicates may exist.
+    """
+    UserSavedVideo = apps.get_model("users", "UserSavedVideo")
+    duplicates = (
+        UserSavedVideo.objects.values("user_id", "video_id")
+        .annotate(keep=Min("id"), saves=Count("id"))
+        .filter(saves__gt=1)
+        .order_by()
+    )
+    for duplicate in duplicates:
+        UserSavedVideo.objects.filter(
+            user_id=duplicate["user_id"], video_id=duplicate["video_id"]
+        ).exclude(id=duplicate["keep"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_usersavedvideo_video'),
+        ('videos', '0008_tag_videotag'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_saves, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='usersavedvideo',
+            constraint=models.UniqueConstraint(fields=('user', 'video'), name='unique_user_saved_video'),
+        ),
+    ]
@@ -0,0 +1,121 @@
+# Generated by Django 5.0.7 on 2026-10-18 06:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+POSITION_GAP = 1024
+
+
+def number_positions(apps, schema_editor):
+    """
+    Space the entries of every list POSITION_GAP apart in their insertion order.
+    """
+    ListVideo = apps.get_model("users", "ListVideo")
+    list_ids = ListVideo.objects.values_list("list_id_id", flat=True).distinct().order_by()
+    for list_id in list_ids:
+        entries = list(ListVideo.objects.filter(list_id_id=list_id).order_by("id"))
+        for index, entry in enumerate(entries, start=1):
+            entry.position = index * POSITION_GAP
+        ListVideo.objects.bulk_update(entries, ["position"], batch_size=500)
+
+
+def remove_duplicate_entries(apps, schema_editor):
+    """
+    Keep the first entry of every (list, video) pair so the constraint can be added.
+    """
+    ListVideo = apps.get_model("users", "ListVideo")
+    duplicates = (
+        ListVideo.objects.values("list_id_id", "video_id")
+        .annotate(keep=Min("id"), entries=Count("id"))
+        .filter(entries__gt=1)
+        .order_by()
+    )
+    for duplicate in duplicates:
+        ListVideo.objects.filter(
+            list_id_id=duplicate["list_id_id"], video_id=duplicate["video_id"]
+        ).exclude(id=duplicate["keep"]).delete()
+
+
+def rename_duplicate_lists(apps, schema_editor):
+    """
+    Give every list but the oldest of a duplicated (user, list_id) a unique list_id.
+
+    Lists are renamed rather than deleted so their videos are kept.
+    """
+    UserVideoList = apps.get_model("users", "UserVideoList")
+    duplicates = (
+        UserVideoList.objects.values("user_id", "list_id")
+        .annotate(keep=Min("id"), lists=Count("id"))
+        .filter(lists__gt=1)
+        .order_by()
+    )
+    for duplicate in duplicates:
+        renamed = UserVideoList.objects.filter(
+            user_id=duplicate["user_id"], list_id=duplicate["list_id"]
+        ).exclude(id=duplicate["keep"])
+        for video_list in renamed:
+            suffix = f"-{video_list.id}"
+            video_list.list_id = video_list.list_id[: 100 - len(suffix)] + suffix
+            video_list.save(update_fields=["list_id"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_usersavedvideo_unique_user_video'),
+        ('videos', '0008_tag_videotag'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    # ListVideo.video_id becomes a foreign key column in place, like
+    # UserSavedVideo.video_id in 0002, so existing entries are kept.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.AlterField(
+                    model_name='listvideo',
+                    name='video_id',
+                    field=models.CharField(db_index=True, max_length=255, null=True),
+                ),
+            ],
+            state_operations=[
+                migrations.RenameField(
+                    model_name='listvideo',
+                    old_name='video_id',
+                    new_name='video',
+                ),
+                migrations.AlterField(
+                    model_name='listvideo',
+                    name='video',
+                    field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='list_entries', to='videos.video', to_field='video_id'),
+                ),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='listvideo',
+            name='list_id',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='users.uservideolist'),
+        ),
+        migrations.AddField(
+            model_name='listvideo',
+            name='position',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(number_positions, migrations.RunPython.noop),
+        migrations.RunPython(remove_duplicate_entries, migrations.RunPython.noop),
+        migrations.RunPython(rename_duplicate_lists, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='listvideo',
+            index=models.Index(fields=['list_id', 'position'], name='listvideo_list_position_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='listvideo',
+            constraint=models.UniqueConstraint(fields=('list_id', 'video'), name='unique_list_video'),
+        ),
+        migrations.AddConstraint(
+            model_name='uservideolist',
+            constraint=models.UniqueConstraint(fields=('user', 'list_id'), name='unique_user_video_list'),
+        ),
+    ]
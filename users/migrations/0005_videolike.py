@@ -0,0 +1,30 @@
+# Generated by Django 5.0.7 on 2026-10-18 06:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_listvideo_video_position'),
+        ('videos', '0008_tag_videotag'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoLike',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('video', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='user_likes', to='videos.video', to_field='video_id')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='videolike',
+            constraint=models.UniqueConstraint(fields=('user', 'video'), name='unique_user_video_like'),
+        ),
+    ]
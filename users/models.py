@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from videos.models import Video
+
 User = get_user_model()
 
 
@@ -28,6 +30,11 @@ class UserVideoList(models.Model):
     thumbnail = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "list_id"], name="unique_user_video_list"),
+        ]
+
     def __str__(self):
         return f"{self.title}"
 
@@ -38,14 +45,36 @@ class ListVideo(models.Model):
 
     Args:
         list_id: The video list to which the video belongs.
-        video_id: The unique identifier for the video.
+        video: The video, joined on Video.video_id. Its column stays video_id
+            and may name a video that no longer exists.
+        position: The sort key within the list. Positions are spaced
+            POSITION_GAP apart so a moved video takes a free value between its
+            new neighbours, see api.lists.
 
     Returns:
         str: The identifier of the video.
     """
 
-    list_id = models.ForeignKey(UserVideoList, on_delete=models.CASCADE)
-    video_id = models.CharField(max_length=100)
+    POSITION_GAP = 1024
+
+    list_id = models.ForeignKey(UserVideoList, on_delete=models.CASCADE, related_name="entries")
+    video = models.ForeignKey(
+        Video,
+        to_field="video_id",
+        db_constraint=False,
+        null=True,
+        on_delete=models.DO_NOTHING,
+        related_name="list_entries",
+    )
+    position = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["list_id", "video"], name="unique_list_video"),
+        ]
+        indexes = [
+            models.Index(fields=["list_id", "position"], name="listvideo_list_position_idx"),
+        ]
 
     def __str__(self):
         return f"{self.video_id}"
@@ -57,13 +86,62 @@ class UserSavedVideo(models.Model):
 
     Args:
         user: The user who saved the video.
-        video_id: The unique identifier for the saved video.
+        video: The saved video, joined on Video.video_id. Its column stays
+            video_id and may name a video that no longer exists.
 
     Returns:
         str: The identifier of the saved video.
     """
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    video_id = models.CharField(max_length=100)
+    video = models.ForeignKey(
+        Video,
+        to_field="video_id",
+        db_constraint=False,
+        null=True,
+        on_delete=models.DO_NOTHING,
+        related_name="saves",
+    )
+
+    class Meta:
+        # The constraint's index also serves the per-user listing.
+        constraints = [
+            models.UniqueConstraint(fields=["user", "video"], name="unique_user_saved_video"),
+        ]
+
+    def __str__(self):
+        return f"{self.video_id}"
+
+
+class VideoLike(models.Model):
+    """
+    A model to represent a like of a video by a user.
+
+    A user likes a video at most once. Video.likes holds the denormalized
+    count and is adjusted through videos.counters when a like is added or removed.
+
+    Args:
+        user: The user who liked the video.
+        video: The liked video, joined on Video.video_id.
+        created_at: The date and time when the video was liked.
+
+    Returns:
+        str: The identifier of the liked video.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    video = models.ForeignKey(
+        Video,
+        to_field="video_id",
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+        related_name="user_likes",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "video"], name="unique_user_video_like"),
+        ]
 
     def __str__(self):
         return f"{self.video_id}"
@@ -0,0 +1,20 @@
+# SQLite caps the number of bound parameters per statement (999 before 3.32),
+# so statements binding one parameter per row are split into batches of this size.
+MAX_QUERY_PARAMETERS = 900
+
+
+def batches(items, size=MAX_QUERY_PARAMETERS):
+    """
+    Split items into lists of at most size items.
+
+    Args:
+        items: An iterable, e.g. primary keys to bind in an IN clause.
+        size: The batch size. Statements binding several parameters per item
+            pass MAX_QUERY_PARAMETERS divided by that number.
+
+    Yields:
+        list: The next batch.
+    """
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
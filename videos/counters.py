@@ -0,0 +1,137 @@
+import atexit
+import logging
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db import close_old_connections
+from django.db.models import Case
+from django.db.models import IntegerField
+from django.db.models import Value
+from django.db.models import When
+
+from .batching import MAX_QUERY_PARAMETERS
+from .batching import batches
+from .models import Video
+
+logger = logging.getLogger(__name__)
+
+# Every row in a batch binds its pk twice (WHERE and CASE) plus its increment.
+BATCH_SIZE = MAX_QUERY_PARAMETERS // 3
+COUNTER_FIELDS = ("views", "likes")
+
+
+class CounterBuffer:
+    """
+    An in-process buffer of likes and views increments.
+
+    Recording an increment only adds to a dict. The buffered increments are
+    written with one UPDATE per batch of videos, adding the increment to the
+    stored value with F() so concurrent writers never lose an update and no row
+    is locked per request.
+
+    Requests never write: a daemon thread, started by the first increment
+    recorded, flushes the buffer every flush_interval seconds, or as soon as it
+    holds max_pending videos, and stops once the buffer stays empty. The buffer
+    is also flushed at interpreter exit. Increments whose UPDATE fails are put
+    back into the buffer and written by a later flush.
+
+    Flushes leave the response cache alone: counts change on nearly every
+    request and invalidating every flush would leave nothing cached. Cached
+    responses and video list ETags expire after API_CACHE_TIMEOUT seconds, so
+    the counts they show are at most that old (plus flush_interval).
+
+    Args:
+        flush_interval: Seconds increments may wait in the buffer.
+        max_pending: The number of buffered videos that forces a flush.
+    """
+
+    def __init__(self, flush_interval=10, max_pending=1000):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._pending = {field: Counter() for field in COUNTER_FIELDS}
+        self._wake = threading.Event()
+        self._flusher = None
+
+    def add(self, video_pk, field, amount=1):
+        """
+        Buffer an increment of a video's views or likes.
+
+        Args:
+            video_pk: The primary key of the video.
+            field: "views" or "likes".
+            amount: The increment, negative to decrement.
+        """
+        with self._lock:
+            self._pending[field][video_pk] += amount
+            # A forked worker does not inherit the thread, is_alive() is False there.
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(
+                    target=self._flush_periodically, name="video-counter-flush", daemon=True
+                )
+                self._flusher.start()
+            if len(self._pending[field]) >= self.max_pending:
+                self._wake.set()
+
+    def _flush_periodically(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except DatabaseError:
+                logger.exception("Could not write the video counters, retrying at the next flush.")
+            finally:
+                # The thread has its own connections, closed like a request's.
+                close_old_connections()
+            with self._lock:
+                if not any(self._pending.values()):
+                    self._flusher = None
+                    return
+
+    def flush(self):
+        """
+        Write every buffered increment to the database.
+
+        Returns:
+            int: The number of updated rows.
+
+        Raises:
+            DatabaseError: If an UPDATE fails. The increments it did not write
+                are back in the buffer.
+        """
+        with self._lock:
+            buffered = self._pending
+            self._pending = {field: Counter() for field in COUNTER_FIELDS}
+        # Emptied as batches are written, what is left goes back on failure.
+        pending = {
+            field: {pk: amount for pk, amount in increments.items() if amount}
+            for field, increments in buffered.items()
+        }
+        updated = 0
+        try:
+            for field, increments in pending.items():
+                for batch in batches(increments, BATCH_SIZE):
+                    increment = Case(
+                        *[When(pk=pk, then=Value(increments[pk])) for pk in batch],
+                        default=Value(0),
+                        output_field=IntegerField(),
+                    )
+                    updated += Video.objects.filter(pk__in=batch).add_to_counter(field, increment)
+                    for pk in batch:
+                        del increments[pk]
+        except DatabaseError:
+            with self._lock:
+                for field, increments in pending.items():
+                    self._pending[field].update(increments)
+            raise
+        return updated
+
+
+counters = CounterBuffer(
+    flush_interval=getattr(settings, "VIDEO_COUNTER_FLUSH_INTERVAL", 10),
+    max_pending=getattr(settings, "VIDEO_COUNTER_MAX_PENDING", 1000),
+)
+atexit.register(counters.flush)
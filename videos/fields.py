@@ -0,0 +1,16 @@
+from django.db import models
+
+
+class SearchDocumentField(models.TextField):
+    """
+    A precomputed full-text search document.
+
+    Stored as a tsvector on PostgreSQL, where it is GIN indexed, and as plain
+    text on the other backends. Values are written with
+    videos.search.refresh_search_documents, never by hand.
+    """
+
+    def db_type(self, connection):
+        if connection.vendor == "postgresql":
+            return "tsvector"
+        return super().db_type(connection)
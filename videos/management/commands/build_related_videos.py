@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from videos.related import RELATED_LIMIT
+from videos.related import build_related_videos
+
+
+class Command(BaseCommand):
+    help = "Recompute the related videos of every video from shared tags and co-saves."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=RELATED_LIMIT,
+            help="Number of related videos kept per video.",
+        )
+
+    def handle(self, *args, **options):
+        stored = build_related_videos(limit=options["limit"])
+        self.stdout.write(f"Stored {stored} related video entries.")
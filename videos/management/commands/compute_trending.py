@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from videos.trending import TRENDING_LIMIT
+from videos.trending import compute_trending
+
+
+class Command(BaseCommand):
+    help = "Recompute the trending rankings of all videos, every topic and every subtopic."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=TRENDING_LIMIT,
+            help="Number of videos kept per ranking.",
+        )
+
+    def handle(self, *args, **options):
+        stored = compute_trending(limit=options["limit"])
+        self.stdout.write(f"Stored {stored} trending entries.")
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.7 on 2026-10-18 06:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0003_alter_video_description_alter_video_title'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['topic', 'subtopic', '-publishedAt'], name='video_topic_subtopic_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['topic', '-views'], name='video_topic_views_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['topic', '-likes'], name='video_topic_likes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['-publishedAt'], name='video_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['-views'], name='video_views_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['-likes'], name='video_likes_idx'),
+        ),
+    ]
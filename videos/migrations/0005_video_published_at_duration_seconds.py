@@ -0,0 +1,93 @@
+# Generated by Django 5.0.7 on 2026-10-18 06:46
+
+from datetime import timezone
+
+from django.db import migrations, models
+from django.utils.dateparse import parse_datetime
+from django.utils.dateparse import parse_duration
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+# Copies of videos.models.parse_published_at and parse_duration_seconds as they
+# were when this migration was written, so later changes to them do not change
+# what the backfill does.
+def parse_published_at(value):
+    try:
+        published_at = parse_datetime(value or "")
+    except ValueError:
+        return None
+    if published_at is not None and published_at.tzinfo is None:
+        published_at = published_at.replace(tzinfo=timezone.utc)
+    return published_at
+
+
+def parse_duration_seconds(value):
+    # parse_duration reads an empty string as a zero duration.
+    duration = parse_duration(value) if value else None
+    if duration is None:
+        return None
+    return max(int(duration.total_seconds()), 0)
+
+
+def backfill_typed_fields(apps, schema_editor):
+    """
+    Fill published_at and duration_seconds for existing videos, one primary key
+    range at a time so the whole table is never loaded at once.
+    """
+    Video = apps.get_model("videos", "Video")
+    last_pk = 0
+    while True:
+        batch = list(
+            Video.objects.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .only("pk", "publishedAt", "duration")[:BACKFILL_BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for video in batch:
+            video.published_at = parse_published_at(video.publishedAt)
+            video.duration_seconds = parse_duration_seconds(video.duration)
+        Video.objects.bulk_update(batch, ["published_at", "duration_seconds"])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0004_video_list_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='video',
+            name='video_topic_subtopic_pub_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='video',
+            name='video_published_idx',
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='duration_seconds',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='published_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_typed_fields, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['topic', 'subtopic', '-published_at'], name='video_topic_subtopic_pubat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['-published_at'], name='video_published_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['duration_seconds'], name='video_duration_seconds_idx'),
+        ),
+    ]
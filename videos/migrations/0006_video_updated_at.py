@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-18 06:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0005_video_published_at_duration_seconds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.0.7 on 2026-10-18 06:50
+
+import videos.fields
+from django.db import migrations
+
+from videos.search import refresh_search_documents
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def backfill_search_documents(apps, schema_editor):
+    """
+    Compute the search document of existing videos one primary key range at a time.
+    """
+    Video = apps.get_model("videos", "Video")
+    last_pk = 0
+    while True:
+        pks = list(
+            Video.objects.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:BACKFILL_BATCH_SIZE]
+        )
+        if not pks:
+            break
+        refresh_search_documents(Video.objects.filter(pk__gte=pks[0], pk__lte=pks[-1]))
+        last_pk = pks[-1]
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX video_search_document_idx ON videos_video USING gin (search_document)"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS video_search_document_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0006_video_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='search_document',
+            field=videos.fields.SearchDocumentField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+        # GIN indexes only exist on PostgreSQL, the other backends scan the text column.
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
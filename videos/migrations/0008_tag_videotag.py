@@ -0,0 +1,86 @@
+# Generated by Django 5.0.7 on 2026-10-18 06:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from videos.tags import tag_names
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def backfill_tags(apps, schema_editor):
+    """
+    Build the tag index of existing videos one primary key range at a time,
+    then compute every tag's video_count with a single UPDATE.
+    """
+    Video = apps.get_model("videos", "Video")
+    Tag = apps.get_model("videos", "Tag")
+    VideoTag = apps.get_model("videos", "VideoTag")
+    last_pk = 0
+    while True:
+        rows = list(
+            Video.objects.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", "tags")[:BACKFILL_BATCH_SIZE]
+        )
+        if not rows:
+            break
+        names_by_video = {pk: tag_names(tags) for pk, tags in rows}
+        names = set().union(*names_by_video.values())
+        Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+        tag_ids = {}
+        names = list(names)
+        for start in range(0, len(names), BACKFILL_BATCH_SIZE):
+            batch = names[start : start + BACKFILL_BATCH_SIZE]
+            tag_ids.update(Tag.objects.filter(name__in=batch).values_list("name", "pk"))
+        VideoTag.objects.bulk_create(
+            [
+                VideoTag(video_id=pk, tag_id=tag_ids[name])
+                for pk, video_names in names_by_video.items()
+                for name in video_names
+            ],
+            ignore_conflicts=True,
+        )
+        last_pk = rows[-1][0]
+
+    count = (
+        VideoTag.objects.filter(tag=OuterRef("pk"))
+        .order_by()
+        .values("tag")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    Tag.objects.update(video_count=Coalesce(Subquery(count), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0007_video_search_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('video_count', models.PositiveIntegerField(db_index=True, default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VideoTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='video_tags', to='videos.tag')),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='video_tags', to='videos.video')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='videotag',
+            constraint=models.UniqueConstraint(fields=('tag', 'video'), name='unique_video_tag'),
+        ),
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+    ]
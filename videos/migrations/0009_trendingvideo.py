@@ -0,0 +1,30 @@
+# Generated by Django 5.0.7 on 2026-10-18 06:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0008_tag_videotag'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingVideo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(blank=True, max_length=50)),
+                ('subtopic', models.CharField(blank=True, max_length=50)),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('computed_at', models.DateTimeField()),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='videos.video')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='trendingvideo',
+            constraint=models.UniqueConstraint(fields=('topic', 'subtopic', 'rank'), name='unique_trending_rank'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.7 on 2026-10-18 06:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0009_trendingvideo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedVideo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='videos.video')),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='videos.video')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='relatedvideo',
+            constraint=models.UniqueConstraint(fields=('video', 'rank'), name='unique_related_rank'),
+        ),
+    ]
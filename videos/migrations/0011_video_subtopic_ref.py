@@ -0,0 +1,35 @@
+# Generated by Django 5.0.7 on 2026-10-18 06:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def link_subtopics(apps, schema_editor):
+    """
+    Link existing videos to the Subtopic matching their topic and subtopic names
+    with a single UPDATE.
+    """
+    Video = apps.get_model("videos", "Video")
+    Subtopic = apps.get_model("topics", "Subtopic")
+    match = Subtopic.objects.filter(
+        name=OuterRef("subtopic"), topic__name=OuterRef("topic")
+    ).order_by("pk")
+    Video.objects.update(subtopic_ref=Subquery(match.values("pk")[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('topics', '0001_initial'),
+        ('videos', '0010_relatedvideo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='subtopic_ref',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='videos', to='topics.subtopic'),
+        ),
+        migrations.RunPython(link_subtopics, migrations.RunPython.noop),
+    ]
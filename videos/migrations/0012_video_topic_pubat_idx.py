@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-18 07:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('topics', '0001_initial'),
+        ('videos', '0011_video_subtopic_ref'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['topic', '-published_at'], name='video_topic_pubat_idx'),
+        ),
+    ]
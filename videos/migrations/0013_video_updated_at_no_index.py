@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-18 08:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0012_video_topic_pubat_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='video',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
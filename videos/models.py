@@ -1,4 +1,159 @@
+from datetime import timezone
+
 from django.db import models
+from django.db.models import Case
+from django.db.models import F
+from django.db.models import OuterRef
+from django.db.models import Q
+from django.db.models import Subquery
+from django.db.models import Value
+from django.db.models import When
+from django.db.models.functions import Now
+from django.utils.dateparse import parse_datetime
+from django.utils.dateparse import parse_duration
+
+from api.cache import VIDEO_CACHE_NAMESPACE
+from api.cache import bump_generation
+from topics.models import Subtopic
+
+from .fields import SearchDocumentField
+from .search import refresh_search_documents
+
+
+def parse_published_at(value):
+    """
+    Parse an ISO 8601 publishedAt string into an aware datetime.
+
+    Args:
+        value: The publishedAt string, e.g. "2024-07-25T15:13:00Z".
+
+    Returns:
+        datetime: The parsed datetime in UTC if no offset is given, or None if the
+            value is blank or not a valid datetime.
+    """
+    try:
+        published_at = parse_datetime(value or "")
+    except ValueError:
+        return None
+    if published_at is not None and published_at.tzinfo is None:
+        published_at = published_at.replace(tzinfo=timezone.utc)
+    return published_at
+
+
+def parse_duration_seconds(value):
+    """
+    Parse an ISO 8601 duration string into whole seconds.
+
+    Args:
+        value: The duration string, e.g. "PT1H2M3S".
+
+    Returns:
+        int: The duration in seconds, or None if the value is blank or invalid.
+    """
+    # parse_duration reads an empty string as a zero duration.
+    duration = parse_duration(value) if value else None
+    if duration is None:
+        return None
+    return max(int(duration.total_seconds()), 0)
+
+
+class VideoQuerySet(models.QuerySet):
+    """
+    A queryset for the Video model.
+
+    The bulk writes, which send no model signals, invalidate the cached video
+    responses themselves. Saves and instance deletes do it in videos.signals.
+    """
+
+    def identified_by(self, identifier):
+        """
+        Filter down to the video an API identifier names, in one indexed query.
+
+        "id:<pk>" and "video:<video_id>" name a video explicitly. An unprefixed
+        identifier is a video_id, or also a pk when it is numeric, in which case
+        a video_id match is ordered first.
+
+        Args:
+            identifier: The identifier from the URL.
+
+        Returns:
+            QuerySet: The matching videos, the named one first.
+        """
+        kind, _, value = identifier.partition(":")
+        if kind == "id" and value:
+            return self.filter(pk=value) if value.isdigit() else self.none()
+        if kind == "video" and value:
+            return self.filter(video_id=value)
+        if not identifier.isdigit():
+            return self.filter(video_id=identifier)
+        return self.filter(Q(video_id=identifier) | Q(pk=identifier)).order_by(
+            Case(When(video_id=identifier, then=Value(0)), default=Value(1))
+        )
+
+    def refresh_derived(self):
+        """
+        Recompute the data derived from other fields that bulk writes and
+        queryset updates skip: the search document, the tag index and the
+        subtopic link.
+        """
+        from .tags import sync_tags
+
+        refresh_search_documents(self)
+        sync_tags(self)
+        self.link_subtopics()
+
+    def link_subtopics(self):
+        """
+        Point subtopic_ref at the Subtopic named like each video's topic and
+        subtopic, or clear it when there is none, with one UPDATE.
+
+        Returns:
+            int: The number of updated rows.
+        """
+        match = Subtopic.objects.filter(
+            name=OuterRef("subtopic"), topic__name=OuterRef("topic")
+        ).order_by("pk")
+        return self.update(subtopic_ref=Subquery(match.values("pk")[:1]))
+
+    def update(self, **kwargs):
+        updated = super().update(**kwargs)
+        if updated:
+            bump_generation(VIDEO_CACHE_NAMESPACE)
+        return updated
+
+    def add_to_counter(self, field, amount):
+        """
+        Add to the views or likes of the videos without invalidating the cached
+        video responses, see videos.counters.CounterBuffer.
+
+        Args:
+            field: "views" or "likes".
+            amount: The increment, an int or an expression.
+
+        Returns:
+            int: The number of updated rows.
+        """
+        return super().update(**{field: F(field) + amount}, updated_at=Now())
+
+    def bulk_create(self, objs, *args, **kwargs):
+        created = super().bulk_create(objs, *args, **kwargs)
+        if created:
+            bump_generation(VIDEO_CACHE_NAMESPACE)
+        return created
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        updated = super().bulk_update(objs, fields, *args, **kwargs)
+        if updated:
+            bump_generation(VIDEO_CACHE_NAMESPACE)
+        return updated
+
+    def delete(self):
+        from .tags import refresh_tag_counts
+
+        result = super().delete()
+        refresh_tag_counts()
+        bump_generation(VIDEO_CACHE_NAMESPACE)
+        return result
 
 
 # Create your models here.
@@ -17,9 +172,15 @@ class Video(models.Model):
         publishedAt (str): The date and time the video was published in ISO 8601 format.
         likes (int): The number of likes for the video.
         views (int): The number of views for the video.
+        published_at (datetime): publishedAt parsed, used for date filters and ordering.
+        duration_seconds (int): duration parsed to seconds, used for duration filters.
+        updated_at (datetime): When the video was last written, used for conditional GETs.
+        search_document: Title, description and tags prepared for full-text search.
+        subtopic_ref (Subtopic): The Subtopic matching topic and subtopic by name, if any.
 
     Methods:
         __str__: Returns a string representation of the video.
+        sync_typed_fields: Fills published_at and duration_seconds from the string fields.
     """
 
     video_id = models.CharField(max_length=255, unique=True)
@@ -32,6 +193,169 @@ class Video(models.Model):
     publishedAt = models.CharField(max_length=50, blank=True)
     likes = models.IntegerField(default=0)
     views = models.IntegerField(default=0)
+    published_at = models.DateTimeField(null=True, blank=True, editable=False)
+    duration_seconds = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    search_document = SearchDocumentField(blank=True, default="", editable=False)
+    subtopic_ref = models.ForeignKey(
+        Subtopic,
+        null=True,
+        blank=True,
+        editable=False,
+        on_delete=models.SET_NULL,
+        related_name="videos",
+    )
+
+    objects = VideoQuerySet.as_manager()
+
+    class Meta:
+        # Match the filter/ordering combinations exposed by VideoViewSet so list
+        # calls are served by an index range scan instead of a table scan and sort.
+        indexes = [
+            models.Index(
+                fields=["topic", "subtopic", "-published_at"],
+                name="video_topic_subtopic_pubat_idx",
+            ),
+            models.Index(fields=["topic", "-published_at"], name="video_topic_pubat_idx"),
+            models.Index(fields=["topic", "-views"], name="video_topic_views_idx"),
+            models.Index(fields=["topic", "-likes"], name="video_topic_likes_idx"),
+            models.Index(fields=["-published_at"], name="video_published_at_idx"),
+            models.Index(fields=["-views"], name="video_views_idx"),
+            models.Index(fields=["-likes"], name="video_likes_idx"),
+            models.Index(fields=["duration_seconds"], name="video_duration_seconds_idx"),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.topic}"
+
+    def sync_typed_fields(self):
+        """
+        Fill published_at and duration_seconds from publishedAt and duration.
+        Bulk writes skip save(), so they call this on each instance themselves.
+        """
+        self.published_at = parse_published_at(self.publishedAt)
+        self.duration_seconds = parse_duration_seconds(self.duration)
+
+    def save(self, *args, **kwargs):
+        self.sync_typed_fields()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"publishedAt", "duration"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "published_at", "duration_seconds"}
+        super().save(*args, **kwargs)
+        if update_fields is None or {"title", "description", "tags", "topic", "subtopic"} & set(update_fields):
+            Video.objects.filter(pk=self.pk).refresh_derived()
+
+    def delete(self, *args, **kwargs):
+        from .tags import refresh_tag_counts
+
+        tag_ids = list(self.video_tags.values_list("tag_id", flat=True))
+        result = super().delete(*args, **kwargs)
+        refresh_tag_counts(tag_ids)
+        return result
+
+
+class Tag(models.Model):
+    """
+    A model representing a tag, normalized out of Video.tags.
+
+    Attributes:
+        name (str): The tag as it appears in Video.tags.
+        video_count (int): The number of videos carrying the tag, precomputed
+            whenever the tag index of a video changes.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    video_count = models.PositiveIntegerField(default=0, db_index=True)
+
+    def __str__(self):
+        return self.name
+
+
+class VideoTag(models.Model):
+    """
+    A model linking a video to one of its tags.
+
+    Rows are rebuilt from Video.tags by videos.tags.sync_tags and never edited
+    directly, Video.tags stays the source of truth.
+
+    Attributes:
+        video (Video): The tagged video.
+        tag (Tag): The tag.
+    """
+
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name="video_tags")
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name="video_tags")
+
+    class Meta:
+        # Leading with tag makes the constraint's index serve "videos tagged X".
+        constraints = [
+            models.UniqueConstraint(fields=["tag", "video"], name="unique_video_tag"),
+        ]
+
+    def __str__(self):
+        return f"{self.video_id} - {self.tag_id}"
+
+
+class TrendingVideo(models.Model):
+    """
+    A model holding the precomputed trending ranking of a topic or subtopic.
+
+    Rows are replaced wholesale by the compute_trending management command, see
+    videos.trending. A blank topic holds the ranking across all videos and a
+    blank subtopic the ranking across a whole topic.
+
+    Attributes:
+        topic (str): The ranked topic, blank for all videos.
+        subtopic (str): The ranked subtopic, blank for the whole topic.
+        rank (int): The 1-based position in the ranking.
+        video (Video): The ranked video.
+        score (float): The time-decayed popularity score the ranking is sorted by.
+        computed_at (datetime): When the ranking was computed.
+    """
+
+    topic = models.CharField(max_length=50, blank=True)
+    subtopic = models.CharField(max_length=50, blank=True)
+    rank = models.PositiveSmallIntegerField()
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name="+")
+    score = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        # The constraint's index serves a whole ranking in rank order.
+        constraints = [
+            models.UniqueConstraint(
+                fields=["topic", "subtopic", "rank"], name="unique_trending_rank"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.topic}/{self.subtopic} #{self.rank}: {self.video_id}"
+
+
+class RelatedVideo(models.Model):
+    """
+    A model holding the precomputed nearest neighbours of a video.
+
+    Rows are replaced wholesale by the build_related_videos management command,
+    see videos.related.
+
+    Attributes:
+        video (Video): The video the neighbours belong to.
+        related (Video): A neighbouring video.
+        rank (int): The 1-based position among the video's neighbours.
+        score (float): The similarity the neighbours are sorted by.
+    """
+
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name="+")
+    related = models.ForeignKey(Video, on_delete=models.CASCADE, related_name="+")
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        # The constraint's index serves a video's neighbours in rank order.
+        constraints = [
+            models.UniqueConstraint(fields=["video", "rank"], name="unique_related_rank"),
+        ]
+
+    def __str__(self):
+        return f"{self.video_id} #{self.rank}: {self.related_id}"
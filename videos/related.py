@@ -0,0 +1,166 @@
+import heapq
+import math
+from array import array
+from collections import Counter
+from collections import defaultdict
+
+from django.db import transaction
+
+from api.cache import VIDEO_CACHE_NAMESPACE
+from api.cache import bump_generation
+from users.models import ListVideo
+from users.models import UserSavedVideo
+
+from .models import RelatedVideo
+from .models import Video
+from .models import VideoTag
+
+RELATED_LIMIT = 20
+# Weights of the two signals in the combined similarity.
+TAG_WEIGHT = 1.0
+CO_SAVE_WEIGHT = 2.0
+# Tags on more videos than this within a subtopic, and save lists or video
+# lists longer than this, say little about any pair and would cost a number of
+# pairs quadratic in their size, so they are skipped or truncated.
+MAX_TAG_VIDEOS = 500
+MAX_BASKET_SIZE = 100
+WRITE_BATCH_SIZE = 1000
+
+
+def _pair_weight(size):
+    # Shared membership of a small group is a stronger signal than of a big one.
+    return 1 / math.log(2 + size)
+
+
+def _add_pairs(scores, members, weight):
+    for video in members:
+        neighbours = scores[video]
+        for other in members:
+            if other != video:
+                neighbours[other] += weight
+
+
+def _baskets(rows, pks):
+    # Group (basket key, video_id) rows ordered by basket into lists of video pks.
+    key, members = None, []
+    for row_key, video_id in rows:
+        if row_key != key:
+            if members:
+                yield members
+            key, members = row_key, []
+        if video_id in pks:
+            members.append(pks[video_id])
+    if members:
+        yield members
+
+
+class CoSaves:
+    """
+    The videos saved by the same user or listed in the same list, indexed by video.
+
+    Every save list and video list is kept once as a basket of video pks, and
+    every video knows the baskets it is in. A video's co-saves are counted on
+    demand by neighbours(), so memory grows with the number of saves rather
+    than with the number of co-saved pairs.
+    """
+
+    def __init__(self):
+        pks = dict(Video.objects.values_list("video_id", "pk").iterator(chunk_size=5000))
+        saves = UserSavedVideo.objects.order_by("user_id", "-id").values_list("user_id", "video_id")
+        entries = ListVideo.objects.order_by("list_id_id", "position").values_list("list_id_id", "video_id")
+
+        self.baskets = []
+        self.weights = []
+        by_video = defaultdict(list)
+        for rows in (saves.iterator(chunk_size=5000), entries.iterator(chunk_size=5000)):
+            for members in _baskets(rows, pks):
+                members = list(dict.fromkeys(members))[:MAX_BASKET_SIZE]
+                if len(members) < 2:
+                    continue
+                for pk in members:
+                    by_video[pk].append(len(self.baskets))
+                self.baskets.append(array("q", members))
+                self.weights.append(_pair_weight(len(members)))
+        self.by_video = {pk: array("q", indexes) for pk, indexes in by_video.items()}
+
+    def neighbours(self, pk):
+        """
+        Count how often other videos are saved or listed together with a video.
+
+        Returns:
+            Counter: {neighbour pk: weighted co-occurrences}.
+        """
+        scores = Counter()
+        for index in self.by_video.get(pk, ()):
+            weight = self.weights[index]
+            for other in self.baskets[index]:
+                if other != pk:
+                    scores[other] += weight
+        return scores
+
+
+def tag_scores(topic, subtopic):
+    """
+    Score the tag overlap of every pair of videos in a topic/subtopic.
+
+    Every shared tag adds a weight that shrinks with the number of videos
+    carrying it, like an inverse document frequency.
+
+    Returns:
+        tuple: (pks, scores) where pks lists the group's videos and scores is
+            {video pk: Counter({neighbour pk: overlap})}.
+    """
+    pks = list(Video.objects.filter(topic=topic, subtopic=subtopic).values_list("pk", flat=True))
+    tagged = defaultdict(list)
+    links = VideoTag.objects.filter(video__topic=topic, video__subtopic=subtopic)
+    for video_id, tag_id in links.values_list("video_id", "tag_id").iterator(chunk_size=5000):
+        tagged[tag_id].append(video_id)
+
+    scores = defaultdict(Counter)
+    for members in tagged.values():
+        if 1 < len(members) <= MAX_TAG_VIDEOS:
+            _add_pairs(scores, members, _pair_weight(len(members)))
+    return pks, scores
+
+
+def build_related_videos(limit=RELATED_LIMIT):
+    """
+    Recompute the nearest neighbours of every video and replace the stored rows.
+
+    A video's neighbours are scored by their tag overlap within its topic and
+    subtopic plus how often they are saved or listed together with it, the
+    latter across topics. Groups are processed one topic/subtopic at a time so
+    only one group's tag pairs are held in memory, and co-saves are counted one
+    video at a time, see CoSaves. The cached related responses are invalidated
+    once the new rows are committed.
+
+    Args:
+        limit: The number of neighbours kept per video.
+
+    Returns:
+        int: The number of stored rows.
+    """
+    co_saves = CoSaves()
+    groups = Video.objects.values_list("topic", "subtopic").distinct().order_by()
+
+    stored = 0
+    with transaction.atomic():
+        RelatedVideo.objects.all().delete()
+        for topic, subtopic in groups:
+            pks, tag_overlap = tag_scores(topic, subtopic)
+            rows = []
+            for pk in pks:
+                combined = Counter()
+                for other, score in tag_overlap.get(pk, {}).items():
+                    combined[other] += TAG_WEIGHT * score
+                for other, score in co_saves.neighbours(pk).items():
+                    combined[other] += CO_SAVE_WEIGHT * score
+                top = heapq.nlargest(limit, combined.items(), key=lambda item: (item[1], -item[0]))
+                rows.extend(
+                    RelatedVideo(video_id=pk, related_id=other, rank=rank, score=score)
+                    for rank, (other, score) in enumerate(top, start=1)
+                )
+            RelatedVideo.objects.bulk_create(rows, batch_size=WRITE_BATCH_SIZE)
+            stored += len(rows)
+    bump_generation(VIDEO_CACHE_NAMESPACE)
+    return stored
@@ -0,0 +1,104 @@
+from django.db import connections
+from django.db.models import BooleanField
+from django.db.models import Case
+from django.db.models import F
+from django.db.models import Func
+from django.db.models import IntegerField
+from django.db.models import TextField
+from django.db.models import Value
+from django.db.models import When
+from django.db.models.functions import Cast
+from django.db.models.functions import Coalesce
+from django.db.models.functions import Concat
+from django.db.models.functions import Lower
+
+# The catalog mixes Hebrew and English, so documents are not stemmed.
+SEARCH_CONFIG = "simple"
+
+
+def is_postgres(queryset):
+    return connections[queryset.db].vendor == "postgresql"
+
+
+def search_document(queryset):
+    """
+    Return the expression a video's search document is computed from.
+
+    On PostgreSQL this is a tsvector with the title weighted A, the description
+    B and the tags C. Elsewhere it is the lower-cased text of the same fields.
+
+    Args:
+        queryset: A Video queryset, used to pick the database backend.
+    """
+    if is_postgres(queryset):
+        from django.contrib.postgres.search import SearchVector
+
+        return (
+            SearchVector("title", weight="A", config=SEARCH_CONFIG)
+            + SearchVector("description", weight="B", config=SEARCH_CONFIG)
+            + SearchVector(Cast("tags", TextField()), weight="C", config=SEARCH_CONFIG)
+        )
+    return Lower(
+        Concat(
+            "title",
+            Value(" "),
+            Coalesce("description", Value("")),
+            Value(" "),
+            Cast("tags", TextField()),
+            output_field=TextField(),
+        )
+    )
+
+
+def refresh_search_documents(queryset):
+    """
+    Recompute the search document of every video in the queryset with one UPDATE.
+
+    Returns:
+        int: The number of updated rows.
+    """
+    return queryset.update(search_document=search_document(queryset))
+
+
+def search(queryset, text):
+    """
+    Filter a Video queryset down to the videos matching the search text.
+
+    PostgreSQL matches the text as a web search query against the indexed
+    tsvector and orders by ts_rank. Other backends require every word to appear
+    in the document and rank title matches first.
+
+    Args:
+        queryset: The Video queryset to search.
+        text: The search text as typed by the user.
+
+    Returns:
+        QuerySet: The matching videos, most relevant first.
+    """
+    if is_postgres(queryset):
+        from django.contrib.postgres.search import SearchQuery
+        from django.contrib.postgres.search import SearchRank
+
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type="websearch")
+        matches = Func(
+            F("search_document"),
+            query,
+            template="%(expressions)s",
+            arg_joiner=" @@ ",
+            output_field=BooleanField(),
+        )
+        return (
+            queryset.filter(matches)
+            .annotate(rank=SearchRank(F("search_document"), query))
+            .order_by("-rank", "-pk")
+        )
+
+    for term in text.lower().split():
+        queryset = queryset.filter(search_document__contains=term)
+    return queryset.annotate(
+        rank=Case(
+            When(title__icontains=text, then=Value(2)),
+            default=Value(1),
+            output_field=IntegerField(),
+        )
+    ).order_by("-rank", "-pk")
@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from api.cache import VIDEO_CACHE_NAMESPACE
+from api.cache import bump_generation
+
+from .models import Video
+from .models import VideoQuerySet
+
+
+@receiver(post_save, sender=Video)
+@receiver(post_delete, sender=Video)
+def video_changed(sender, origin=None, **kwargs):
+    """
+    Invalidate the cached video responses after a save or delete made outside
+    the API, e.g. in the admin, a management command or a shell.
+
+    A queryset delete sends post_delete for every row, VideoQuerySet.delete
+    invalidates once for all of them instead.
+    """
+    if isinstance(origin, VideoQuerySet):
+        return
+    bump_generation(VIDEO_CACHE_NAMESPACE)
@@ -0,0 +1,104 @@
+from django.db.models import Count
+from django.db.models import OuterRef
+from django.db.models import Subquery
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+
+from .batching import batches
+from .models import Tag
+from .models import VideoTag
+
+
+def tag_names(tags):
+    """
+    Return the distinct, stripped tag names of a Video.tags value.
+
+    Args:
+        tags: The Video.tags JSON value, normally a list of strings.
+
+    Returns:
+        set: The tag names, empty if tags is not a list.
+    """
+    if not isinstance(tags, list):
+        return set()
+    return {tag.strip()[:255] for tag in tags if isinstance(tag, str) and tag.strip()}
+
+
+def sync_tags(queryset):
+    """
+    Rebuild the tag index of the videos in the queryset from their tags field.
+
+    Missing tags are created, the videos' VideoTag rows are replaced and the
+    counts of every tag gained or lost are recomputed.
+
+    Args:
+        queryset: A Video queryset, at most a few hundred videos at a time.
+    """
+    rows = {pk: tag_names(tags) for pk, tags in queryset.values_list("pk", "tags")}
+    if not rows:
+        return
+    names = set().union(*rows.values())
+
+    Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+    tag_ids = {}
+    for batch in batches(names):
+        tag_ids.update(Tag.objects.filter(name__in=batch).values_list("name", "pk"))
+
+    links = VideoTag.objects.filter(video_id__in=rows)
+    touched = set(links.values_list("tag_id", flat=True))
+    links.delete()
+    VideoTag.objects.bulk_create(
+        [
+            VideoTag(video_id=pk, tag_id=tag_ids[name])
+            for pk, video_names in rows.items()
+            for name in video_names
+        ]
+    )
+    touched.update(tag_ids.values())
+    refresh_tag_counts(touched)
+
+
+def refresh_tag_counts(tag_ids=None):
+    """
+    Recompute Tag.video_count with one UPDATE per batch of tags.
+
+    Args:
+        tag_ids: The primary keys of the tags to recount, or None for all tags.
+    """
+    count = (
+        VideoTag.objects.filter(tag=OuterRef("pk"))
+        .order_by()
+        .values("tag")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    video_count = Coalesce(Subquery(count), Value(0))
+    if tag_ids is None:
+        Tag.objects.update(video_count=video_count)
+        return
+    for batch in batches(tag_ids):
+        Tag.objects.filter(pk__in=batch).update(video_count=video_count)
+
+
+def tagged_video_ids(names, match_all=False):
+    """
+    Return a subquery of the primary keys of videos tagged with the given names.
+
+    Args:
+        names: The tag names.
+        match_all: Require every tag instead of any of them.
+
+    Returns:
+        QuerySet: A values queryset of video primary keys, usable in pk__in.
+    """
+    names = set(names)
+    links = VideoTag.objects.filter(tag__name__in=names)
+    if not match_all:
+        return links.values("video_id")
+    return (
+        links.order_by()
+        .values("video_id")
+        .annotate(matched=Count("tag_id"))
+        .filter(matched=len(names))
+        .values("video_id")
+    )
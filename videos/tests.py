@@ -1,3 +1,449 @@
+import datetime
+import importlib
+import re
+import time
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import OperationalError
+from django.db import connection
+from django.db import transaction
+from django.db.models import F
 from django.test import TestCase
+from django.test import TransactionTestCase
+
+from api.cache import get_generation
+from users.models import ListVideo
+from users.models import UserSavedVideo
+from users.models import UserVideoList
+
+from .counters import CounterBuffer
+from .models import RelatedVideo
+from .models import Tag
+from .models import TrendingVideo
+from .models import Video
+from .models import parse_duration_seconds
+from .models import parse_published_at
+from .related import CoSaves
+from .related import build_related_videos
+from .tags import tagged_video_ids
+from .trending import LIKE_WEIGHT
+from .trending import compute_trending
+from .trending import trending_score
+
+# The filters VideoViewSet.list exposes, as the ORM lookups they turn into.
+LIST_FILTERS = {
+    "none": {},
+    "topic": {"topic": "topic-1"},
+    "topic and subtopic": {"topic": "topic-1", "subtopic": "subtopic-1"},
+    "published range": {"published_at__gte": "2024-05-01T00:00:00Z"},
+    "duration range": {"duration_seconds__gte": 600},
+    "views range": {"views__gte": 9000},
+    "likes range": {"likes__gte": 900},
+}
+# The ?ordering= values, mapped to their columns like VideoOrderingFilter does.
+LIST_ORDERINGS = ["-published_at", "published_at", "-views", "views", "-likes", "likes"]
+# Filters whose rows an ordering index returns in order, without sorting them.
+SORTED_FILTERS = ["none", "topic", "topic and subtopic"]
+
+
+def make_video(number):
+    video = Video(
+        video_id=f"video-{number}",
+        title=f"Video {number}",
+        topic=f"topic-{number % 10}",
+        subtopic=f"subtopic-{number % 50}",
+        duration=f"PT{number % 90}M",
+        publishedAt=f"2024-{number % 12 + 1:02d}-{number % 28 + 1:02d}T10:00:00Z",
+        likes=number % 1000,
+        views=number % 10000,
+    )
+    video.sync_typed_fields()
+    return video
+
+
+class VideoListQueryPlanTests(TestCase):
+    """
+    Check with EXPLAIN that every filter and ordering combination of the video
+    list is served by an index, and that the orderings the indexes were built
+    for need no sort.
+
+    Plans are checked on SQLite and PostgreSQL. PostgreSQL is told to avoid
+    sequential scans, the test table being too small for it to prefer an index.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        Video.objects.bulk_create([make_video(number) for number in range(5000)])
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def setUp(self):
+        if connection.vendor not in ("sqlite", "postgresql"):
+            self.skipTest("Query plans are only checked on SQLite and PostgreSQL.")
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assert_uses_index(self, queryset):
+        plan = queryset.explain()
+        if connection.vendor == "sqlite":
+            scans = [line for line in plan.splitlines() if "videos_video" in line]
+            self.assertTrue(scans, plan)
+            for line in scans:
+                self.assertIn(" USING ", line, plan)
+        else:
+            self.assertNotIn("Seq Scan", plan)
+        return plan
+
+    def assert_sorted_by_index(self, queryset):
+        plan = self.assert_uses_index(queryset)
+        if connection.vendor == "sqlite":
+            # A "RIGHT PART" sort only orders the ties of the index order.
+            self.assertNotIn("USE TEMP B-TREE FOR ORDER BY", plan)
+        else:
+            self.assertIsNone(re.search(r"^(\s*->)?\s*Sort\b", plan, re.MULTILINE), plan)
+
+    def test_filters_use_an_index(self):
+        for name, lookups in LIST_FILTERS.items():
+            if lookups:
+                with self.subTest(filter=name):
+                    self.assert_uses_index(Video.objects.filter(**lookups))
+
+    def test_orderings_use_an_index(self):
+        for name, lookups in LIST_FILTERS.items():
+            for ordering in LIST_ORDERINGS:
+                with self.subTest(filter=name, ordering=ordering):
+                    queryset = Video.objects.filter(**lookups).order_by(ordering)
+                    if name in SORTED_FILTERS or ordering.lstrip("-") in next(iter(lookups)):
+                        self.assert_sorted_by_index(queryset)
+                    else:
+                        self.assert_uses_index(queryset)
+
+    def test_cursor_pages_use_an_index(self):
+        # The orderings of api.pagination.KeysetPagination, with the primary
+        # key breaking ties and nulls first in descending order.
+        for name in ["none", "topic"]:
+            for ordering in LIST_ORDERINGS:
+                field = ordering.lstrip("-")
+                nullable = Video._meta.get_field(field).null or None
+                if ordering.startswith("-"):
+                    terms = [F(field).desc(nulls_first=nullable), "-pk"]
+                else:
+                    terms = [F(field).asc(nulls_last=nullable), "pk"]
+                with self.subTest(filter=name, ordering=ordering):
+                    queryset = Video.objects.filter(**LIST_FILTERS[name]).order_by(*terms)
+                    self.assert_sorted_by_index(queryset[:50])
+
+
+class TagIndexTests(TestCase):
+    """
+    Tests that the tag index and its counts follow every way videos are written.
+    """
+
+    def counts(self):
+        return dict(Tag.objects.filter(video_count__gt=0).values_list("name", "video_count"))
+
+    def test_save_indexes_tags(self):
+        video = Video.objects.create(video_id="a", title="A", topic="t", tags=["x", " y ", "x", ""])
+        Video.objects.create(video_id="b", title="B", topic="t", tags=["y"])
+        self.assertEqual(self.counts(), {"x": 1, "y": 2})
+
+        video.tags = ["z"]
+        video.save()
+        self.assertEqual(self.counts(), {"y": 1, "z": 1})
+
+    def test_queryset_writes_are_reindexed_by_refresh_derived(self):
+        Video.objects.create(video_id="a", title="A", topic="t", tags=["x"])
+        Video.objects.filter(video_id="a").update(tags=["y"])
+        self.assertEqual(self.counts(), {"x": 1})
+
+        Video.objects.filter(video_id="a").refresh_derived()
+        self.assertEqual(self.counts(), {"y": 1})
+
+    def test_deletes_update_counts(self):
+        video = Video.objects.create(video_id="a", title="A", topic="t", tags=["x", "y"])
+        Video.objects.create(video_id="b", title="B", topic="t", tags=["y"])
+
+        video.delete()
+        self.assertEqual(self.counts(), {"y": 1})
+        Video.objects.all().delete()
+        self.assertEqual(self.counts(), {})
+
+    def test_tagged_video_ids(self):
+        a = Video.objects.create(video_id="a", title="A", topic="t", tags=["x", "y"])
+        b = Video.objects.create(video_id="b", title="B", topic="t", tags=["y"])
+
+        def matching(names, match_all=False):
+            videos = Video.objects.filter(pk__in=tagged_video_ids(names, match_all))
+            return set(videos.values_list("pk", flat=True))
+
+        self.assertEqual(matching(["x", "y"]), {a.pk, b.pk})
+        self.assertEqual(matching(["x", "y"], match_all=True), {a.pk})
+        self.assertEqual(matching(["missing"]), set())
+
+
+def fail_updates(execute, sql, params, many, context):
+    if sql.startswith("UPDATE"):
+        raise OperationalError("database is locked")
+    return execute(sql, params, many, context)
+
+
+class CounterBufferTests(TestCase):
+    """
+    Tests that buffered increments are written, and kept when writing fails.
+    """
+
+    def setUp(self):
+        self.videos = Video.objects.bulk_create([make_video(number) for number in range(3)])
+        self.buffer = CounterBuffer(flush_interval=3600)
+
+    def counts(self, field):
+        return list(Video.objects.order_by("pk").values_list(field, flat=True))
+
+    def test_flush_adds_the_increments(self):
+        first, second, third = self.videos
+        self.buffer.add(first.pk, "views")
+        self.buffer.add(first.pk, "views", 2)
+        self.buffer.add(second.pk, "likes", -1)
+        self.buffer.add(third.pk, "likes")
+        self.buffer.add(third.pk, "likes", -1)
+
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(self.counts("views"), [3, 1, 2])
+        self.assertEqual(self.counts("likes"), [0, 0, 2])
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_failed_flush_keeps_the_increments(self):
+        first, second, _ = self.videos
+        self.buffer.add(first.pk, "views")
+        self.buffer.add(second.pk, "likes")
+        with self.assertRaises(OperationalError):
+            with transaction.atomic(), connection.execute_wrapper(fail_updates):
+                self.buffer.flush()
+        self.buffer.add(first.pk, "views")
+
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(self.counts("views"), [2, 1, 2])
+        self.assertEqual(self.counts("likes"), [0, 2, 2])
+
+
+class CounterFlushThreadTests(TransactionTestCase):
+    """
+    Tests that the buffer is flushed without a later increment or request.
+    The flushing thread needs the video committed to see it.
+    """
+
+    def wait_for_views(self, video, views):
+        for _ in range(100):
+            video.refresh_from_db()
+            if video.views == views:
+                return
+            time.sleep(0.05)
+        self.fail(f"views stayed {video.views}")
+
+    def test_flushed_after_the_interval(self):
+        video = Video.objects.create(video_id="a", title="A", topic="t")
+        buffer = CounterBuffer(flush_interval=0.1)
+        buffer.add(video.pk, "views")
+        self.wait_for_views(video, 1)
+
+    def test_flushed_when_full(self):
+        videos = Video.objects.bulk_create([make_video(number) for number in range(2)])
+        buffer = CounterBuffer(flush_interval=3600, max_pending=2)
+        for video in videos:
+            buffer.add(video.pk, "views", 5)
+        self.wait_for_views(videos[1], videos[1].views + 5)
+
+
+class RelatedVideosTests(TestCase):
+    """
+    Tests the related videos scoring of shared tags and co-saves.
+    """
+
+    def setUp(self):
+        self.videos = {
+            name: Video.objects.create(video_id=name, title=name, topic="t", subtopic=subtopic, tags=tags)
+            for name, subtopic, tags in [
+                ("a", "s", ["x", "y"]),
+                ("b", "s", ["x", "y"]),
+                ("c", "s", ["x"]),
+                ("d", "other", []),
+                ("e", "other", []),
+            ]
+        }
+        users = get_user_model().objects
+        for username, saved in [("one", "ade"), ("two", "ad"), ("three", "a")]:
+            user = users.create_user(username)
+            UserSavedVideo.objects.bulk_create([UserSavedVideo(user=user, video_id=name) for name in saved])
+        video_list = UserVideoList.objects.create(user=user, list_id="l", title="L")
+        ListVideo.objects.create(list_id=video_list, video_id="c", position=1)
+        ListVideo.objects.create(list_id=video_list, video_id="e", position=2)
+
+    def related(self, name):
+        rows = RelatedVideo.objects.filter(video=self.videos[name]).order_by("rank")
+        return [row.related.video_id for row in rows]
+
+    def test_co_saves_count_each_basket_once_per_video(self):
+        co_saves = CoSaves()
+        pk = {name: video.pk for name, video in self.videos.items()}
+
+        neighbours = co_saves.neighbours(pk["a"])
+        self.assertEqual(set(neighbours), {pk["d"], pk["e"]})
+        self.assertGreater(neighbours[pk["d"]], neighbours[pk["e"]])
+        self.assertEqual(set(co_saves.neighbours(pk["c"])), {pk["e"]})
+        # A basket of one video pairs it with nothing.
+        self.assertEqual(len(co_saves.baskets), 3)
+
+    def test_build_combines_tags_and_co_saves(self):
+        stored = build_related_videos(limit=2)
+
+        self.assertEqual(self.related("a"), ["d", "b"])
+        self.assertEqual(self.related("b"), ["a", "c"])
+        self.assertEqual(self.related("d"), ["a", "e"])
+        self.assertEqual(stored, RelatedVideo.objects.count())
+
+    def test_endpoint_limit(self):
+        build_related_videos(limit=2)
+        for limit, expected in [("1", ["d"]), ("50", ["d", "b"]), ("-1", [])]:
+            with self.subTest(limit=limit):
+                response = self.client.get(f"/api/videos/a/related/?limit={limit}")
+                self.assertEqual([video["video_id"] for video in response.json()], expected)
+        self.assertEqual(self.client.get("/api/videos/a/related/?limit=ten").status_code, 400)
+
+    def test_build_invalidates_the_cached_videos(self):
+        generation = get_generation("videos")
+        build_related_videos()
+        self.assertNotEqual(get_generation("videos"), generation)
+
+
+class TypedFieldTests(TestCase):
+    """
+    Tests of the typed columns parsed from publishedAt and duration.
+    """
+
+    def test_parse_published_at(self):
+        utc = datetime.timezone.utc
+        for value, expected in [
+            ("2024-05-01T10:00:00Z", datetime.datetime(2024, 5, 1, 10, tzinfo=utc)),
+            ("2024-05-01T10:00:00+02:00", datetime.datetime(2024, 5, 1, 8, tzinfo=utc)),
+            # Naive timestamps are taken as UTC.
+            ("2024-05-01T10:00:00", datetime.datetime(2024, 5, 1, 10, tzinfo=utc)),
+            ("2024-13-01T10:00:00Z", None),
+            ("yesterday", None),
+            ("", None),
+            (None, None),
+        ]:
+            with self.subTest(value=value):
+                self.assertEqual(parse_published_at(value), expected)
+
+    def test_parse_duration_seconds(self):
+        for value, expected in [
+            ("PT1H2M3S", 3723),
+            ("PT90M", 5400),
+            ("P1DT1S", 86401),
+            ("00:10:00", 600),
+            ("-PT5M", 0),
+            ("ten minutes", None),
+            ("", None),
+            (None, None),
+        ]:
+            with self.subTest(value=value):
+                self.assertEqual(parse_duration_seconds(value), expected)
+
+    def test_save_fills_the_typed_columns(self):
+        video = Video.objects.create(video_id="v", publishedAt="2024-05-01T10:00:00Z", duration="PT10M")
+        video.duration = "PT20M"
+        video.save(update_fields=["duration"])
+
+        video.refresh_from_db()
+        self.assertEqual(video.published_at, datetime.datetime(2024, 5, 1, 10, tzinfo=datetime.timezone.utc))
+        self.assertEqual(video.duration_seconds, 1200)
+
+    def test_migration_backfills_the_typed_columns(self):
+        migration = importlib.import_module("videos.migrations.0005_video_published_at_duration_seconds")
+        Video.objects.bulk_create([make_video(number) for number in range(5)])
+        Video.objects.create(video_id="unparsed", publishedAt="yesterday", duration="ten minutes")
+        expected = {
+            video.video_id: (video.published_at, video.duration_seconds) for video in Video.objects.all()
+        }
+        Video.objects.update(published_at=None, duration_seconds=None)
+
+        migration.backfill_typed_fields(apps, None)
+
+        backfilled = {
+            video.video_id: (video.published_at, video.duration_seconds) for video in Video.objects.all()
+        }
+        self.assertEqual(backfilled, expected)
+        self.assertEqual(backfilled["video-3"][1], 180)
+        self.assertEqual(backfilled["unparsed"], (None, None))
+
+
+class TrendingTests(TestCase):
+    """
+    Tests of the trending score and the precomputed rankings.
+    """
+
+    def setUp(self):
+        self.now = datetime.datetime(2024, 6, 1, tzinfo=datetime.timezone.utc)
+
+    def hours_ago(self, hours):
+        return self.now - datetime.timedelta(hours=hours)
+
+    def test_score(self):
+        score = trending_score(100, 10, self.hours_ago(10), self.now)
+        self.assertAlmostEqual(score, (100 + 10 * LIKE_WEIGHT) / 12**1.5)
+        # A like is worth LIKE_WEIGHT views.
+        self.assertEqual(
+            trending_score(0, 1, self.hours_ago(10), self.now),
+            trending_score(LIKE_WEIGHT, 0, self.hours_ago(10), self.now),
+        )
+        # Older videos need more engagement to rank as high.
+        self.assertGreater(score, trending_score(100, 10, self.hours_ago(20), self.now))
+        # Future dates count as brand new, missing ones as a year old.
+        newest = trending_score(100, 0, self.now, self.now)
+        self.assertEqual(trending_score(100, 0, self.hours_ago(-5), self.now), newest)
+        year_old = trending_score(100, 0, self.hours_ago(24 * 365), self.now)
+        self.assertEqual(trending_score(100, 0, None, self.now), year_old)
+        # Counts left negative by a race are not penalised further.
+        self.assertEqual(trending_score(-5, -1, self.now, self.now), 0)
+
+    def ranking(self, topic="", subtopic=""):
+        rows = TrendingVideo.objects.filter(topic=topic, subtopic=subtopic).order_by("rank")
+        return [row.video.video_id for row in rows]
+
+    def test_rankings_are_bounded_per_topic_and_subtopic(self):
+        topics = [("a", "x"), ("a", "x"), ("a", "x"), ("a", "y"), ("b", "")]
+        for number, (topic, subtopic) in enumerate(topics):
+            Video.objects.create(
+                video_id=f"video-{number}",
+                topic=topic,
+                subtopic=subtopic,
+                views=100 * (number + 1),
+                publishedAt="2024-05-31T00:00:00Z",
+            )
+
+        stored = compute_trending(limit=2, now=self.now)
+
+        self.assertEqual(self.ranking(), ["video-4", "video-3"])
+        self.assertEqual(self.ranking("a"), ["video-3", "video-2"])
+        self.assertEqual(self.ranking("a", "x"), ["video-2", "video-1"])
+        self.assertEqual(self.ranking("a", "y"), ["video-3"])
+        self.assertEqual(self.ranking("b"), ["video-4"])
+        # No ranking is kept for a blank subtopic, it would repeat the topic's.
+        self.assertFalse(TrendingVideo.objects.filter(topic="b").exclude(subtopic="").exists())
+        self.assertEqual(stored, TrendingVideo.objects.count())
+        self.assertEqual(stored, 2 + 2 + 2 + 1 + 1)
+
+    def test_recompute_replaces_the_rankings(self):
+        # Without a topic the video is only in the overall ranking, once.
+        Video.objects.create(video_id="old", views=10)
+        compute_trending(now=self.now)
+        Video.objects.filter(video_id="old").delete()
+        Video.objects.create(video_id="new", views=10)
+        generation = get_generation("videos")
+
+        compute_trending(now=self.now)
 
-# Create your tests here.
+        self.assertEqual(self.ranking(), ["new"])
+        self.assertNotEqual(get_generation("videos"), generation)
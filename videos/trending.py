@@ -0,0 +1,97 @@
+import heapq
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from api.cache import VIDEO_CACHE_NAMESPACE
+from api.cache import bump_generation
+
+from .models import TrendingVideo
+from .models import Video
+
+TRENDING_LIMIT = 50
+# A like is worth this many views.
+LIKE_WEIGHT = 20
+# How fast the score decays with age, higher favours newer videos.
+GRAVITY = 1.5
+# Videos without a publish date are ranked as if they were this old.
+UNKNOWN_AGE_HOURS = 24 * 365
+WRITE_BATCH_SIZE = 500
+
+
+def trending_score(views, likes, published_at, now):
+    """
+    Return the time-decayed popularity score of a video.
+
+    The weighted engagement is divided by the video's age in hours, raised to
+    GRAVITY, so a video has to keep gaining views to stay on top.
+
+    Args:
+        views: The video's view count.
+        likes: The video's like count.
+        published_at: When the video was published, or None.
+        now: The time the ranking is computed at.
+
+    Returns:
+        float: The score, higher is more trending.
+    """
+    if published_at is None:
+        age_hours = UNKNOWN_AGE_HOURS
+    else:
+        age_hours = max((now - published_at).total_seconds() / 3600, 0)
+    engagement = max(views, 0) + LIKE_WEIGHT * max(likes, 0)
+    return engagement / (age_hours + 2) ** GRAVITY
+
+
+def compute_trending(limit=TRENDING_LIMIT, now=None):
+    """
+    Recompute every trending ranking and replace the stored rows.
+
+    The videos are streamed once and a bounded heap per ranking keeps the top
+    entries, so memory does not grow with the catalog. Rankings are kept for
+    all videos, every topic and every topic/subtopic pair. The cached trending
+    responses are invalidated once the new rows are committed.
+
+    Args:
+        limit: The number of videos kept per ranking.
+        now: The time to compute ages at, defaults to the current time.
+
+    Returns:
+        int: The number of stored rows.
+    """
+    now = now or timezone.now()
+    heaps = defaultdict(list)
+    videos = Video.objects.values_list("pk", "topic", "subtopic", "views", "likes", "published_at")
+    for pk, topic, subtopic, views, likes, published_at in videos.iterator(chunk_size=2000):
+        entry = (trending_score(views, likes, published_at, now), pk)
+        rankings = [("", "")]
+        # A blank topic's ranking is the overall one, it must not be pushed twice.
+        if topic:
+            rankings.append((topic, ""))
+        if subtopic:
+            rankings.append((topic, subtopic))
+        for ranking in rankings:
+            heap = heaps[ranking]
+            if len(heap) < limit:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+    rows = [
+        TrendingVideo(
+            topic=topic,
+            subtopic=subtopic,
+            rank=rank,
+            video_id=pk,
+            score=score,
+            computed_at=now,
+        )
+        for (topic, subtopic), heap in heaps.items()
+        for rank, (score, pk) in enumerate(sorted(heap, reverse=True), start=1)
+    ]
+    with transaction.atomic():
+        TrendingVideo.objects.all().delete()
+        TrendingVideo.objects.bulk_create(rows, batch_size=WRITE_BATCH_SIZE)
+    bump_generation(VIDEO_CACHE_NAMESPACE)
+    return len(rows)